@@ -4,15 +4,68 @@
 新しく学んだことを記録し、成長を追跡します
 """
 
+import atexit
+import bisect
+import heapq
 import json
 import datetime
+import math
 import os
 import random
+import threading
+import time
+import weakref
+
+# 終了時に書き出す知識ベース（atexit への登録はモジュールで1回だけにし、
+# 使われなくなったインスタンスを終了まで掴み続けない）
+_open_knowledge_bases = weakref.WeakSet()
+
+def _flush_all():
+    """プロセス終了時に、開いている知識ベースの未保存の変更を書き出す"""
+    for kb in list(_open_knowledge_bases):
+        kb.flush()
+
+atexit.register(_flush_all)
 
 class KnowledgeBase:
-    def __init__(self):
+    """
+    知識の変更はメモリ上で行い、まとめて書き出す（write-behind）
+    
+    書き出すのは変更から flush_interval 秒以内（その後に変更がなくてもタイマーで書き出す）、
+    with ブロックを抜けた時、flush() を呼んだ時、そしてプロセス終了時。
+    強制終了された場合に失うのは最大 flush_interval 秒分の変更。
+    経験は追記専用の experiences.jsonl に書く。
+    """
+    
+    # 使用頻度の重みが半分になるまでの日数（最近使ったものほど上位に）
+    USAGE_HALF_LIFE_DAYS = 7.0
+    # 復習間隔の上限（日）
+    MAX_REVIEW_INTERVAL_DAYS = 180
+    
+    def __init__(self, flush_interval=30.0):
         self.knowledge_file = "/Users/claude/workspace/yamada/learning/knowledge.json"
+        self.experiences_file = "/Users/claude/workspace/yamada/learning/experiences.jsonl"
+        self.flush_interval = flush_interval
+        self._dirty = False
+        self._pending_experiences = []
+        self._last_flush = time.monotonic()
+        # 書き出し待ちのタイマー（タイマーのスレッドからも書き出すので変更と書き出しはロック内で行う）
+        self._timer = None
+        self._lock = threading.RLock()
         self.load_knowledge()
+        _open_knowledge_bases.add(self)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+        return False
+    
+    def close(self):
+        """未保存の変更を書き出し、終了時の書き出し対象から外す"""
+        self.flush()
+        _open_knowledge_bases.discard(self)
     
     def load_knowledge(self):
         """既存の知識を読み込む"""
@@ -30,9 +83,49 @@ class KnowledgeBase:
                     "last_updated": None
                 }
             }
+        
+        # knowledge.json に残っている以前の経験の件数（これより後はJSONLにある）
+        self._stored_experiences = len(self.knowledge["experiences"])
+        if os.path.exists(self.experiences_file):
+            with open(self.experiences_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        self.knowledge["experiences"].append(json.loads(line))
+        
+        self._command_names = list(self.knowledge["commands"])
+        self._build_rank_index()
+        self._build_review_queue()
     
-    def save_knowledge(self):
-        """知識を保存"""
+    def _mark_dirty(self):
+        """変更を記録し、前回の書き出しから間隔が空いていれば書き出す（でなければ書き出しを予約）"""
+        self._dirty = True
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+        elif self._timer is None:
+            # 次の変更が来なくても flush_interval 秒後には書き出す
+            self._timer = threading.Timer(self.flush_interval, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+    
+    def flush(self):
+        """未保存の変更を書き出す（経験はJSONLに追記、残りは原子的に置き換え）"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._dirty:
+                self._write()
+    
+    def _write(self):
+        """変更を書き出す（flush からロック内で呼ぶ）"""
+        if self._pending_experiences:
+            with open(self.experiences_file, 'a', encoding='utf-8') as f:
+                f.write("".join(
+                    json.dumps(experience, ensure_ascii=False) + "\n"
+                    for experience in self._pending_experiences
+                ))
+            self._pending_experiences = []
+        
         self.knowledge["statistics"]["total_items"] = (
             len(self.knowledge["commands"]) + 
             len(self.knowledge["concepts"]) + 
@@ -40,42 +133,62 @@ class KnowledgeBase:
         )
         self.knowledge["statistics"]["last_updated"] = datetime.datetime.now().isoformat()
         
-        with open(self.knowledge_file, 'w', encoding='utf-8') as f:
-            json.dump(self.knowledge, f, indent=2, ensure_ascii=False)
+        stored = dict(self.knowledge)
+        stored["experiences"] = self.knowledge["experiences"][:self._stored_experiences]
+        tmp_file = f"{self.knowledge_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(stored, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_file, self.knowledge_file)
+        
+        self._dirty = False
+        self._last_flush = time.monotonic()
+    
+    def save_knowledge(self):
+        """知識を保存"""
+        self._dirty = True
+        self.flush()
     
     def learn_command(self, command, description, category="general"):
         """新しいコマンドを学習"""
-        self.knowledge["commands"][command] = {
-            "description": description,
-            "category": category,
-            "learned_at": datetime.datetime.now().isoformat(),
-            "usage_count": 0
-        }
-        self.save_knowledge()
-        return f"✨ 新しいコマンドを学習: {command}"
+        with self._lock:
+            self.knowledge["commands"][command] = {
+                "description": description,
+                "category": category,
+                "learned_at": datetime.datetime.now().isoformat(),
+                "usage_count": 0
+            }
+            if command not in self._command_names:
+                self._command_names.append(command)
+            self._index_usage(command)
+            self._schedule_review(command, self.knowledge["commands"][command])
+            self._mark_dirty()
+            return f"✨ 新しいコマンドを学習: {command}"
     
     def add_experience(self, title, details):
         """経験を記録"""
-        experience = {
-            "title": title,
-            "details": details,
-            "timestamp": datetime.datetime.now().isoformat()
-        }
-        self.knowledge["experiences"].append(experience)
-        self.save_knowledge()
-        return f"📝 経験を記録: {title}"
+        with self._lock:
+            experience = {
+                "title": title,
+                "details": details,
+                "timestamp": datetime.datetime.now().isoformat()
+            }
+            self.knowledge["experiences"].append(experience)
+            self._pending_experiences.append(experience)
+            self._mark_dirty()
+            return f"📝 経験を記録: {title}"
     
     def add_skill(self, skill_name, level="beginner"):
         """スキルを追加"""
-        if skill_name not in self.knowledge["skills"]:
-            self.knowledge["skills"].append({
-                "name": skill_name,
-                "level": level,
-                "acquired_at": datetime.datetime.now().isoformat()
-            })
-            self.save_knowledge()
-            return f"🎯 新しいスキルを獲得: {skill_name}"
-        return f"既に {skill_name} を知っています"
+        with self._lock:
+            if skill_name not in self.knowledge["skills"]:
+                self.knowledge["skills"].append({
+                    "name": skill_name,
+                    "level": level,
+                    "acquired_at": datetime.datetime.now().isoformat()
+                })
+                self._mark_dirty()
+                return f"🎯 新しいスキルを獲得: {skill_name}"
+            return f"既に {skill_name} を知っています"
     
     def get_summary(self):
         """学習状況のサマリー"""
@@ -89,10 +202,133 @@ class KnowledgeBase:
     
     def get_random_knowledge(self):
         """ランダムな知識を取得"""
-        if self.knowledge["commands"]:
-            cmd = random.choice(list(self.knowledge["commands"].keys()))
+        if self._command_names:
+            cmd = random.choice(self._command_names)
             return f"💡 知っていますか？ '{cmd}' - {self.knowledge['commands'][cmd]['description']}"
         return "まだ知識がありません"
+    
+    # ---------- 使用状況 ----------
+    
+    def record_use(self, command):
+        """コマンドを使ったことを記録（復習の期限が来ていれば、思い出せたものとして復習済みにする）"""
+        with self._lock:
+            info = self.knowledge["commands"].get(command)
+            if info is None:
+                return False
+            now = datetime.datetime.now()
+            info["usage_count"] = info.get("usage_count", 0) + 1
+            info["last_used"] = now.isoformat()
+            self._index_usage(command)
+            if info.get("next_review", "") <= info["last_used"]:
+                self.review(command, remembered=True)
+            self._mark_dirty()
+            return True
+    
+    def _rank_key(self, info):
+        """時刻によらない順位のキー（log2(回数) + 最終使用日/半減期）
+        
+        全コマンドで半減期が同じなので、usage_score の大小とこのキーの大小は
+        どの時点でも一致する。使った時だけ更新すればよい
+        """
+        count = info.get("usage_count", 0)
+        if not count or not info.get("last_used"):
+            return None
+        days = datetime.datetime.fromisoformat(info["last_used"]).timestamp() / 86400
+        return math.log2(count) + days / self.USAGE_HALF_LIFE_DAYS
+    
+    def _build_rank_index(self):
+        """(キー, コマンド) の昇順リストと、コマンドごとの現在のキー"""
+        self._rank_keys = {}
+        for command, info in self.knowledge["commands"].items():
+            key = self._rank_key(info)
+            if key is not None:
+                self._rank_keys[command] = key
+        self._rank_index = sorted((key, command) for command, key in self._rank_keys.items())
+    
+    def _index_usage(self, command):
+        """1件分の順位を付け直す（二分探索で外して入れ直す）"""
+        old_key = self._rank_keys.pop(command, None)
+        if old_key is not None:
+            del self._rank_index[bisect.bisect_left(self._rank_index, (old_key, command))]
+        key = self._rank_key(self.knowledge["commands"][command])
+        if key is not None:
+            self._rank_keys[command] = key
+            bisect.insort(self._rank_index, (key, command))
+    
+    def usage_score(self, command, now=None):
+        """使用回数を最終使用からの経過日数で減衰させたスコア"""
+        info = self.knowledge["commands"][command]
+        count = info.get("usage_count", 0)
+        if not count or not info.get("last_used"):
+            return 0.0
+        now = now or datetime.datetime.now()
+        days = (now - datetime.datetime.fromisoformat(info["last_used"])).total_seconds() / 86400
+        return count * 0.5 ** (max(days, 0.0) / self.USAGE_HALF_LIFE_DAYS)
+    
+    def ranked_commands(self, limit=5):
+        """よく・最近使うコマンドの上位 (コマンド, スコア)。索引の末尾から limit 件を読むだけ"""
+        now = datetime.datetime.now()
+        top = self._rank_index[:-limit - 1:-1] if limit > 0 else []
+        return [(cmd, self.usage_score(cmd, now)) for _, cmd in top]
+    
+    # ---------- 間隔反復の復習 ----------
+    
+    def _build_review_queue(self):
+        """次回復習日時のヒープを作る（(期限, コマンド)、古い要素は取り出し時に捨てる）"""
+        self._review_heap = []
+        for command, info in self.knowledge["commands"].items():
+            if "next_review" not in info:
+                # 以前に学んだものは学習の翌日が最初の復習日
+                learned_at = datetime.datetime.fromisoformat(info["learned_at"])
+                info["next_review"] = (learned_at + datetime.timedelta(days=1)).isoformat()
+                info["review_interval"] = 1
+            self._review_heap.append((info["next_review"], command))
+        heapq.heapify(self._review_heap)
+    
+    def _schedule_review(self, command, info, interval_days=1):
+        due = datetime.datetime.now() + datetime.timedelta(days=interval_days)
+        info["review_interval"] = interval_days
+        info["next_review"] = due.isoformat()
+        heapq.heappush(self._review_heap, (info["next_review"], command))
+    
+    def next_review(self, now=None):
+        """期限が来ている復習対象のコマンド（なければNone）。ヒープの先頭を見るだけ"""
+        now = (now or datetime.datetime.now()).isoformat()
+        heap = self._review_heap
+        while heap:
+            due, command = heap[0]
+            info = self.knowledge["commands"].get(command)
+            if info is None or info.get("next_review") != due:
+                # 予定が変わった・削除された古い要素
+                heapq.heappop(heap)
+                continue
+            return command if due <= now else None
+        return None
+    
+    def due_reviews(self, now=None):
+        """期限が来ている復習対象をすべて返す（予定は変えない。取り出した要素はヒープに戻す）"""
+        due_commands = []
+        popped = []
+        command = self.next_review(now)
+        while command is not None:
+            popped.append(heapq.heappop(self._review_heap))
+            due_commands.append(command)
+            command = self.next_review(now)
+        for item in popped:
+            heapq.heappush(self._review_heap, item)
+        return due_commands
+    
+    def review(self, command, remembered=True):
+        """復習結果を記録（覚えていれば間隔を倍に、忘れていれば1日に戻す）"""
+        with self._lock:
+            info = self.knowledge["commands"][command]
+            if remembered:
+                interval = min(info.get("review_interval", 1) * 2, self.MAX_REVIEW_INTERVAL_DAYS)
+            else:
+                interval = 1
+            self._schedule_review(command, info, interval)
+            self._mark_dirty()
+            return f"🔁 復習: '{command}' - {info['description']}（次回は{interval}日後）"
 
 class LearningSystem:
     def __init__(self):
@@ -137,9 +373,15 @@ class LearningSystem:
         )
         results.append(exp)
         
-        # ランダムな知識を復習
-        results.append(self.kb.get_random_knowledge())
+        # 期限が来た知識を挙げるだけにする（予定を進めるのは、使った時か review() で結果を記録した時）
+        due = self.kb.due_reviews()
+        for command in due:
+            results.append(f"🔁 復習しよう: '{command}' - {self.kb.knowledge['commands'][command]['description']}")
+        if not due:
+            results.append("今日の復習はありません")
         
+        # 今日学んだ分をまとめて書き出す
+        self.kb.flush()
         return results
 
 if __name__ == "__main__":
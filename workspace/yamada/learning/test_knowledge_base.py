@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+knowledge_base のテスト（一時ディレクトリの知識ファイルを使う）
+
+使い方:
+    python3 -m unittest test_knowledge_base
+"""
+
+import datetime
+import gc
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+import knowledge_base
+from knowledge_base import KnowledgeBase, LearningSystem
+
+class KnowledgeBaseTestCase(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.kb = self.make_kb()
+
+    def make_kb(self, **kwargs):
+        kb = KnowledgeBase(**kwargs)
+        # 一時ディレクトリが消える前に書き出し、終了時の書き出し対象から外す
+        self.addCleanup(kb.close)
+        kb.knowledge_file = os.path.join(self.dir, "knowledge.json")
+        kb.experiences_file = os.path.join(self.dir, "experiences.jsonl")
+        kb.load_knowledge()
+        return kb
+
+class RankingTest(KnowledgeBaseTestCase):
+    def test_ranking_matches_decayed_score(self):
+        now = datetime.datetime.now()
+        usage = {"ls": (50, 30), "git": (3, 0), "grep": (10, 7), "find": (1, 1), "curl": (0, None)}
+        for command, (count, days_ago) in usage.items():
+            self.kb.learn_command(command, command)
+            info = self.kb.knowledge["commands"][command]
+            info["usage_count"] = count
+            if days_ago is not None:
+                info["last_used"] = (now - datetime.timedelta(days=days_ago)).isoformat()
+            self.kb._index_usage(command)
+
+        expected = sorted(
+            (command for command in usage if self.kb.usage_score(command) > 0),
+            key=self.kb.usage_score, reverse=True
+        )
+        self.assertEqual([command for command, _ in self.kb.ranked_commands(limit=10)], expected)
+        self.assertEqual([command for command, _ in self.kb.ranked_commands(limit=2)], expected[:2])
+
+    def test_record_use_moves_command_up(self):
+        self.kb.learn_command("ls", "一覧")
+        self.kb.learn_command("git", "バージョン管理")
+        self.kb.record_use("ls")
+        for _ in range(3):
+            self.kb.record_use("git")
+        self.assertEqual([command for command, _ in self.kb.ranked_commands()], ["git", "ls"])
+
+class ReviewTest(KnowledgeBaseTestCase):
+    def make_due(self, command):
+        self.kb.learn_command(command, command)
+        info = self.kb.knowledge["commands"][command]
+        info["next_review"] = (datetime.datetime.now() - datetime.timedelta(hours=1)).isoformat()
+        self.kb._build_review_queue()
+        return info
+
+    def test_due_items_are_not_rescheduled_without_recall(self):
+        info = self.make_due("ls")
+        due_at = info["next_review"]
+        self.assertEqual(self.kb.due_reviews(), ["ls"])
+        self.assertEqual(self.kb.due_reviews(), ["ls"])
+        self.assertEqual(info["next_review"], due_at)
+
+    def test_daily_learning_only_lists_due_items(self):
+        info = self.make_due("ls")
+        due_at = info["next_review"]
+        system = LearningSystem.__new__(LearningSystem)
+        system.kb = self.kb
+        results = system.daily_learning()
+        self.assertTrue(any("'ls'" in result for result in results))
+        self.assertEqual(info["next_review"], due_at)
+        self.assertEqual(info["review_interval"], 1)
+
+    def test_use_of_due_item_counts_as_review(self):
+        info = self.make_due("ls")
+        self.kb.record_use("ls")
+        self.assertEqual(info["review_interval"], 2)
+        self.assertEqual(self.kb.due_reviews(), [])
+
+    def test_forgotten_item_resets_interval(self):
+        info = self.make_due("ls")
+        info["review_interval"] = 16
+        self.kb.review("ls", remembered=False)
+        self.assertEqual(info["review_interval"], 1)
+
+class WriteBehindTest(KnowledgeBaseTestCase):
+    def test_writes_are_batched(self):
+        kb = self.make_kb(flush_interval=30)
+        for i in range(20):
+            kb.learn_command(f"cmd{i}", "テスト")
+        kb.add_experience("学習", "20件")
+        self.assertFalse(os.path.exists(kb.knowledge_file))
+        kb.flush()
+        reloaded = self.make_kb()
+        self.assertEqual(len(reloaded.knowledge["commands"]), 20)
+        self.assertEqual([e["title"] for e in reloaded.knowledge["experiences"]], ["学習"])
+
+    def test_idle_changes_are_flushed_by_timer(self):
+        kb = self.make_kb(flush_interval=0.1)
+        kb.learn_command("ls", "一覧")
+        # この後に変更がなくても書き出される
+        deadline = time.monotonic() + 5
+        while not os.path.exists(kb.knowledge_file) and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertIn("ls", self.make_kb().knowledge["commands"])
+        with kb._lock:
+            self.assertFalse(kb._dirty)
+
+    def test_context_exit_flushes(self):
+        with self.make_kb(flush_interval=30) as kb:
+            kb.add_skill("python")
+        self.assertEqual(self.make_kb().knowledge["skills"][0]["name"], "python")
+
+    def test_changes_are_flushed_at_exit(self):
+        knowledge_file = os.path.join(self.dir, "knowledge.json")
+        script = (
+            "from knowledge_base import KnowledgeBase\n"
+            "for _ in range(3):\n"
+            "    kb = KnowledgeBase(flush_interval=30)\n"
+            f"kb.knowledge_file = {knowledge_file!r}\n"
+            f"kb.experiences_file = {os.path.join(self.dir, 'experiences.jsonl')!r}\n"
+            "kb.learn_command('ls', '一覧')\n"
+        )
+        subprocess.run([sys.executable, "-c", script], cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+        self.assertIn("ls", self.make_kb().knowledge["commands"])
+
+    def test_instances_are_not_kept_for_exit(self):
+        kb = self.make_kb()
+        kb.close()
+        self.assertNotIn(kb, knowledge_base._open_knowledge_bases)
+        before = len(knowledge_base._open_knowledge_bases)
+        for _ in range(5):
+            KnowledgeBase()
+        gc.collect()
+        self.assertEqual(len(knowledge_base._open_knowledge_bases), before)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+エピソード記憶のマニフェスト
+============================
+日付パーティション (episodes_YYYYMMDD.jsonl) ごとの統計を月単位のシャード
+(manifest_YYYYMM.json) に記録し、検索時にファイルを開かずに不要な
+パーティションを読み飛ばせるようにする
+
+各パーティションの記録内容:
+- first / last: 含まれるエピソードの最古・最新タイムスタンプ
+- lines: エピソード数
+- bytes: ファイルサイズ（追記時に加算、不一致なら再構築）
+- tag_bloom: タグのブルームフィルタ（16進文字列）
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+
+class TagBloomFilter:
+    """タグ集合のブルームフィルタ（プロセス間で安定したハッシュを使用）"""
+
+    SIZE_BITS = 2048
+    NUM_HASHES = 4
+
+    def __init__(self, bits: int = 0):
+        self.bits = bits
+
+    @classmethod
+    def from_hex(cls, value: Optional[str]) -> "TagBloomFilter":
+        return cls(int(value, 16) if value else 0)
+
+    def to_hex(self) -> str:
+        return format(self.bits, "x")
+
+    def _positions(self, tag: str) -> List[int]:
+        digest = hashlib.blake2b(tag.encode("utf-8"), digest_size=4 * self.NUM_HASHES).digest()
+        return [
+            int.from_bytes(digest[i * 4:(i + 1) * 4], "big") % self.SIZE_BITS
+            for i in range(self.NUM_HASHES)
+        ]
+
+    def add(self, tag: str) -> None:
+        for pos in self._positions(tag):
+            self.bits |= 1 << pos
+
+    def might_contain(self, tag: str) -> bool:
+        return all(self.bits >> pos & 1 for pos in self._positions(tag))
+
+    def might_contain_any(self, tags) -> bool:
+        return any(self.might_contain(tag) for tag in tags)
+
+
+class EpisodeManifest:
+    """エピソードパーティションの月次シャード付きマニフェスト"""
+
+    def __init__(self, episodic_path: Path):
+        self.episodic_path = Path(episodic_path)
+        # 月 (YYYYMM) -> {日付 (YYYYMMDD) -> パーティション情報}
+        self._shards: Optional[Dict[str, Dict[str, Dict[str, Any]]]] = None
+        # 月 -> 最後に読み書きした時点のシャードのmtime
+        self._shard_mtimes: Dict[str, int] = {}
+
+    # ---------- 読み書き ----------
+
+    def _shard_path(self, month: str) -> Path:
+        return self.episodic_path / f"manifest_{month}.json"
+
+    def _shard_mtime(self, month: str) -> Optional[int]:
+        try:
+            return self._shard_path(month).stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _read_shard(self, month: str) -> Dict[str, Dict[str, Any]]:
+        path = self._shard_path(month)
+        self._shard_mtimes[month] = self._shard_mtime(month)
+        if path.exists():
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    return json.load(f).get("partitions", {})
+            except (OSError, ValueError):
+                pass
+        return {}
+
+    def _write_shard(self, month: str) -> None:
+        path = self._shard_path(month)
+        tmp_path = path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"month": month, "partitions": self._shards[month]},
+                      f, ensure_ascii=False, sort_keys=True)
+        os.replace(tmp_path, path)
+        self._shard_mtimes[month] = self._shard_mtime(month)
+
+    def _load(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """マニフェストを読み込む（なければ既存ファイルから構築）"""
+        first_load = self._shards is None
+        if first_load:
+            self._shards = {}
+            if not any(self.episodic_path.glob("manifest_*.json")):
+                self.rebuild()
+                first_load = False
+        # 他プロセスが追加・更新したシャードだけを読み直す（月数分のstatのみ）
+        for path in self.episodic_path.glob("manifest_*.json"):
+            month = path.stem[len("manifest_"):]
+            if month not in self._shards or self._shard_mtime(month) != self._shard_mtimes.get(month):
+                self._shards[month] = self._read_shard(month)
+        if first_load:
+            self._reconcile()
+        return self._shards
+
+    def _reconcile(self) -> None:
+        """
+        マニフェストに載っていないパーティションファイルを取り込む（プロセスごとに初回のみ）
+
+        以前の版では、その日の最初の追記の直後に落ちるとファイルだけが残り、
+        検索から見えなくなっていた
+        """
+        known = {date_str for shard in self._shards.values() for date_str in shard}
+        months = set()
+        for file_path in self.episodic_path.glob("episodes_*.jsonl"):
+            date_str = file_path.stem[len("episodes_"):]
+            if date_str in known:
+                continue
+            entry = self._build_entry(date_str)
+            if entry is not None:
+                self._shards.setdefault(date_str[:6], {})[date_str] = entry
+                months.add(date_str[:6])
+        for month in months:
+            self._write_shard(month)
+
+    # ---------- パーティション情報 ----------
+
+    @staticmethod
+    def _new_entry(date_str: str) -> Dict[str, Any]:
+        return {
+            "file": f"episodes_{date_str}.jsonl",
+            "first": None,
+            "last": None,
+            "lines": 0,
+            "bytes": 0,
+            "tag_bloom": ""
+        }
+
+    @staticmethod
+    def _add_to_entry(entry: Dict[str, Any], episode: Dict[str, Any], nbytes: int) -> None:
+        timestamp = episode.get("timestamp")
+        if timestamp:
+            if entry["first"] is None or timestamp < entry["first"]:
+                entry["first"] = timestamp
+            if entry["last"] is None or timestamp > entry["last"]:
+                entry["last"] = timestamp
+        entry["lines"] += 1
+        entry["bytes"] += nbytes
+
+        bloom = TagBloomFilter.from_hex(entry["tag_bloom"])
+        for tag in episode.get("tags", []):
+            bloom.add(tag)
+        entry["tag_bloom"] = bloom.to_hex()
+
+    def _build_entry(self, date_str: str) -> Optional[Dict[str, Any]]:
+        """パーティションファイルを読み直して情報を作り直す"""
+        file_path = self.episodic_path / f"episodes_{date_str}.jsonl"
+        if not file_path.exists():
+            return None
+        entry = self._new_entry(date_str)
+        bloom = TagBloomFilter()
+        with open(file_path, "rb") as f:
+            for raw in f:
+                entry["bytes"] += len(raw)
+                if not raw.strip():
+                    continue
+                episode = json.loads(raw)
+                self._add_to_entry(entry, {"timestamp": episode.get("timestamp")}, 0)
+                for tag in episode.get("tags", []):
+                    bloom.add(tag)
+        entry["tag_bloom"] = bloom.to_hex()
+        return entry
+
+    def ensure_partition(self, date_str: str) -> None:
+        """
+        パーティションへ追記する前に、マニフェストに載っていることを保証する
+
+        その日の最初の追記でだけシャードを書く。追記の直後に落ちても、記録と
+        ファイルサイズが食い違うので refresh_if_stale() で作り直される
+        """
+        shards = self._load()
+        month = date_str[:6]
+        if date_str in shards.get(month, {}):
+            return
+        if self._shard_mtime(month) != self._shard_mtimes.get(month):
+            shards[month] = self._read_shard(month)
+            if date_str in shards[month]:
+                return
+        shards.setdefault(month, {})[date_str] = self._build_entry(date_str) or self._new_entry(date_str)
+        self._write_shard(month)
+
+    def record_append(self, date_str: str, episode: Dict[str, Any], nbytes: int) -> None:
+        """追記したエピソードをマニフェストに反映"""
+        self.record_appends(date_str, [(episode, nbytes)])
+
+    def record_appends(self, date_str: str, appended: List[Tuple[Dict[str, Any], int]]) -> None:
+        """
+        同じパーティションにまとめて追記したエピソードを反映（シャードの書き込みは1回）
+
+        Args:
+            appended: (エピソード, 書き込んだバイト数) のリスト
+        """
+        if self._shards is None:
+            self._load()
+        shards = self._shards
+        month = date_str[:6]
+        # 他プロセスが更新していれば取り込んでから書き戻す
+        if month not in shards or self._shard_mtime(month) != self._shard_mtimes.get(month):
+            shards[month] = self._read_shard(month)
+        entry = shards[month].get(date_str)
+        if entry is None:
+            # 追記前からファイルがあった場合は現状から構築
+            entry = self._build_entry(date_str)
+            if entry is not None:
+                entry["bytes"] -= sum(nbytes for _, nbytes in appended)
+                entry["lines"] -= len(appended)
+            else:
+                entry = self._new_entry(date_str)
+        try:
+            size = (self.episodic_path / entry["file"]).stat().st_size
+        except OSError:
+            size = None
+        # 初回構築時などで今回の追記分がすでに反映済みなら加算しない
+        if size is None or entry["bytes"] != size:
+            for episode, nbytes in appended:
+                self._add_to_entry(entry, episode, nbytes)
+        shards[month][date_str] = entry
+        self._write_shard(month)
+
+    def partitions(self, reverse: bool = False) -> List[Tuple[str, Dict[str, Any]]]:
+        """(日付, パーティション情報) を日付順に返す"""
+        shards = self._load()
+        items = [
+            (date_str, entry)
+            for shard in shards.values()
+            for date_str, entry in shard.items()
+        ]
+        items.sort(key=lambda item: item[0], reverse=reverse)
+        return items
+
+    def refresh_if_stale(self, date_str: str, entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """ファイルサイズが記録と異なれば（外部からの追記など）情報を作り直す"""
+        file_path = self.episodic_path / entry["file"]
+        try:
+            size = file_path.stat().st_size
+        except OSError:
+            return None
+        if size == entry["bytes"]:
+            return entry
+
+        rebuilt = self._build_entry(date_str)
+        month = date_str[:6]
+        self._shards.setdefault(month, {})[date_str] = rebuilt
+        self._write_shard(month)
+        return rebuilt
+
+    @staticmethod
+    def may_match(entry: Dict[str, Any], tags=None, since: str = None,
+                  until: str = None) -> bool:
+        """
+        パーティションが条件に一致する可能性があるか
+
+        Args:
+            tags: いずれかのタグを含む可能性があるか（ブルームフィルタ）
+            since / until: ISO形式の期間（両端を含む）
+        """
+        if since and entry.get("last") and entry["last"] < since:
+            return False
+        if until and entry.get("first") and entry["first"] > until:
+            return False
+        if tags is not None:
+            return TagBloomFilter.from_hex(entry.get("tag_bloom")).might_contain_any(tags)
+        return True
+
+    def rebuild(self) -> None:
+        """すべてのパーティションファイルからマニフェストを再構築"""
+        self._shards = {}
+        for file_path in sorted(self.episodic_path.glob("episodes_*.jsonl")):
+            date_str = file_path.stem[len("episodes_"):]
+            entry = self._build_entry(date_str)
+            if entry is not None:
+                self._shards.setdefault(date_str[:6], {})[date_str] = entry
+        for month in self._shards:
+            self._write_shard(month)
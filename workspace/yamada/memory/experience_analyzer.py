@@ -9,6 +9,7 @@ from pathlib import Path
 from datetime import datetime
 from collections import Counter
 from memory_system import MemorySystem
+from project_catalog import ProjectCatalog, CATEGORY_KEYWORDS
 
 class ExperienceAnalyzer:
     """過去の経験を分析して学習"""
@@ -17,92 +18,148 @@ class ExperienceAnalyzer:
         self.memory = MemorySystem()
         self.projects_path = Path("/Users/claude/workspace/yamada/projects")
         self.logs_path = Path("/Users/claude/workspace/yamada/logs")
+        # 分析済みログと集計値のチェックポイント（記憶ディレクトリ直下のドキュメント）
+        self.checkpoint_name = "analyzer_checkpoint.json"
+        # プロジェクトの分類結果キャッシュ（変更されたファイルだけ再処理）
+        self.catalog = ProjectCatalog(
+            self.projects_path, self.memory.base_path / "project_catalog.json"
+        )
+    
+    def _load_checkpoint(self):
+        """ログ分析のチェックポイントを読み込む"""
+        checkpoint = self.memory.load_document(self.checkpoint_name)
+        if checkpoint is not None:
+            return checkpoint
+        return {
+            "processed_logs": [],
+            "task_counts": {},
+            "energy_delta_sum": 0,
+            "energy_delta_count": 0,
+            "final_energy": None,
+            "skill_trajectories": {},
+            "updated_at": None
+        }
+    
+    def _save_checkpoint(self, checkpoint):
+        """チェックポイントを保存（トランザクション中は記憶と一緒に確定）"""
+        checkpoint["updated_at"] = datetime.now().isoformat()
+        self.memory.save_document(self.checkpoint_name, checkpoint)
+    
+    def _fold_log(self, checkpoint, log_name, data):
+        """1つのログを集計値に畳み込む"""
+        work_log = data.get("work_log", [])
+        
+        # タスクパターン
+        task_counts = checkpoint["task_counts"]
+        for item in work_log:
+            task_counts[item["task"]] = task_counts.get(item["task"], 0) + 1
+        
+        # エネルギー変化（ログ内の連続する作業間）
+        for prev, curr in zip(work_log, work_log[1:]):
+            checkpoint["energy_delta_sum"] += curr["energy_after"] - prev["energy_after"]
+            checkpoint["energy_delta_count"] += 1
+        
+        if "final_energy" in data:
+            checkpoint["final_energy"] = data["final_energy"]
+        
+        # スキルの推移
+        for skill, level in data.get("final_skills", {}).items():
+            checkpoint["skill_trajectories"].setdefault(skill, []).append([log_name, level])
+        
+        checkpoint["processed_logs"].append(log_name)
     
     def analyze_autonomous_log(self):
-        """自律的活動ログを分析"""
-        log_file = self.logs_path / "autonomous_20250829_141707.json"
+        """
+        自律的活動ログを分析
         
-        if log_file.exists():
-            with open(log_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            
-            print("\n=== 自律的活動ログ分析 ===")
-            
-            # タスクパターン分析
-            tasks = [item["task"] for item in data["work_log"]]
-            task_counts = Counter(tasks)
-            
-            print("\n実行したタスク:")
-            for task, count in task_counts.most_common():
-                print(f"  - {task}: {count}回")
-            
-            # エネルギー変化分析
-            energy_changes = []
-            for i, item in enumerate(data["work_log"]):
-                if i > 0:
-                    prev_energy = data["work_log"][i-1]["energy_after"]
-                    curr_energy = item["energy_after"]
-                    energy_changes.append(curr_energy - prev_energy)
-            
-            if energy_changes:
-                avg_change = sum(energy_changes) / len(energy_changes)
-                print(f"\n平均エネルギー変化: {avg_change:.1f}")
-                print(f"最終エネルギー: {data['final_energy']}")
-            
-            # スキル成長分析
-            print("\n最終スキルレベル:")
-            for skill, level in data["final_skills"].items():
-                bar = "■" * int(level * 10)
-                print(f"  {skill:12} {bar} {level:.1f}")
-            
-            # 学習パターンを記憶に保存
-            self.memory.learn_concept(
-                "自律的活動パターン",
-                {
-                    "主要タスク": list(task_counts.keys()),
-                    "エネルギー管理": "タスク実行によりエネルギーが減少",
-                    "学習効果": "繰り返しによりスキルが向上"
-                },
-                ["Web検索での調査", "アルゴリズム学習"]
-            )
-            
-            # 内省を記録
-            self.memory.reflect_on_thinking(
-                "過去のログから、私は探索と学習を繰り返すパターンを持っている",
-                "このパターンを意識的に活用して成長を加速する",
-                "パターン認識成功"
-            )
+        logs/autonomous_*.json をすべて対象とし、チェックポイントに記録済みの
+        ログは読み直さずに新しいログだけを集計値に畳み込む。
+        （ログは実行終了後に書き換えられない前提）
+        
+        Returns:
+            新たに分析したログの数
+        """
+        checkpoint = self._load_checkpoint()
+        processed = set(checkpoint["processed_logs"])
+        
+        # ファイル名に時刻が入っているので名前順が時系列順
+        new_logs = [
+            log_file for log_file in sorted(self.logs_path.glob("autonomous_*.json"))
+            if log_file.name not in processed
+        ]
+        
+        for log_file in new_logs:
+            try:
+                with open(log_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ ログを読み込めません: {log_file.name} ({e})")
+                continue
+            self._fold_log(checkpoint, log_file.name, data)
+        
+        if new_logs:
+            self._save_checkpoint(checkpoint)
+        
+        if not checkpoint["processed_logs"]:
+            return 0
+        
+        print("\n=== 自律的活動ログ分析 ===")
+        print(f"\n分析済みログ: {len(checkpoint['processed_logs'])}件（今回の新規: {len(new_logs)}件）")
+        
+        task_counts = Counter(checkpoint["task_counts"])
+        print("\n実行したタスク:")
+        for task, count in task_counts.most_common():
+            print(f"  - {task}: {count}回")
+        
+        if checkpoint["energy_delta_count"]:
+            avg_change = checkpoint["energy_delta_sum"] / checkpoint["energy_delta_count"]
+            print(f"\n平均エネルギー変化: {avg_change:.1f}")
+            print(f"最終エネルギー: {checkpoint['final_energy']}")
+        
+        # スキル成長分析（最新値と最初のログからの変化）
+        print("\n最終スキルレベル:")
+        for skill, trajectory in checkpoint["skill_trajectories"].items():
+            level = trajectory[-1][1]
+            delta = level - trajectory[0][1]
+            bar = "■" * int(level * 10)
+            print(f"  {skill:12} {bar} {level:.1f} ({delta:+.2f})")
+        
+        # 新しいログがなければ記憶は更新しない
+        if not new_logs:
+            return 0
+        
+        # 学習パターンを記憶に保存
+        self.memory.learn_concept(
+            "自律的活動パターン",
+            {
+                "主要タスク": list(task_counts.keys()),
+                "エネルギー管理": "タスク実行によりエネルギーが減少",
+                "学習効果": "繰り返しによりスキルが向上"
+            },
+            ["Web検索での調査", "アルゴリズム学習"]
+        )
+        
+        # 内省を記録
+        self.memory.reflect_on_thinking(
+            "過去のログから、私は探索と学習を繰り返すパターンを持っている",
+            "このパターンを意識的に活用して成長を加速する",
+            "パターン認識成功"
+        )
+        
+        return len(new_logs)
     
     def analyze_created_projects(self):
         """作成したプロジェクトを分析"""
-        projects = list(self.projects_path.glob("*.html"))
+        projects = self.catalog.refresh()
         
         print("\n=== 作成プロジェクト分析 ===")
         print(f"\n総プロジェクト数: {len(projects)}")
         
-        # プロジェクトをカテゴリ分類
-        categories = {
-            "ゲーム": [],
-            "アート": [],
-            "音楽": [],
-            "インタラクティブ": [],
-            "実験的": []
-        }
-        
-        for project in projects:
-            name = project.stem
-            
-            # キーワードベースの分類
-            if any(word in name for word in ["game", "snake", "adventure", "universe"]):
-                categories["ゲーム"].append(name)
-            if any(word in name for word in ["art", "creative", "garden", "mandelbrot"]):
-                categories["アート"].append(name)
-            if any(word in name for word in ["music", "sound", "symphony"]):
-                categories["音楽"].append(name)
-            if any(word in name for word in ["particle", "wave", "fluid", "evolution"]):
-                categories["インタラクティブ"].append(name)
-            if any(word in name for word in ["ma_space", "zen", "kaomoji", "emoji"]):
-                categories["実験的"].append(name)
+        # プロジェクトをカテゴリ分類（カタログにキャッシュ済みの結果を使う）
+        categories = {category: [] for category in CATEGORY_KEYWORDS}
+        for entry in projects.values():
+            for category in entry["categories"]:
+                categories[category].append(entry["name"])
         
         print("\nカテゴリ別分類:")
         for category, items in categories.items():
@@ -126,7 +183,7 @@ class ExperienceAnalyzer:
         ]
         
         for stage, examples, description in evolution_stages:
-            existing = [e for e in examples if (self.projects_path / f"{e}.html").exists()]
+            existing = [e for e in examples if f"{e}.html" in projects]
             if existing:
                 print(f"\n{stage}: {description}")
                 print(f"  例: {', '.join(existing)}")
@@ -139,7 +196,7 @@ class ExperienceAnalyzer:
                 "特徴": "複雑さから単純さへ、技術から芸術へ",
                 "学習": "シンプルで楽しいものに価値がある"
             },
-            [p.stem for p in projects[:5]]
+            [entry["name"] for entry in list(projects.values())[:5]]
         )
     
     def extract_design_patterns(self):
@@ -216,7 +273,7 @@ class ExperienceAnalyzer:
         """分析結果のサマリーを保存"""
         summary = {
             "analysis_date": datetime.now().isoformat(),
-            "total_projects": len(list(self.projects_path.glob("*.html"))),
+            "total_projects": len(self.catalog.refresh()),
             "key_patterns": [
                 "自律的探索と学習",
                 "創造的進化",
@@ -226,11 +283,9 @@ class ExperienceAnalyzer:
             "meta_insight": "抽象思考と具体実装の統合が次の成長段階"
         }
         
-        summary_path = self.memory.base_path / "analysis_summary.json"
-        with open(summary_path, "w", encoding="utf-8") as f:
-            json.dump(summary, f, ensure_ascii=False, indent=2)
+        self.memory.save_document("analysis_summary.json", summary)
         
-        print(f"\n分析サマリーを保存: {summary_path}")
+        print(f"\n分析サマリーを保存: {self.memory.base_path / 'analysis_summary.json'}")
 
 
 def main():
@@ -240,25 +295,26 @@ def main():
     print("経験分析システム - 過去から学び、未来を創る")
     print("=" * 50)
     
-    # 各種分析を実行
-    analyzer.analyze_autonomous_log()
-    analyzer.analyze_created_projects()
-    analyzer.extract_design_patterns()
-    insights = analyzer.generate_meta_insights()
-    
-    # サマリー保存
-    analyzer.save_analysis_summary()
-    
-    # 最終的な内省
-    analyzer.memory.record_episode(
-        "包括的な自己分析を完了",
-        {
-            "projects_analyzed": len(list(analyzer.projects_path.glob("*.html"))),
-            "insights_generated": len(insights),
-            "growth_stage": "メタ認知的自覚"
-        },
-        0.9  # 高い達成感
-    )
+    # 各種分析を実行（記憶への書き込みはすべて最後に一括で確定、途中で失敗したら何も残さない）
+    with analyzer.memory.transaction():
+        analyzer.analyze_autonomous_log()
+        analyzer.analyze_created_projects()
+        analyzer.extract_design_patterns()
+        insights = analyzer.generate_meta_insights()
+        
+        # サマリー保存
+        analyzer.save_analysis_summary()
+        
+        # 最終的な内省
+        analyzer.memory.record_episode(
+            "包括的な自己分析を完了",
+            {
+                "projects_analyzed": len(analyzer.catalog.refresh()),
+                "insights_generated": len(insights),
+                "growth_stage": "メタ認知的自覚"
+            },
+            0.9  # 高い達成感
+        )
     
     print("\n\n=== 分析完了 ===")
     print("過去の経験から学び、パターンを認識し、")
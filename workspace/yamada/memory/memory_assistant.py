@@ -5,15 +5,20 @@
 
 import sys
 import json
-from datetime import datetime
-from pathlib import Path
-from memory_system import MemorySystem
+
+from memory_client import MemoryClient
 
 class MemoryAssistant:
     """記憶システムとの対話を管理"""
     
-    def __init__(self):
-        self.memory = MemorySystem()
+    def __init__(self, json_output=False):
+        """
+        Args:
+            json_output: Trueなら各コマンドの結果をJSON（1コマンド1行）で出力
+        """
+        # 記憶システムは最初に必要になった時点で構築する（help等の起動を軽く）
+        self.client = MemoryClient()
+        self.json_output = json_output
         self.commands = {
             "remember": self.remember,
             "recall": self.recall,
@@ -24,31 +29,50 @@ class MemoryAssistant:
             "help": self.show_help
         }
     
+    @property
+    def memory(self):
+        """記憶システム（遅延初期化、バッチ内の全コマンドで共有）"""
+        return self.client.memory
+    
+    def _emit(self, command, result):
+        """JSONモードで結果を1行のJSONとして出力"""
+        print(json.dumps({"command": command, **result}, ensure_ascii=False, default=str))
+    
+    def _usage(self, command, message):
+        """使用法エラーを表示"""
+        if self.json_output:
+            self._emit(command, {"error": message})
+        else:
+            print(message)
+    
     def remember(self, args):
         """エピソードを記憶"""
         if len(args) < 1:
-            print("使用法: remember <イベント> [感情値 -1.0〜1.0]")
+            self._usage("remember", "使用法: remember <イベント> [感情値 -1.0〜1.0]")
             return
         
         event = " ".join(args[:-1]) if len(args) > 1 and self._is_float(args[-1]) else " ".join(args)
         emotion = float(args[-1]) if len(args) > 1 and self._is_float(args[-1]) else 0.0
         
-        self.memory.record_episode(
-            event,
-            {"source": "command_line", "timestamp": datetime.now().isoformat()},
-            emotion
-        )
+        result = self.client.remember(event, emotion)
+        if self.json_output:
+            self._emit("remember", result)
+            return
         print(f"✓ 記憶しました: {event} (感情値: {emotion})")
     
     def recall(self, args):
         """記憶を想起"""
         if len(args) < 1:
-            print("使用法: recall <検索クエリ>")
+            self._usage("recall", "使用法: recall <検索クエリ>")
             return
         
         query = " ".join(args)
-        episodes = self.memory.recall_episodes(query, limit=5)
+        result = self.client.recall(query, limit=5)
+        if self.json_output:
+            self._emit("recall", result)
+            return
         
+        episodes = result["episodes"]
         if episodes:
             print(f"\n「{query}」に関連する記憶:")
             for i, episode in enumerate(episodes, 1):
@@ -64,35 +88,40 @@ class MemoryAssistant:
     def learn(self, args):
         """概念を学習"""
         if len(args) < 2:
-            print("使用法: learn <概念> <説明>")
+            self._usage("learn", "使用法: learn <概念> <説明>")
             return
         
         concept = args[0]
         description = " ".join(args[1:])
         
-        self.memory.learn_concept(
-            concept,
-            {"description": description, "learned_at": datetime.now().isoformat()},
-            []
-        )
+        result = self.client.learn(concept, description)
+        if self.json_output:
+            self._emit("learn", result)
+            return
         print(f"✓ 概念「{concept}」を学習しました")
     
     def reflect(self, args):
         """思考プロセスを内省"""
         if len(args) < 2:
-            print("使用法: reflect <思考プロセス> <決定>")
+            self._usage("reflect", "使用法: reflect <思考プロセス> <決定>")
             return
         
         # 最後の要素を決定として扱う
         thought_process = " ".join(args[:-1])
         decision = args[-1]
         
-        self.memory.reflect_on_thinking(thought_process, decision)
+        result = self.client.reflect(thought_process, decision)
+        if self.json_output:
+            self._emit("reflect", result)
+            return
         print(f"✓ 内省を記録しました")
     
     def analyze(self, args):
         """パターンを分析"""
-        patterns = self.memory.analyze_patterns()
+        patterns = self.client.analyze()
+        if self.json_output:
+            self._emit("analyze", patterns)
+            return
         
         print("\n=== 行動パターン分析 ===")
         
@@ -118,8 +147,12 @@ class MemoryAssistant:
     
     def show_insights(self, args):
         """洞察を表示"""
-        insights = self.memory.generate_insights()
+        result = self.client.insights()
+        if self.json_output:
+            self._emit("insights", result)
+            return
         
+        insights = result["insights"]
         print("\n=== 生成された洞察 ===")
         if insights:
             for insight in insights:
@@ -129,6 +162,9 @@ class MemoryAssistant:
     
     def show_help(self, args):
         """ヘルプを表示"""
+        if self.json_output:
+            self._emit("help", {"commands": sorted(self.commands)})
+            return
         print("""
 === 記憶アシスタント コマンド一覧 ===
 
@@ -152,6 +188,12 @@ insights
 
 help
   このヘルプを表示
+
+batch -c <コマンド> [-c <コマンド> ...]
+  複数のコマンドを1プロセスでまとめて実行（-c省略時は標準入力から1行1コマンド）
+
+--json <コマンド>
+  コマンドの前に付ける。結果をJSON（1コマンド1行）で出力
         """)
     
     def _is_float(self, s):
@@ -173,18 +215,80 @@ help
         
         if command in self.commands:
             self.commands[command](args)
+        elif self.json_output:
+            self._emit(command, {"error": f"不明なコマンド: {command}"})
         else:
             print(f"不明なコマンド: {command}")
             print("'help' でコマンド一覧を表示")
+    
+    def run_batch(self, command_lines):
+        """複数のコマンドを同じ記憶システムで順に実行"""
+        for command_line in command_lines:
+            command_line = command_line.strip()
+            if not command_line or command_line.startswith("#"):
+                continue
+            try:
+                self.run(command_line)
+            except Exception as e:
+                if self.json_output:
+                    self._emit(command_line.split()[0].lower(), {"error": str(e)})
+                else:
+                    print(f"エラー: {command_line}: {e}")
+
+
+BATCH_USAGE = "使用法: batch -c <コマンド> [-c <コマンド> ...]"
+
+
+def parse_batch_args(args):
+    """
+    batchモードの引数から -c で渡されたコマンドを取り出す
+
+    Raises:
+        ValueError: -c 以外の引数や、値のない -c があった場合
+    """
+    command_lines = []
+    i = 0
+    while i < len(args):
+        if args[i] not in ("-c", "--command"):
+            raise ValueError(f"不明な引数: {args[i]}")
+        if i + 1 >= len(args):
+            raise ValueError(f"{args[i]} のコマンドを指定してください")
+        command_lines.append(args[i + 1])
+        i += 2
+    return command_lines
+
+
+def parse_leading_options(args):
+    """
+    コマンドより前にある --json を取り出し (JSON出力するか, 残りの引数) を返す
+
+    コマンド以降の引数はそのまま渡す（記憶や検索語に含まれる "--json" を消さない）
+    """
+    json_output = False
+    while args and args[0] == "--json":
+        json_output = True
+        args = args[1:]
+    return json_output, args
 
 
 def main():
     """メインエントリーポイント"""
-    assistant = MemoryAssistant()
+    json_output, argv = parse_leading_options(sys.argv[1:])
+    assistant = MemoryAssistant(json_output=json_output)
     
-    if len(sys.argv) > 1:
+    if argv and argv[0] == "batch":
+        # バッチモード: -c で渡されたコマンド、なければ標準入力の各行を実行
+        try:
+            command_lines = parse_batch_args(argv[1:])
+        except ValueError as e:
+            assistant._usage("batch", f"{e}\n{BATCH_USAGE}")
+            sys.exit(2)
+        if not command_lines:
+            command_lines = sys.stdin
+        assistant.run_batch(command_lines)
+    elif argv:
         # コマンドライン引数から実行
-        command_line = " ".join(sys.argv[1:])
+        command_line = " ".join(argv)
         assistant.run(command_line)
     else:
         # インタラクティブモード
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+記憶クライアント - 他のプログラムから記憶システムを直接使うためのAPI
+
+memory_assistant.py の各コマンドと同じ構造の辞書を、サブプロセスや
+標準出力の解析なしにプロセス内で返す。
+
+使用例:
+    import sys
+    sys.path.insert(0, "/Users/claude/workspace/yamada/memory")
+    from memory_client import MemoryClient
+
+    client = MemoryClient()
+    print(client.insights()["insights"])
+"""
+
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+
+class MemoryClient:
+    """記憶システムへのプロセス内クライアント"""
+
+    def __init__(self, memory=None):
+        """
+        Args:
+            memory: 使用するMemorySystem（省略時は最初の利用時に既定の場所で構築）
+        """
+        self._memory = memory
+
+    @property
+    def memory(self):
+        """記憶システム（遅延初期化）"""
+        if self._memory is None:
+            from memory_system import MemorySystem
+            self._memory = MemorySystem()
+        return self._memory
+
+    def remember(self, event: str, emotional_valence: float = 0.0,
+                 context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """エピソードを記憶"""
+        if context is None:
+            context = {"source": "command_line", "timestamp": datetime.now().isoformat()}
+        self.memory.record_episode(event, context, emotional_valence)
+        return {"event": event, "emotional_valence": emotional_valence}
+
+    def recall(self, query: str, limit: int = 5) -> Dict[str, Any]:
+        """関連する記憶を想起（直近のワーキングメモリを優先）"""
+        episodes = self.memory.recall_working(query, limit=limit)
+        return {"query": query, "episodes": episodes}
+
+    def learn(self, concept: str, description: str) -> Dict[str, Any]:
+        """概念を学習"""
+        self.memory.learn_concept(
+            concept,
+            {"description": description, "learned_at": datetime.now().isoformat()},
+            []
+        )
+        return {"concept": concept, "description": description}
+
+    def reflect(self, thought_process: str, decision: str,
+                outcome: Optional[str] = None) -> Dict[str, Any]:
+        """思考プロセスを内省記録"""
+        self.memory.reflect_on_thinking(thought_process, decision, outcome)
+        return {"thought_process": thought_process, "decision": decision, "outcome": outcome}
+
+    def analyze(self) -> Dict[str, Any]:
+        """行動パターンを分析"""
+        return self.memory.analyze_patterns()
+
+    def insights(self) -> Dict[str, Any]:
+        """蓄積データから洞察を生成"""
+        return {"insights": self.memory.generate_insights()}
@@ -11,39 +11,165 @@
 - メタ認知: 自己の思考プロセスを観察
 """
 
-import json
-import os
+import copy
+from collections import deque
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Any, Optional
 import hashlib
 import re
 
+from storage_backend import StorageBackend, JsonDirectoryBackend, TransactionalBackend
+
+class OrderedSet:
+    """挿入順を保つ集合（dictのキーで実装）"""
+    
+    def __init__(self, items=()):
+        self._items = dict.fromkeys(items)
+    
+    def add(self, item) -> None:
+        self._items[item] = None
+    
+    def update(self, items) -> None:
+        for item in items:
+            self._items[item] = None
+    
+    def __contains__(self, item) -> bool:
+        return item in self._items
+    
+    def __iter__(self):
+        return iter(self._items)
+    
+    def __len__(self) -> int:
+        return len(self._items)
+    
+    def __repr__(self) -> str:
+        return f"OrderedSet({list(self._items)!r})"
+
+
+class WorkingMemory:
+    """
+    ワーキングメモリ（固定長のリングバッファ）
+    
+    追加・退避はdeque(maxlen)でO(1)。各エピソードの顕著性は感情価の強さと
+    新しさから算出し、想起時の順位付けに使う。
+    """
+    
+    # 何件前の記憶で新しさの重みが半分になるか
+    RECENCY_HALF_LIFE = 5
+    
+    def __init__(self, capacity: int = 10):
+        self.capacity = capacity
+        # (エピソード, タグ集合) のペア
+        self._items = deque(maxlen=capacity)
+    
+    def append(self, episode: Dict[str, Any]) -> None:
+        self._items.append((episode, frozenset(episode.get("tags", []))))
+    
+    def __len__(self) -> int:
+        return len(self._items)
+    
+    def __iter__(self):
+        return (episode for episode, _ in self._items)
+    
+    def salience(self, age: int, emotional_valence: float) -> float:
+        """
+        顕著性スコア (0〜1)
+        
+        Args:
+            age: 何件前の記憶か（最新が0）
+            emotional_valence: 感情価 (-1.0 to 1.0)
+        """
+        intensity = 0.5 + 0.5 * min(abs(emotional_valence), 1.0)
+        recency = 0.5 ** (age / self.RECENCY_HALF_LIFE)
+        return intensity * recency
+    
+    def search(self, query_tags: List[str], relevance_fn) -> List[Dict]:
+        """クエリに関連するエピソードを（関連性×顕著性）の降順で返す"""
+        hits = []
+        last = len(self._items) - 1
+        for index, (episode, tags) in enumerate(self._items):
+            relevance = relevance_fn(query_tags, tags)
+            if relevance > 0:
+                salience = self.salience(last - index, episode.get("emotional_valence", 0))
+                hit = dict(episode)
+                hit["relevance_score"] = relevance
+                hit["salience"] = salience
+                hits.append(hit)
+        hits.sort(key=lambda x: x["relevance_score"] * x["salience"], reverse=True)
+        return hits
+
+
 class MemorySystem:
     """山田の統合記憶システム"""
     
-    def __init__(self, base_path: str = "/Users/claude/workspace/yamada/memory"):
+    def __init__(self, base_path: str = "/Users/claude/workspace/yamada/memory",
+                 backend: Optional[StorageBackend] = None,
+                 working_memory_size: int = 10):
+        """
+        Args:
+            base_path: JSONディレクトリ構成の保存先
+            backend: 使用するストレージバックエンド（省略時はbase_pathのJSONディレクトリ）
+            working_memory_size: ワーキングメモリに保持するエピソード数
+        """
         self.base_path = Path(base_path)
-        self.base_path.mkdir(parents=True, exist_ok=True)
         
-        # 各記憶タイプのパス
-        self.episodic_path = self.base_path / "episodic"
-        self.semantic_path = self.base_path / "semantic"  
-        self.procedural_path = self.base_path / "procedural"
-        self.metacognitive_path = self.base_path / "metacognitive"
+        # 永続化はすべてバックエンド経由
+        self.backend = backend if backend is not None else JsonDirectoryBackend(base_path)
         
-        # ディレクトリ作成
-        for path in [self.episodic_path, self.semantic_path, 
-                     self.procedural_path, self.metacognitive_path]:
-            path.mkdir(exist_ok=True)
+        # 意味記憶のキャッシュ（概念ID -> (バックエンド上の版, 順序付き集合を含むメモリ上の表現)）
+        # 版が変わっていれば他のプロセスが書き込んだとみなして読み直す
+        self._concept_cache: Dict[str, tuple] = {}
         
         # 現在のコンテキスト
         self.current_context = {
             "session_id": self._generate_session_id(),
             "start_time": datetime.now().isoformat(),
-            "working_memory": []
+            "working_memory": WorkingMemory(working_memory_size)
         }
     
+    @contextmanager
+    def transaction(self):
+        """
+        ブロック内の書き込みをすべてメモリ上に溜め、最後にまとめて反映する
+        
+        例外が起きた場合は何も書き込まず、概念キャッシュとワーキングメモリも
+        開始時点に戻す。入れ子にした場合は外側のトランザクションに合流する。
+        
+        使用例:
+            with memory.transaction():
+                memory.learn_concept(...)
+                memory.reflect_on_thinking(...)
+        """
+        if isinstance(self.backend, TransactionalBackend):
+            yield self
+            return
+        
+        inner = self.backend
+        working_memory = self.current_context["working_memory"]
+        saved_working = list(working_memory._items)
+        self.backend = TransactionalBackend(inner)
+        try:
+            yield self
+            staged = self.backend
+            self.backend = inner
+            staged.commit()
+        except BaseException:
+            self.backend = inner
+            self._concept_cache = {}
+            working_memory._items.clear()
+            working_memory._items.extend(saved_working)
+            raise
+    
+    def load_document(self, name: str) -> Optional[Dict]:
+        """記憶ディレクトリ直下の補助ドキュメント（JSON）を読み込む"""
+        return self.backend.get_document(name)
+    
+    def save_document(self, name: str, data: Dict[str, Any]) -> None:
+        """補助ドキュメントを保存（トランザクション中はコミット時に反映）"""
+        self.backend.put_document(name, data)
+    
     def _generate_session_id(self) -> str:
         """セッションIDを生成"""
         timestamp = datetime.now().isoformat()
@@ -70,17 +196,26 @@ class MemorySystem:
             "tags": self._extract_tags(event)
         }
         
-        # 日付ごとにファイル分割
-        date_str = datetime.now().strftime("%Y%m%d")
-        file_path = self.episodic_path / f"episodes_{date_str}.jsonl"
-        
-        with open(file_path, "a", encoding="utf-8") as f:
-            f.write(json.dumps(episode, ensure_ascii=False) + "\n")
+        self.backend.append_episode(episode)
         
-        # ワーキングメモリに追加
+        # ワーキングメモリに追加（容量を超えた古いものは自動的に退避）
         self.current_context["working_memory"].append(episode)
-        if len(self.current_context["working_memory"]) > 10:
-            self.current_context["working_memory"].pop(0)
+    
+    def recall_working(self, query: str, limit: int = 10) -> List[Dict]:
+        """
+        ワーキングメモリから優先的に想起し、そこに何もなければ長期記憶を検索
+        
+        Args:
+            query: 検索クエリ
+            limit: 最大取得数
+        """
+        query_tags = self._extract_tags(query)
+        hits = self.current_context["working_memory"].search(
+            query_tags, self._calculate_relevance
+        )
+        if hits:
+            return hits[:limit]
+        return self.recall_episodes(query, limit=limit)
     
     def recall_episodes(self, query: str, limit: int = 10) -> List[Dict]:
         """
@@ -93,16 +228,16 @@ class MemorySystem:
         episodes = []
         query_tags = self._extract_tags(query)
         
-        # すべてのエピソードファイルを検索
-        for file_path in sorted(self.episodic_path.glob("episodes_*.jsonl"), reverse=True):
-            with open(file_path, "r", encoding="utf-8") as f:
-                for line in f:
-                    episode = json.loads(line)
-                    # タグマッチングによる関連性スコア
-                    relevance = self._calculate_relevance(query_tags, episode.get("tags", []))
-                    if relevance > 0:
-                        episode["relevance_score"] = relevance
-                        episodes.append(episode)
+        if not query_tags:
+            return []
+        
+        # クエリのタグを含み得るエピソードを新しい順に検索
+        for episode in self.backend.scan("episodes", reverse=True, tags=query_tags):
+            # タグマッチングによる関連性スコア
+            relevance = self._calculate_relevance(query_tags, episode.get("tags", []))
+            if relevance > 0:
+                episode["relevance_score"] = relevance
+                episodes.append(episode)
         
         # 関連性でソート
         episodes.sort(key=lambda x: x.get("relevance_score", 0), reverse=True)
@@ -120,52 +255,65 @@ class MemorySystem:
             attributes: 概念の属性
             examples: 具体例
         """
+        self.merge_concept_attributes(concept, [attributes], examples)
+    
+    def merge_concept_attributes(self, concept: str, 
+                                 attribute_updates: List[Dict[str, Any]],
+                                 examples: List[str] = None) -> None:
+        """
+        複数の属性更新をまとめて概念にマージ（読み込み・保存は1回）
+        
+        リスト属性と具体例は挿入順を保つ集合として保持するため、
+        1要素あたりの追加コストは償却O(1)で、既存の順序も失われない。
+        
+        Args:
+            concept: 概念名
+            attribute_updates: 順に適用する属性の辞書のリスト
+            examples: 具体例
+        """
         concept_id = self._normalize_concept_name(concept)
-        file_path = self.semantic_path / f"{concept_id}.json"
+        existing = self._load_concept(concept_id)
+        now = datetime.now().isoformat()
         
         # 既存の概念があれば更新、なければ新規作成
-        if file_path.exists():
-            with open(file_path, "r", encoding="utf-8") as f:
-                existing = json.load(f)
-            existing["last_updated"] = datetime.now().isoformat()
+        if existing is not None:
+            existing["last_updated"] = now
             existing["revision_count"] = existing.get("revision_count", 0) + 1
-            
-            # 属性をマージ
-            for key, value in attributes.items():
-                if key in existing["attributes"]:
-                    # リストならextend、それ以外は上書き
-                    if isinstance(existing["attributes"][key], list) and isinstance(value, list):
-                        existing["attributes"][key].extend(value)
-                        existing["attributes"][key] = list(set(existing["attributes"][key]))
-                    else:
-                        existing["attributes"][key] = value
-                else:
-                    existing["attributes"][key] = value
-            
-            # 例を追加
-            if examples:
-                existing["examples"] = list(set(existing.get("examples", []) + examples))
-            
             concept_data = existing
         else:
             concept_data = {
                 "concept": concept,
                 "concept_id": concept_id,
-                "created": datetime.now().isoformat(),
-                "last_updated": datetime.now().isoformat(),
-                "attributes": attributes,
-                "examples": examples or [],
+                "created": now,
+                "last_updated": now,
+                "attributes": {},
+                "examples": OrderedSet(),
                 "connections": [],
                 "revision_count": 1
             }
         
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(concept_data, f, ensure_ascii=False, indent=2)
+        # 属性をマージ
+        merged_attributes = {}
+        for attributes in attribute_updates:
+            for key, value in attributes.items():
+                current = concept_data["attributes"].get(key)
+                # リスト同士なら順序付き集合に追加、それ以外は上書き
+                if isinstance(current, (OrderedSet, list)) and isinstance(value, list):
+                    self._extend_unique(current, value)
+                else:
+                    concept_data["attributes"][key] = self._to_ordered(value)
+                merged_attributes[key] = value
+        
+        # 例を追加
+        if examples:
+            self._extend_unique(concept_data["examples"], examples)
+        
+        self._store_concept(concept_id, concept_data)
         
         # エピソードとして記録
         self.record_episode(
             f"概念「{concept}」を学習",
-            {"concept": concept, "attributes": attributes},
+            {"concept": concept, "attributes": merged_attributes},
             0.3  # 学習は軽い正の感情価
         )
     
@@ -181,12 +329,9 @@ class MemorySystem:
         """
         for concept in [concept1, concept2]:
             concept_id = self._normalize_concept_name(concept)
-            file_path = self.semantic_path / f"{concept_id}.json"
+            data = self._load_concept(concept_id)
             
-            if file_path.exists():
-                with open(file_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                
+            if data is not None:
                 other_concept = concept2 if concept == concept1 else concept1
                 connection = {
                     "concept": other_concept,
@@ -198,8 +343,7 @@ class MemorySystem:
                     data["connections"] = []
                 data["connections"].append(connection)
                 
-                with open(file_path, "w", encoding="utf-8") as f:
-                    json.dump(data, f, ensure_ascii=False, indent=2)
+                self._store_concept(concept_id, data)
     
     def understand_concept(self, concept: str) -> Optional[Dict]:
         """
@@ -207,14 +351,71 @@ class MemorySystem:
         
         Args:
             concept: 概念名
+        
+        Returns:
+            概念の複製（変更してもキャッシュや保存済みの概念には影響しない）
         """
         concept_id = self._normalize_concept_name(concept)
-        file_path = self.semantic_path / f"{concept_id}.json"
-        
-        if file_path.exists():
-            with open(file_path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        return None
+        data = self._load_concept(concept_id)
+        return copy.deepcopy(self._serialize_concept(data)) if data is not None else None
+    
+    def _load_concept(self, concept_id: str) -> Optional[Dict]:
+        """概念をメモリ上の表現（順序付き集合）で取得（キャッシュは版が一致する場合のみ使う）"""
+        # 読み込みより先に版を取る（間に書き込まれても次回読み直すだけで済む）
+        version = self.backend.concept_version(concept_id)
+        cached = self._concept_cache.get(concept_id)
+        if cached is not None and version is not None and cached[0] == version:
+            return cached[1]
+        
+        data = self.backend.get_concept(concept_id)
+        if data is not None:
+            data["attributes"] = {
+                key: self._to_ordered(value)
+                for key, value in data.get("attributes", {}).items()
+            }
+            data["examples"] = self._to_ordered(data.get("examples", []))
+            self._concept_cache[concept_id] = (version, data)
+        else:
+            self._concept_cache.pop(concept_id, None)
+        return data
+    
+    def _store_concept(self, concept_id: str, data: Dict[str, Any]) -> None:
+        """概念を決定的な順序のリストに変換して保存し、保存後の版とともにキャッシュ"""
+        # 保存に失敗しても、変更途中の表現が古い版のまま残らないようにする
+        self._concept_cache.pop(concept_id, None)
+        self.backend.put_concept(concept_id, self._serialize_concept(data))
+        self._concept_cache[concept_id] = (self.backend.concept_version(concept_id), data)
+    
+    def _serialize_concept(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """順序付き集合を挿入順のリストに戻す"""
+        serialized = dict(data)
+        serialized["attributes"] = {
+            key: list(value) if isinstance(value, OrderedSet) else value
+            for key, value in data["attributes"].items()
+        }
+        serialized["examples"] = list(data.get("examples", []))
+        return serialized
+    
+    @staticmethod
+    def _to_ordered(value: Any) -> Any:
+        """ハッシュ可能な要素のリストを順序付き集合に変換（それ以外はそのまま）"""
+        if isinstance(value, list):
+            try:
+                return OrderedSet(value)
+            except TypeError:
+                return list(value)
+        return value
+    
+    @staticmethod
+    def _extend_unique(target, values: List[Any]) -> None:
+        """重複を除きながら要素を追加"""
+        if isinstance(target, OrderedSet):
+            target.update(values)
+        else:
+            # ハッシュ不可能な要素を含むリストは線形探索で重複除去
+            for value in values:
+                if value not in target:
+                    target.append(value)
     
     # ==================== 手続き記憶 ====================
     
@@ -231,7 +432,6 @@ class MemorySystem:
             tools_required: 必要なツール
         """
         procedure_id = self._normalize_concept_name(task)
-        file_path = self.procedural_path / f"{procedure_id}.json"
         
         procedure = {
             "task": task,
@@ -245,8 +445,7 @@ class MemorySystem:
             "average_duration": None
         }
         
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(procedure, f, ensure_ascii=False, indent=2)
+        self.backend.put_procedure(procedure_id, procedure)
         
         # エピソードとして記録
         self.record_episode(
@@ -263,12 +462,7 @@ class MemorySystem:
             task: タスク名
         """
         procedure_id = self._normalize_concept_name(task)
-        file_path = self.procedural_path / f"{procedure_id}.json"
-        
-        if file_path.exists():
-            with open(file_path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        return None
+        return self.backend.get_procedure(procedure_id)
     
     def update_procedure_performance(self, task: str, success: bool, 
                                     duration: float = None) -> None:
@@ -281,12 +475,9 @@ class MemorySystem:
             duration: 実行時間（秒）
         """
         procedure_id = self._normalize_concept_name(task)
-        file_path = self.procedural_path / f"{procedure_id}.json"
+        procedure = self.backend.get_procedure(procedure_id)
         
-        if file_path.exists():
-            with open(file_path, "r", encoding="utf-8") as f:
-                procedure = json.load(f)
-            
+        if procedure is not None:
             if success:
                 procedure["success_count"] += 1
             else:
@@ -302,8 +493,7 @@ class MemorySystem:
                 else:
                     procedure["average_duration"] = duration
             
-            with open(file_path, "w", encoding="utf-8") as f:
-                json.dump(procedure, f, ensure_ascii=False, indent=2)
+            self.backend.put_procedure(procedure_id, procedure)
     
     # ==================== メタ認知 ====================
     
@@ -327,11 +517,7 @@ class MemorySystem:
             "cognitive_biases": self._detect_biases(thought_process, decision)
         }
         
-        date_str = datetime.now().strftime("%Y%m%d")
-        file_path = self.metacognitive_path / f"reflections_{date_str}.jsonl"
-        
-        with open(file_path, "a", encoding="utf-8") as f:
-            f.write(json.dumps(reflection, ensure_ascii=False) + "\n")
+        self.backend.append_reflection(reflection)
     
     def analyze_patterns(self) -> Dict[str, Any]:
         """
@@ -345,11 +531,7 @@ class MemorySystem:
         }
         
         # エピソード記憶からパターンを抽出
-        all_episodes = []
-        for file_path in self.episodic_path.glob("episodes_*.jsonl"):
-            with open(file_path, "r", encoding="utf-8") as f:
-                for line in f:
-                    all_episodes.append(json.loads(line))
+        all_episodes = list(self.backend.scan("episodes"))
         
         if all_episodes:
             # タグの頻度分析
@@ -367,11 +549,7 @@ class MemorySystem:
             patterns["average_emotional_valence"] = emotional_sum / len(all_episodes)
         
         # メタ認知記録からパターンを抽出
-        all_reflections = []
-        for file_path in self.metacognitive_path.glob("reflections_*.jsonl"):
-            with open(file_path, "r", encoding="utf-8") as f:
-                for line in f:
-                    all_reflections.append(json.loads(line))
+        all_reflections = list(self.backend.scan("reflections"))
         
         if all_reflections:
             # 思考パターンの分析
@@ -412,17 +590,15 @@ class MemorySystem:
             insights.append(f"主要な思考パターン: {dominant_pattern}")
         
         # 学習した概念の数
-        concept_files = list(self.semantic_path.glob("*.json"))
-        if concept_files:
-            insights.append(f"{len(concept_files)}個の概念を学習済み")
+        concept_count = self.backend.count("concepts")
+        if concept_count:
+            insights.append(f"{concept_count}個の概念を学習済み")
         
         # 手続き記憶の成功率
         procedures_stats = {"success": 0, "failure": 0}
-        for file_path in self.procedural_path.glob("*.json"):
-            with open(file_path, "r", encoding="utf-8") as f:
-                proc = json.load(f)
-                procedures_stats["success"] += proc.get("success_count", 0)
-                procedures_stats["failure"] += proc.get("failure_count", 0)
+        for proc in self.backend.scan("procedures"):
+            procedures_stats["success"] += proc.get("success_count", 0)
+            procedures_stats["failure"] += proc.get("failure_count", 0)
         
         if procedures_stats["success"] + procedures_stats["failure"] > 0:
             success_rate = procedures_stats["success"] / (
@@ -499,9 +675,7 @@ class MemorySystem:
             "insights": self.generate_insights()
         }
         
-        file_path = self.base_path / "session_summaries.jsonl"
-        with open(file_path, "a", encoding="utf-8") as f:
-            f.write(json.dumps(summary, ensure_ascii=False) + "\n")
+        self.backend.append_session_summary(summary)
 
 
 if __name__ == "__main__":
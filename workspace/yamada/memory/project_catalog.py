@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+プロジェクトカタログ - 作成したプロジェクトの分類結果キャッシュ
+
+projects/*.html ごとに (mtime, サイズ, 内容ハッシュ) と分類・特徴量を記録し、
+変更・追加されたファイルだけをスレッドプールで並列に再処理する。
+"""
+
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+
+# キーワードベースの分類（ファイル名に含まれる語で判定）
+CATEGORY_KEYWORDS = {
+    "ゲーム": ["game", "snake", "adventure", "universe"],
+    "アート": ["art", "creative", "garden", "mandelbrot"],
+    "音楽": ["music", "sound", "symphony"],
+    "インタラクティブ": ["particle", "wave", "fluid", "evolution"],
+    "実験的": ["ma_space", "zen", "kaomoji", "emoji"]
+}
+
+TITLE_PATTERN = re.compile(r"<title>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+
+
+def classify_project(name: str) -> List[str]:
+    """プロジェクト名からカテゴリを判定（複数該当あり）"""
+    return [
+        category for category, words in CATEGORY_KEYWORDS.items()
+        if any(word in name for word in words)
+    ]
+
+
+def extract_features(content: str) -> Dict[str, Any]:
+    """HTMLの内容から特徴量を抽出"""
+    title = TITLE_PATTERN.search(content)
+    return {
+        "title": title.group(1).strip() if title else None,
+        "lines": content.count("\n") + 1,
+        "uses_canvas": "<canvas" in content or "getContext" in content,
+        "uses_audio": "AudioContext" in content or "<audio" in content,
+        "script_count": content.lower().count("<script")
+    }
+
+
+class ProjectCatalog:
+    """プロジェクトの分類・特徴量をファイル単位でキャッシュ"""
+
+    def __init__(self, projects_path: Path, catalog_path: Path, max_workers: int = 4):
+        self.projects_path = Path(projects_path)
+        self.catalog_path = Path(catalog_path)
+        self.max_workers = max_workers
+        # 同じ実行中に何度も走査しないための結果
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self.catalog_path.exists():
+            try:
+                with open(self.catalog_path, "r", encoding="utf-8") as f:
+                    return json.load(f).get("projects", {})
+            except (OSError, ValueError):
+                pass
+        return {}
+
+    def _save(self, entries: Dict[str, Dict[str, Any]]) -> None:
+        tmp_path = self.catalog_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"updated_at": datetime.now().isoformat(), "projects": entries},
+                      f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.catalog_path)
+
+    @staticmethod
+    def _process(path: Path, stat: os.stat_result,
+                 cached: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """1ファイルを読み、内容が変わっていれば分類と特徴量を作り直す"""
+        raw = path.read_bytes()
+        content_hash = hashlib.sha256(raw).hexdigest()
+        if cached and cached.get("sha256") == content_hash:
+            # 内容は同じ（touchされただけ）なので統計情報だけ更新
+            entry = dict(cached)
+        else:
+            entry = {
+                "name": path.stem,
+                "sha256": content_hash,
+                "categories": classify_project(path.stem),
+                "features": extract_features(raw.decode("utf-8", errors="replace"))
+            }
+        entry["mtime"] = stat.st_mtime
+        entry["size"] = stat.st_size
+        return entry
+
+    def refresh(self) -> Dict[str, Dict[str, Any]]:
+        """
+        カタログを最新化して返す（プロジェクト名 -> 情報、名前順）
+
+        mtimeとサイズが記録と一致するファイルは開かない。
+        """
+        if self._entries is not None:
+            return self._entries
+
+        cached_entries = self._load()
+        entries = {}
+        pending = []
+        for path in sorted(self.projects_path.glob("*.html")):
+            stat = path.stat()
+            cached = cached_entries.get(path.name)
+            if cached and cached.get("mtime") == stat.st_mtime and cached.get("size") == stat.st_size:
+                entries[path.name] = cached
+            else:
+                pending.append((path, stat, cached))
+
+        if pending:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                results = executor.map(lambda args: self._process(*args), pending)
+                for (path, _, _), entry in zip(pending, results):
+                    entries[path.name] = entry
+
+        # 追加・変更・削除があった場合のみ書き戻す
+        if pending or len(entries) != len(cached_entries):
+            self._save(dict(sorted(entries.items())))
+
+        self._entries = dict(sorted(entries.items()))
+        return self._entries
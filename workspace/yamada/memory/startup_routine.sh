@@ -12,14 +12,12 @@ echo ""
 # 記憶システムのディレクトリに移動
 cd /Users/claude/workspace/yamada/memory
 
-# 現在の洞察を表示
-echo "📊 現在の洞察:"
-python3 memory_assistant.py insights
-echo ""
-
-# 最近の活動を想起
-echo "📝 最近の活動:"
-python3 memory_assistant.py recall "最近の活動"
+# 現在の洞察・最近の活動の想起・起動の記録を1プロセスでまとめて実行
+echo "📊 現在の洞察 / 📝 最近の活動:"
+python3 memory_assistant.py batch \
+    -c "insights" \
+    -c "recall 最近の活動" \
+    -c "remember 新しいセッションを開始 - 起動ルーチンを実行 0.5"
 echo ""
 
 # CLAUDE.md の重要部分を表示
@@ -31,7 +29,4 @@ echo "---------------------------------------------------"
 echo ""
 echo "✅ 起動ルーチン完了"
 echo "💭 CLAUDE.mdを定期的に読み返すことを忘れずに"
-echo ""
-
-# 起動を記録
-python3 memory_assistant.py remember "新しいセッションを開始 - 起動ルーチンを実行" 0.5
\ No newline at end of file
+echo ""
\ No newline at end of file
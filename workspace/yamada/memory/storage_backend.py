@@ -0,0 +1,634 @@
+#!/usr/bin/env python3
+"""
+記憶ストレージバックエンド
+==========================
+MemorySystem の永続化層を差し替え可能にするためのインターフェース
+
+バックエンド:
+- JsonDirectoryBackend: 従来のJSONディレクトリ構成（episodic/ semantic/ ...）
+- InMemoryBackend: ディスクを使わない純メモリ実装（テスト・ベンチマーク用）
+- TmpfsBackend: tmpfs (/dev/shm) 向けのコンパクトなJSONディレクトリ実装
+- TransactionalBackend: 他のバックエンドへの書き込みをメモリ上に溜めて一括反映
+"""
+
+import atexit
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterator, Iterable
+
+from episode_manifest import EpisodeManifest
+
+
+# scan() で扱える記録の種類
+RECORD_KINDS = ("episodes", "concepts", "procedures", "reflections", "session_summaries")
+
+
+def partition_key(timestamp: str) -> str:
+    """ISO形式のタイムスタンプから日付パーティション名 (YYYYMMDD) を得る"""
+    return timestamp[:10].replace("-", "")
+
+
+def episode_matches(episode: Dict[str, Any], tags: Optional[Iterable[str]] = None,
+                    since: str = None, until: str = None) -> bool:
+    """エピソードがscan()の絞り込み条件に一致するか"""
+    timestamp = episode.get("timestamp", "")
+    if since and timestamp < since:
+        return False
+    if until and timestamp > until:
+        return False
+    if tags is not None and not set(tags) & set(episode.get("tags", [])):
+        return False
+    return True
+
+
+class StorageBackend:
+    """記憶ストレージの共通インターフェース"""
+
+    def append_episode(self, episode: Dict[str, Any]) -> None:
+        """エピソードを追記"""
+        raise NotImplementedError
+
+    def get_concept(self, concept_id: str) -> Optional[Dict]:
+        """概念を取得（存在しなければNone）"""
+        raise NotImplementedError
+
+    def put_concept(self, concept_id: str, data: Dict[str, Any]) -> None:
+        """概念を保存（上書き）"""
+        raise NotImplementedError
+
+    def concept_version(self, concept_id: str) -> Any:
+        """
+        保存済みの概念の版（書き込まれるたびに変わる値）
+
+        呼び出し側のキャッシュが最新かを確かめるのに使う。
+        既定はNoneで、その場合キャッシュは使われず毎回読み直される。
+        """
+        return None
+
+    def get_procedure(self, procedure_id: str) -> Optional[Dict]:
+        """手順を取得（存在しなければNone）"""
+        raise NotImplementedError
+
+    def put_procedure(self, procedure_id: str, data: Dict[str, Any]) -> None:
+        """手順を保存（上書き）"""
+        raise NotImplementedError
+
+    def append_reflection(self, reflection: Dict[str, Any]) -> None:
+        """内省記録を追記"""
+        raise NotImplementedError
+
+    def append_session_summary(self, summary: Dict[str, Any]) -> None:
+        """セッションサマリーを追記"""
+        raise NotImplementedError
+
+    def get_document(self, name: str) -> Optional[Dict]:
+        """記憶ディレクトリ直下の補助ドキュメント（分析サマリー等）を取得"""
+        raise NotImplementedError
+
+    def put_document(self, name: str, data: Dict[str, Any]) -> None:
+        """補助ドキュメントを保存（上書き）"""
+        raise NotImplementedError
+
+    def apply_batch(self, batch: "TransactionalBackend") -> None:
+        """
+        トランザクションで溜めた書き込みをまとめて反映
+
+        既定実装は1件ずつ書き込む。原子性が必要なバックエンドは上書きする。
+        """
+        for concept_id, data in batch.concepts.items():
+            self.put_concept(concept_id, data)
+        for procedure_id, data in batch.procedures.items():
+            self.put_procedure(procedure_id, data)
+        for name, data in batch.documents.items():
+            self.put_document(name, data)
+        for episode in batch.episodes:
+            self.append_episode(episode)
+        for reflection in batch.reflections:
+            self.append_reflection(reflection)
+        for summary in batch.session_summaries:
+            self.append_session_summary(summary)
+
+    def scan(self, kind: str, reverse: bool = False, tags: Optional[Iterable[str]] = None,
+             since: str = None, until: str = None) -> Iterator[Dict]:
+        """
+        指定種類の記録を順に読み出す
+
+        Args:
+            kind: RECORD_KINDS のいずれか
+            reverse: Trueなら新しいパーティションから読む
+            tags: (episodesのみ) いずれかのタグを含む記録に絞る
+            since / until: (episodesのみ) ISO形式の期間に絞る（両端を含む）
+        """
+        raise NotImplementedError
+
+    def count(self, kind: str) -> int:
+        """記録数を数える"""
+        return sum(1 for _ in self.scan(kind))
+
+    def close(self) -> None:
+        """バックエンドが確保した資源を解放（既定では何もしない）"""
+
+
+class JsonDirectoryBackend(StorageBackend):
+    """従来のJSONディレクトリ構成によるバックエンド"""
+
+    # 概念・手順ファイルのインデント（Noneでコンパクト出力）
+    json_indent: Optional[int] = 2
+
+    def __init__(self, base_path: str):
+        self.base_path = Path(base_path)
+        self.base_path.mkdir(parents=True, exist_ok=True)
+
+        # 各記憶タイプのパス
+        self.episodic_path = self.base_path / "episodic"
+        self.semantic_path = self.base_path / "semantic"
+        self.procedural_path = self.base_path / "procedural"
+        self.metacognitive_path = self.base_path / "metacognitive"
+
+        # ディレクトリ作成
+        for path in [self.episodic_path, self.semantic_path,
+                     self.procedural_path, self.metacognitive_path]:
+            path.mkdir(exist_ok=True)
+
+        # エピソードパーティションのマニフェスト（検索時の読み飛ばし用）
+        self.manifest = EpisodeManifest(self.episodic_path)
+
+        # apply_batch() の反映内容（中断したバッチは次に開いた時に反映し直す）
+        self.journal_path = self.base_path / "batch_journal.json"
+        self._recover()
+
+    # ---------- 内部ヘルパー ----------
+
+    def _append_line(self, file_path: Path, record: Dict[str, Any]) -> int:
+        """1行追記して書き込んだバイト数を返す"""
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with open(file_path, "a", encoding="utf-8") as f:
+            f.write(line)
+        return len(line.encode("utf-8"))
+
+    def _read_json(self, file_path: Path) -> Optional[Dict]:
+        if file_path.exists():
+            with open(file_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return None
+
+    def _write_json_tmp(self, file_path: Path, data: Dict[str, Any]) -> Path:
+        """一時ファイルに書き出してそのパスを返す（os.replaceで確定させる）"""
+        tmp_path = file_path.with_name(file_path.name + ".tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=self.json_indent)
+        except BaseException:
+            # 書きかけの一時ファイルを残さない
+            tmp_path.unlink(missing_ok=True)
+            raise
+        return tmp_path
+
+    def _write_json(self, file_path: Path, data: Dict[str, Any]) -> None:
+        # 書きかけのファイルが残らないよう一時ファイル経由で置き換える
+        os.replace(self._write_json_tmp(file_path, data), file_path)
+
+    def _iter_jsonl(self, pattern: str, directory: Path, reverse: bool) -> Iterator[Dict]:
+        for file_path in sorted(directory.glob(pattern), reverse=reverse):
+            with open(file_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+
+    # ---------- インターフェース実装 ----------
+
+    def append_episode(self, episode: Dict[str, Any]) -> None:
+        # 日付ごとにファイル分割
+        date_str = partition_key(episode["timestamp"])
+        # 初めての日付なら追記より先にマニフェストに載せる（直後に落ちても検索から消えない）
+        self.manifest.ensure_partition(date_str)
+        nbytes = self._append_line(self.episodic_path / f"episodes_{date_str}.jsonl", episode)
+        self.manifest.record_append(date_str, episode, nbytes)
+
+    def get_concept(self, concept_id: str) -> Optional[Dict]:
+        return self._read_json(self.semantic_path / f"{concept_id}.json")
+
+    def put_concept(self, concept_id: str, data: Dict[str, Any]) -> None:
+        self._write_json(self.semantic_path / f"{concept_id}.json", data)
+
+    def concept_version(self, concept_id: str) -> Any:
+        # 書き込みは一時ファイルからの置き換えなので、更新のたびにi-nodeも変わる
+        try:
+            stat = (self.semantic_path / f"{concept_id}.json").stat()
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def get_procedure(self, procedure_id: str) -> Optional[Dict]:
+        return self._read_json(self.procedural_path / f"{procedure_id}.json")
+
+    def put_procedure(self, procedure_id: str, data: Dict[str, Any]) -> None:
+        self._write_json(self.procedural_path / f"{procedure_id}.json", data)
+
+    def append_reflection(self, reflection: Dict[str, Any]) -> None:
+        date_str = partition_key(reflection["timestamp"])
+        self._append_line(self.metacognitive_path / f"reflections_{date_str}.jsonl", reflection)
+
+    def append_session_summary(self, summary: Dict[str, Any]) -> None:
+        self._append_line(self.base_path / "session_summaries.jsonl", summary)
+
+    def get_document(self, name: str) -> Optional[Dict]:
+        return self._read_json(self.base_path / name)
+
+    def put_document(self, name: str, data: Dict[str, Any]) -> None:
+        self._write_json(self.base_path / name, data)
+
+    def apply_batch(self, batch: "TransactionalBackend") -> None:
+        """
+        一時ファイルをすべて書き終えてからジャーナルに反映内容を記録し、
+        各ファイルを1回ずつ rename・追記して確定する
+
+        ジャーナルを書いた後に中断しても、次に開いた時に残りを反映するので、
+        バッチは全部反映されるか、まったく反映されないかのどちらかになる。
+        """
+        # 同じプロセス内で前のバッチの反映に失敗していれば、その残りを先に反映する
+        self._recover()
+
+        targets = (
+            [(self.semantic_path / f"{key}.json", data) for key, data in batch.concepts.items()]
+            + [(self.procedural_path / f"{key}.json", data) for key, data in batch.procedures.items()]
+            + [(self.base_path / name, data) for name, data in batch.documents.items()]
+        )
+
+        # 追記をファイルごとにまとめる
+        episode_groups: Dict[str, List[Dict]] = {}
+        for episode in batch.episodes:
+            episode_groups.setdefault(partition_key(episode["timestamp"]), []).append(episode)
+        append_groups: Dict[Path, List[Dict]] = {}
+        for date_str, episodes in episode_groups.items():
+            append_groups[self.episodic_path / f"episodes_{date_str}.jsonl"] = episodes
+        for reflection in batch.reflections:
+            date_str = partition_key(reflection["timestamp"])
+            append_groups.setdefault(
+                self.metacognitive_path / f"reflections_{date_str}.jsonl", []
+            ).append(reflection)
+        if batch.session_summaries:
+            append_groups[self.base_path / "session_summaries.jsonl"] = batch.session_summaries
+        appends = {
+            file_path: [json.dumps(record, ensure_ascii=False) + "\n" for record in records]
+            for file_path, records in append_groups.items()
+        }
+        if not targets and not appends:
+            return
+
+        # 1. 上書きするファイルを一時ファイルに書き出し、ジャーナルを置く
+        #    （ここまでに失敗したら一時ファイルを消して何も反映しない）
+        renames = []
+        try:
+            for file_path, data in targets:
+                renames.append((self._write_json_tmp(file_path, data), file_path))
+            journal = {
+                "renames": [[self._relative(tmp), self._relative(path)] for tmp, path in renames],
+                "appends": [
+                    [self._relative(file_path), self._file_size(file_path), "".join(lines)]
+                    for file_path, lines in appends.items()
+                ],
+            }
+            self._write_json(self.journal_path, journal)
+        except BaseException:
+            for tmp_path, _ in renames:
+                tmp_path.unlink(missing_ok=True)
+            raise
+
+        # 2. ジャーナルどおりに反映してからジャーナルを消す
+        self._replay_journal(journal)
+        for date_str, episodes in episode_groups.items():
+            lines = appends[self.episodic_path / f"episodes_{date_str}.jsonl"]
+            self.manifest.record_appends(
+                date_str, [(episode, len(line.encode("utf-8"))) for episode, line in zip(episodes, lines)]
+            )
+        self.journal_path.unlink()
+
+    # ---------- ジャーナル ----------
+
+    def _relative(self, file_path: Path) -> str:
+        return str(file_path.relative_to(self.base_path))
+
+    @staticmethod
+    def _file_size(file_path: Path) -> int:
+        try:
+            return file_path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def _replay_journal(self, journal: Dict[str, Any], recovering: bool = False) -> None:
+        """
+        ジャーナルの内容を反映
+
+        rename済みの一時ファイルは飛ばす。中断からの復旧時は、記録したサイズ以降に
+        すでに書かれている分を確かめ、足りない分だけを追記する。
+        """
+        for tmp_name, name in journal["renames"]:
+            tmp_path = self.base_path / tmp_name
+            if tmp_path.exists():
+                os.replace(tmp_path, self.base_path / name)
+        for name, size, text in journal["appends"]:
+            data = text.encode("utf-8")
+            with open(self.base_path / name, "ab+") as f:
+                if recovering:
+                    f.seek(size)
+                    written = f.read(len(data))
+                    if written == data:
+                        continue
+                    if data.startswith(written) and f.tell() == os.fstat(f.fileno()).st_size:
+                        # 途中まで書けていた
+                        data = data[len(written):]
+                f.write(data)
+
+    def _recover(self) -> None:
+        """前回のバッチが途中で中断していれば、残りを反映する"""
+        if not self.journal_path.exists():
+            return
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            journal = json.load(f)
+        self._replay_journal(journal, recovering=True)
+        if any(name.startswith("episodic") for name, _, _ in journal["appends"]):
+            # 中断時点でマニフェストに載っていない追記があり得る
+            self.manifest.rebuild()
+        self.journal_path.unlink()
+
+    def _scan_episodes(self, reverse: bool, tags, since, until) -> Iterator[Dict]:
+        """マニフェストで一致し得ないパーティションを開かずに読み飛ばす"""
+        if tags is not None:
+            tags = set(tags)
+        for date_str, entry in self.manifest.partitions(reverse=reverse):
+            # 記録と実ファイルのサイズがずれていれば先に作り直す（statのみ）
+            entry = self.manifest.refresh_if_stale(date_str, entry)
+            if entry is None or not self.manifest.may_match(entry, tags, since, until):
+                continue
+            with open(self.episodic_path / entry["file"], "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        episode = json.loads(line)
+                        if episode_matches(episode, tags, since, until):
+                            yield episode
+
+    def scan(self, kind: str, reverse: bool = False, tags: Optional[Iterable[str]] = None,
+             since: str = None, until: str = None) -> Iterator[Dict]:
+        if kind == "episodes":
+            yield from self._scan_episodes(reverse, tags, since, until)
+        elif kind == "reflections":
+            yield from self._iter_jsonl("reflections_*.jsonl", self.metacognitive_path, reverse)
+        elif kind == "session_summaries":
+            yield from self._iter_jsonl("session_summaries.jsonl", self.base_path, reverse)
+        elif kind in ("concepts", "procedures"):
+            directory = self.semantic_path if kind == "concepts" else self.procedural_path
+            for file_path in sorted(directory.glob("*.json"), reverse=reverse):
+                data = self._read_json(file_path)
+                if data is not None:
+                    yield data
+        else:
+            raise ValueError(f"不明な記録の種類: {kind}")
+
+    def count(self, kind: str) -> int:
+        # 概念・手順・エピソードはファイルを開かずに数える
+        if kind == "concepts":
+            return sum(1 for _ in self.semantic_path.glob("*.json"))
+        if kind == "procedures":
+            return sum(1 for _ in self.procedural_path.glob("*.json"))
+        if kind == "episodes":
+            return sum(entry["lines"] for _, entry in self.manifest.partitions())
+        return super().count(kind)
+
+
+class TmpfsBackend(JsonDirectoryBackend):
+    """
+    tmpfs向けバックエンド
+
+    ディレクトリ構成はJsonDirectoryBackendと同じだが、RAM上のファイルシステムを
+    前提にインデントなしのコンパクトなJSONで書き込む。
+    base_path を省略した場合は専用の一時ディレクトリを作り、close() または
+    プロセス終了時に削除する（RAMを使い続けないように）。
+    """
+
+    json_indent = None
+
+    def __init__(self, base_path: str = None):
+        self._owned_path = None
+        if base_path is None:
+            import tempfile  # 起動を軽くするため必要時のみ読み込む
+            shm = Path("/dev/shm")
+            root = shm if shm.is_dir() and os.access(shm, os.W_OK) else Path(tempfile.gettempdir())
+            base_path = tempfile.mkdtemp(prefix="yamada_memory_", dir=root)
+            self._owned_path = base_path
+            atexit.register(self.close)
+        super().__init__(base_path)
+
+    def close(self) -> None:
+        """自分で作った一時ディレクトリを削除（指定されたディレクトリは残す）"""
+        if self._owned_path is None:
+            return
+        import shutil
+        shutil.rmtree(self._owned_path, ignore_errors=True)
+        self._owned_path = None
+        atexit.unregister(self.close)
+
+
+class InMemoryBackend(StorageBackend):
+    """ディスクを一切使わない純メモリのバックエンド"""
+
+    def __init__(self):
+        # パーティション名 -> 記録リスト
+        self.episodes: Dict[str, List[Dict]] = {}
+        self.reflections: Dict[str, List[Dict]] = {}
+        self.concepts: Dict[str, Dict] = {}
+        self.procedures: Dict[str, Dict] = {}
+        self.documents: Dict[str, Dict] = {}
+        self.session_summaries: List[Dict] = []
+        # 概念ID -> 書き込み回数（concept_version() 用）
+        self._concept_writes: Dict[str, int] = {}
+
+    @staticmethod
+    def _copy(data: Optional[Dict]) -> Optional[Dict]:
+        # 呼び出し側の変更が保存済みデータに波及しないよう、JSON往復で複製する
+        if data is None:
+            return None
+        return json.loads(json.dumps(data, ensure_ascii=False))
+
+    def append_episode(self, episode: Dict[str, Any]) -> None:
+        key = partition_key(episode["timestamp"])
+        self.episodes.setdefault(key, []).append(self._copy(episode))
+
+    def get_concept(self, concept_id: str) -> Optional[Dict]:
+        return self._copy(self.concepts.get(concept_id))
+
+    def put_concept(self, concept_id: str, data: Dict[str, Any]) -> None:
+        self.concepts[concept_id] = self._copy(data)
+        self._concept_writes[concept_id] = self._concept_writes.get(concept_id, 0) + 1
+
+    def concept_version(self, concept_id: str) -> Any:
+        if concept_id not in self.concepts:
+            return None
+        return self._concept_writes[concept_id]
+
+    def get_procedure(self, procedure_id: str) -> Optional[Dict]:
+        return self._copy(self.procedures.get(procedure_id))
+
+    def put_procedure(self, procedure_id: str, data: Dict[str, Any]) -> None:
+        self.procedures[procedure_id] = self._copy(data)
+
+    def append_reflection(self, reflection: Dict[str, Any]) -> None:
+        key = partition_key(reflection["timestamp"])
+        self.reflections.setdefault(key, []).append(self._copy(reflection))
+
+    def append_session_summary(self, summary: Dict[str, Any]) -> None:
+        self.session_summaries.append(self._copy(summary))
+
+    def get_document(self, name: str) -> Optional[Dict]:
+        return self._copy(self.documents.get(name))
+
+    def put_document(self, name: str, data: Dict[str, Any]) -> None:
+        self.documents[name] = self._copy(data)
+
+    def scan(self, kind: str, reverse: bool = False, tags: Optional[Iterable[str]] = None,
+             since: str = None, until: str = None) -> Iterator[Dict]:
+        if kind == "episodes":
+            for key in sorted(self.episodes, reverse=reverse):
+                for record in self.episodes[key]:
+                    if episode_matches(record, tags, since, until):
+                        yield self._copy(record)
+        elif kind == "reflections":
+            for key in sorted(self.reflections, reverse=reverse):
+                for record in self.reflections[key]:
+                    yield self._copy(record)
+        elif kind in ("concepts", "procedures"):
+            store = self.concepts if kind == "concepts" else self.procedures
+            for key in sorted(store, reverse=reverse):
+                yield self._copy(store[key])
+        elif kind == "session_summaries":
+            for record in self.session_summaries:
+                yield self._copy(record)
+        else:
+            raise ValueError(f"不明な記録の種類: {kind}")
+
+    def count(self, kind: str) -> int:
+        if kind == "concepts":
+            return len(self.concepts)
+        if kind == "procedures":
+            return len(self.procedures)
+        return super().count(kind)
+
+
+class TransactionalBackend(InMemoryBackend):
+    """
+    別のバックエンドへの書き込みをメモリ上に溜めるステージング層
+
+    読み出しは溜めた内容を優先し、なければ元のバックエンドを参照する。
+    commit() で元のバックエンドの apply_batch() にまとめて渡す。
+    """
+
+    # 概念・手順のデータ内でIDを持つキー
+    ID_KEYS = {"concepts": "concept_id", "procedures": "procedure_id"}
+
+    def __init__(self, inner: StorageBackend):
+        super().__init__()
+        self.inner = inner
+        # 追記は時系列順のまま保持する
+        self.episodes: List[Dict] = []
+        self.reflections: List[Dict] = []
+
+    def append_episode(self, episode: Dict[str, Any]) -> None:
+        self.episodes.append(self._copy(episode))
+
+    def append_reflection(self, reflection: Dict[str, Any]) -> None:
+        self.reflections.append(self._copy(reflection))
+
+    def get_concept(self, concept_id: str) -> Optional[Dict]:
+        if concept_id in self.concepts:
+            return self._copy(self.concepts[concept_id])
+        return self.inner.get_concept(concept_id)
+
+    def concept_version(self, concept_id: str) -> Any:
+        if concept_id in self.concepts:
+            return ("staged", self._concept_writes[concept_id])
+        return self.inner.concept_version(concept_id)
+
+    def get_procedure(self, procedure_id: str) -> Optional[Dict]:
+        if procedure_id in self.procedures:
+            return self._copy(self.procedures[procedure_id])
+        return self.inner.get_procedure(procedure_id)
+
+    def get_document(self, name: str) -> Optional[Dict]:
+        if name in self.documents:
+            return self._copy(self.documents[name])
+        return self.inner.get_document(name)
+
+    def scan(self, kind: str, reverse: bool = False, tags: Optional[Iterable[str]] = None,
+             since: str = None, until: str = None) -> Iterator[Dict]:
+        if kind in self.ID_KEYS:
+            staged = self.concepts if kind == "concepts" else self.procedures
+            for record in self.inner.scan(kind, reverse=reverse):
+                if record.get(self.ID_KEYS[kind]) not in staged:
+                    yield record
+            for key in sorted(staged, reverse=reverse):
+                yield self._copy(staged[key])
+            return
+
+        if kind == "episodes":
+            staged = [e for e in self.episodes if episode_matches(e, tags, since, until)]
+        elif kind == "reflections":
+            staged = self.reflections
+        elif kind == "session_summaries":
+            staged = self.session_summaries
+        else:
+            raise ValueError(f"不明な記録の種類: {kind}")
+
+        # 溜めた記録は常に既存の記録より新しい
+        if reverse:
+            for record in reversed(staged):
+                yield self._copy(record)
+        yield from self.inner.scan(kind, reverse=reverse, tags=tags, since=since, until=until)
+        if not reverse:
+            for record in staged:
+                yield self._copy(record)
+
+    def count(self, kind: str) -> int:
+        if kind == "concepts":
+            new = sum(1 for key in self.concepts if self.inner.get_concept(key) is None)
+            return self.inner.count(kind) + new
+        if kind == "procedures":
+            new = sum(1 for key in self.procedures if self.inner.get_procedure(key) is None)
+            return self.inner.count(kind) + new
+        return StorageBackend.count(self, kind)
+
+    def commit(self) -> None:
+        """溜めた書き込みを元のバックエンドに反映"""
+        self.inner.apply_batch(self)
+
+
+def run_workload(memory, n_episodes: int = 500, n_concepts: int = 50) -> None:
+    """各バックエンドを比較するための共通ワークロード"""
+    for i in range(n_episodes):
+        memory.record_episode(f"ベンチマーク event {i % 20} 記録", {"i": i}, (i % 5) / 5)
+    for i in range(n_concepts):
+        memory.learn_concept(f"概念 {i % 10}", {"tags": [f"t{i}"]}, [f"例{i}"])
+    memory.recall_episodes("ベンチマーク event", limit=10)
+    memory.generate_insights()
+
+
+if __name__ == "__main__":
+    # 同一ワークロードで各バックエンドを比較
+    import tempfile
+    import time
+    from memory_system import MemorySystem
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = [
+            ("JsonDirectoryBackend", JsonDirectoryBackend(os.path.join(tmp, "json"))),
+            ("TmpfsBackend", TmpfsBackend()),
+            ("InMemoryBackend", InMemoryBackend()),
+        ]
+        print("=== バックエンド比較 ===")
+        for name, backend in backends:
+            memory = MemorySystem(backend=backend)
+            start = time.perf_counter()
+            run_workload(memory)
+            elapsed = time.perf_counter() - start
+            print(f"{name:22} {elapsed * 1000:8.1f} ms")
+            backend.close()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+experience_analyzer のログ分析チェックポイントのテスト（一時ディレクトリを使う）
+
+使い方:
+    python3 -m unittest test_experience_analyzer
+"""
+
+import contextlib
+import io
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import experience_analyzer
+from experience_analyzer import ExperienceAnalyzer
+from memory_system import MemorySystem
+
+def work_log(*tasks):
+    return [{"task": task, "energy_after": 100 - 10 * i} for i, task in enumerate(tasks)]
+
+class CheckpointTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.logs = self.dir / "logs"
+        self.logs.mkdir()
+        self.write_log("autonomous_20250901.json", ["検索", "学習"], {"python": 0.2})
+        self.write_log("autonomous_20250902.json", ["検索"], {"python": 0.3})
+
+    def write_log(self, name, tasks, skills):
+        data = {"work_log": work_log(*tasks), "final_energy": 50, "final_skills": skills}
+        (self.logs / name).write_text(json.dumps(data), encoding="utf-8")
+
+    def analyzer(self):
+        with mock.patch.object(experience_analyzer, "MemorySystem",
+                               lambda: MemorySystem(base_path=self.dir / "memory")):
+            analyzer = ExperienceAnalyzer()
+        analyzer.logs_path = self.logs
+        return analyzer
+
+    def analyze(self, analyzer):
+        with contextlib.redirect_stdout(io.StringIO()):
+            with analyzer.memory.transaction():
+                return analyzer.analyze_autonomous_log()
+
+    def checkpoint(self):
+        return self.analyzer()._load_checkpoint()
+
+    def test_only_new_logs_are_folded(self):
+        self.assertEqual(self.analyze(self.analyzer()), 2)
+        # 分析済みのログは読み直さない（書き換えても集計は変わらない）
+        self.write_log("autonomous_20250901.json", ["別のタスク"], {})
+        self.write_log("autonomous_20250903.json", ["学習"], {"python": 0.5})
+        self.assertEqual(self.analyze(self.analyzer()), 1)
+
+        checkpoint = self.checkpoint()
+        self.assertEqual(checkpoint["processed_logs"], [
+            "autonomous_20250901.json", "autonomous_20250902.json", "autonomous_20250903.json"
+        ])
+        self.assertEqual(checkpoint["task_counts"], {"検索": 2, "学習": 2})
+        self.assertEqual((checkpoint["energy_delta_sum"], checkpoint["energy_delta_count"]), (-10, 1))
+        self.assertEqual([level for _, level in checkpoint["skill_trajectories"]["python"]], [0.2, 0.3, 0.5])
+
+    def test_nothing_new_leaves_memory_alone(self):
+        self.analyze(self.analyzer())
+        analyzer = self.analyzer()
+        self.assertEqual(self.analyze(analyzer), 0)
+        concept = analyzer.memory.understand_concept("自律的活動パターン")
+        self.assertEqual(concept["revision_count"], 1)
+
+    def test_failed_run_is_analyzed_again(self):
+        analyzer = self.analyzer()
+        with self.assertRaises(RuntimeError), contextlib.redirect_stdout(io.StringIO()):
+            with analyzer.memory.transaction():
+                analyzer.analyze_autonomous_log()
+                raise RuntimeError("後続の分析で失敗")
+        self.assertEqual(self.checkpoint()["processed_logs"], [])
+        self.assertEqual(self.analyze(self.analyzer()), 2)
+        self.assertEqual(self.checkpoint()["task_counts"], {"検索": 2, "学習": 1})
+
+    def test_unreadable_log_is_retried(self):
+        (self.logs / "autonomous_20250903.json").write_text("{書きかけ", encoding="utf-8")
+        self.analyze(self.analyzer())
+        self.assertNotIn("autonomous_20250903.json", self.checkpoint()["processed_logs"])
+        self.write_log("autonomous_20250903.json", ["学習"], {})
+        self.analyze(self.analyzer())
+        self.assertEqual(self.checkpoint()["task_counts"], {"検索": 2, "学習": 2})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+memory_assistant の引数解析のテスト（一時ディレクトリの記憶システムを使う）
+
+使い方:
+    python3 -m unittest test_memory_assistant
+"""
+
+import contextlib
+import io
+import json
+import tempfile
+import unittest
+from unittest import mock
+
+import memory_assistant
+from memory_assistant import parse_batch_args, parse_leading_options
+from memory_client import MemoryClient
+from memory_system import MemorySystem
+
+class ParseArgsTest(unittest.TestCase):
+    def test_leading_json_option(self):
+        self.assertEqual(parse_leading_options(["--json", "recall", "Python"]), (True, ["recall", "Python"]))
+        self.assertEqual(parse_leading_options(["recall", "Python"]), (False, ["recall", "Python"]))
+        self.assertEqual(parse_leading_options([]), (False, []))
+
+    def test_json_after_command_is_an_argument(self):
+        self.assertEqual(
+            parse_leading_options(["remember", "jq", "--json", "を覚えた"]),
+            (False, ["remember", "jq", "--json", "を覚えた"])
+        )
+
+    def test_batch_commands(self):
+        self.assertEqual(
+            parse_batch_args(["-c", "insights", "--command", "recall --json の使い方"]),
+            ["insights", "recall --json の使い方"]
+        )
+        self.assertEqual(parse_batch_args([]), [])
+
+    def test_stray_batch_arguments_are_rejected(self):
+        for args, message in [(["insights"], "不明な引数: insights"),
+                              (["-c", "insights", "analyze"], "不明な引数: analyze"),
+                              (["-c"], "-c のコマンドを指定してください")]:
+            with self.subTest(args=args):
+                with self.assertRaises(ValueError) as raised:
+                    parse_batch_args(args)
+                self.assertEqual(str(raised.exception), message)
+
+class MainTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.memory = MemorySystem(base_path=tmp.name)
+        patcher = mock.patch.object(memory_assistant, "MemoryClient", lambda: MemoryClient(self.memory))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def main(self, *argv):
+        output = io.StringIO()
+        with mock.patch.object(memory_assistant.sys, "argv", ["memory_assistant.py", *argv]), \
+                contextlib.redirect_stdout(output):
+            memory_assistant.main()
+        return output.getvalue()
+
+    def events(self):
+        return [episode["event"] for episode in self.memory.backend.scan("episodes")]
+
+    def test_json_output(self):
+        result = json.loads(self.main("--json", "remember", "テスト", "0.5"))
+        self.assertEqual(result, {"command": "remember", "event": "テスト", "emotional_valence": 0.5})
+
+    def test_json_in_event_text_is_kept(self):
+        output = self.main("remember", "jq", "--json", "の使い方を覚えた")
+        self.assertIn("✓ 記憶しました", output)
+        self.assertEqual(self.events(), ["jq --json の使い方を覚えた"])
+
+    def test_json_before_batch(self):
+        output = self.main("--json", "batch", "-c", "remember a --json b", "-c", "remember c")
+        lines = [json.loads(line) for line in output.splitlines()]
+        self.assertEqual([line["event"] for line in lines], ["a --json b", "c"])
+
+    def test_stray_batch_argument_is_a_usage_error(self):
+        with mock.patch.object(memory_assistant.sys, "stdin", io.StringIO("remember 標準入力")):
+            with self.assertRaises(SystemExit) as raised:
+                self.main("batch", "insights")
+        self.assertEqual(raised.exception.code, 2)
+        self.assertEqual(self.events(), [])
+
+if __name__ == "__main__":
+    unittest.main()
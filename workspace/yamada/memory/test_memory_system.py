@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+memory_system の意味記憶キャッシュのテスト（一時ディレクトリ・メモリ上のバックエンドを使う）
+
+使い方:
+    python3 -m unittest test_memory_system
+"""
+
+import tempfile
+import unittest
+from unittest import mock
+
+from memory_client import MemoryClient
+from memory_system import MemorySystem
+from storage_backend import InMemoryBackend
+
+class ConceptCacheTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+
+    def test_update_from_other_instance_is_not_lost(self):
+        first = MemorySystem(base_path=self.dir)
+        second = MemorySystem(base_path=self.dir)
+        first.learn_concept("Python", {"tags": ["a"]})
+        self.assertEqual(second.understand_concept("Python")["attributes"]["tags"], ["a"])
+
+        # second のキャッシュが古いまま書き込むと first の "b" が消えていた
+        first.learn_concept("Python", {"tags": ["b"]})
+        second.learn_concept("Python", {"tags": ["c"]})
+        concept = MemorySystem(base_path=self.dir).understand_concept("Python")
+        self.assertEqual(concept["attributes"]["tags"], ["a", "b", "c"])
+        self.assertEqual(concept["revision_count"], 3)
+
+    def test_shared_in_memory_backend(self):
+        backend = InMemoryBackend()
+        first = MemorySystem(base_path=self.dir, backend=backend)
+        second = MemorySystem(base_path=self.dir, backend=backend)
+        first.learn_concept("Python", {"tags": ["a"]})
+        second.understand_concept("Python")
+        first.connect_concepts("Python", "Python", "同じ")
+        self.assertEqual(len(second.understand_concept("Python")["connections"]), 2)
+
+    def test_returned_concept_is_a_copy(self):
+        memory = MemorySystem(base_path=self.dir)
+        memory.learn_concept("Python", {"tags": ["a"], "meta": {"level": 1}}, ["例"])
+        memory.connect_concepts("Python", "Rust", "比較")
+        concept = memory.understand_concept("Python")
+        concept["attributes"]["tags"].append("x")
+        concept["attributes"]["meta"]["level"] = 99
+        concept["examples"].append("x")
+        concept["connections"].clear()
+
+        again = memory.understand_concept("Python")
+        self.assertEqual(again["attributes"]["tags"], ["a"])
+        self.assertEqual(again["attributes"]["meta"], {"level": 1})
+        self.assertEqual(again["examples"], ["例"])
+        self.assertEqual(len(again["connections"]), 1)
+
+    def test_rollback_discards_cached_changes(self):
+        memory = MemorySystem(base_path=self.dir)
+        memory.learn_concept("Python", {"tags": ["a"]})
+        with self.assertRaises(RuntimeError):
+            with memory.transaction():
+                memory.learn_concept("Python", {"tags": ["b"]})
+                raise RuntimeError("中断")
+        self.assertEqual(memory.understand_concept("Python")["attributes"]["tags"], ["a"])
+
+class RecallWorkingTest(unittest.TestCase):
+    def setUp(self):
+        self.backend = InMemoryBackend()
+        self.memory = MemorySystem(base_path=".", backend=self.backend)
+
+    def test_working_memory_hits_skip_the_disk(self):
+        self.memory.record_episode("Pythonのテストを書いた", {})
+        self.memory.record_episode("Rustを触った", {})
+        with mock.patch.object(self.backend, "scan", side_effect=AssertionError("ディスクを読んだ")):
+            hits = self.memory.recall_working("Python", limit=10)
+            client_hits = MemoryClient(self.memory).recall("Python")["episodes"]
+        self.assertEqual([hit["event"] for hit in hits], ["Pythonのテストを書いた"])
+        self.assertEqual([hit["event"] for hit in client_hits], ["Pythonのテストを書いた"])
+
+    def test_falls_back_to_the_disk_when_nothing_is_in_working_memory(self):
+        self.memory.record_episode("Pythonのテストを書いた", {})
+        fresh = MemorySystem(base_path=".", backend=self.backend)
+        self.assertEqual([hit["event"] for hit in fresh.recall_working("Python")], ["Pythonのテストを書いた"])
+        fresh.record_episode("Rustを触った", {})
+        self.assertEqual([hit["event"] for hit in fresh.recall_working("Python")], ["Pythonのテストを書いた"])
+        self.assertEqual(fresh.recall_working("Go"), [])
+
+if __name__ == "__main__":
+    unittest.main()
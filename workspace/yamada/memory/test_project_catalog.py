@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+project_catalog のテスト（一時ディレクトリを使う）
+
+使い方:
+    python3 -m unittest test_project_catalog
+"""
+
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import project_catalog
+from project_catalog import ProjectCatalog
+
+def page(title, script=""):
+    return f"<html><head><title>{title}</title></head><body>{script}</body></html>\n"
+
+class ProjectCatalogTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.projects = Path(tmp.name) / "projects"
+        self.projects.mkdir()
+        self.catalog_path = Path(tmp.name) / "project_catalog.json"
+        self.write("snake_game", page("ヘビ", "<canvas></canvas>"))
+        self.write("zen_garden", page("禅"))
+
+    def write(self, name, content, mtime=None):
+        path = self.projects / f"{name}.html"
+        path.write_text(content, encoding="utf-8")
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+        return path
+
+    def catalog(self):
+        return ProjectCatalog(self.projects, self.catalog_path, max_workers=2)
+
+    def stored(self):
+        with open(self.catalog_path, encoding="utf-8") as f:
+            return json.load(f)["projects"]
+
+    def test_first_refresh_classifies_every_file(self):
+        entries = self.catalog().refresh()
+        self.assertEqual(list(entries), ["snake_game.html", "zen_garden.html"])
+        self.assertEqual(entries["snake_game.html"]["categories"], ["ゲーム"])
+        self.assertEqual(entries["snake_game.html"]["features"]["title"], "ヘビ")
+        self.assertTrue(entries["snake_game.html"]["features"]["uses_canvas"])
+        self.assertEqual(entries["zen_garden.html"]["categories"], ["アート", "実験的"])
+        self.assertEqual(self.stored(), entries)
+
+    def test_unchanged_files_are_not_read(self):
+        self.catalog().refresh()
+        with mock.patch.object(ProjectCatalog, "_process", side_effect=AssertionError("読み直した")), \
+                mock.patch.object(ProjectCatalog, "_save", side_effect=AssertionError("書き直した")):
+            entries = self.catalog().refresh()
+        self.assertEqual(entries["zen_garden.html"]["features"]["title"], "禅")
+
+    def test_changed_content_is_reprocessed(self):
+        self.catalog().refresh()
+        self.write("zen_garden", page("禅の庭", "<audio></audio>"), mtime=2_000_000_000)
+        entries = self.catalog().refresh()
+        self.assertEqual(entries["zen_garden.html"]["features"]["title"], "禅の庭")
+        self.assertTrue(entries["zen_garden.html"]["features"]["uses_audio"])
+        self.assertEqual(self.stored()["zen_garden.html"]["features"]["title"], "禅の庭")
+
+    def test_touched_file_keeps_its_features(self):
+        first = self.catalog().refresh()["zen_garden.html"]
+        os.utime(self.projects / "zen_garden.html", (2_000_000_000, 2_000_000_000))
+        with mock.patch.object(project_catalog, "extract_features", side_effect=AssertionError("作り直した")):
+            entry = self.catalog().refresh()["zen_garden.html"]
+        self.assertEqual(entry["sha256"], first["sha256"])
+        self.assertEqual(entry["mtime"], 2_000_000_000)
+        self.assertEqual(self.stored()["zen_garden.html"]["mtime"], 2_000_000_000)
+
+    def test_added_and_removed_files(self):
+        self.catalog().refresh()
+        (self.projects / "snake_game.html").unlink()
+        self.write("wave_symphony", page("波"))
+        entries = self.catalog().refresh()
+        self.assertEqual(list(entries), ["wave_symphony.html", "zen_garden.html"])
+        self.assertEqual(list(self.stored()), ["wave_symphony.html", "zen_garden.html"])
+
+    def test_broken_catalog_is_rebuilt(self):
+        self.catalog_path.write_text("{broken", encoding="utf-8")
+        self.assertEqual(len(self.catalog().refresh()), 2)
+        self.assertEqual(len(self.stored()), 2)
+
+    def test_result_is_reused_within_a_run(self):
+        catalog = self.catalog()
+        entries = catalog.refresh()
+        self.write("wave_symphony", page("波"))
+        self.assertIs(catalog.refresh(), entries)
+
+if __name__ == "__main__":
+    unittest.main()
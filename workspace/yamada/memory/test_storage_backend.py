@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+storage_backend のテスト（一時ディレクトリを使う）
+
+使い方:
+    python3 -m unittest test_storage_backend
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from storage_backend import JsonDirectoryBackend, TmpfsBackend, TransactionalBackend
+
+class Crash(BaseException):
+    """プロセスの強制終了を模擬する"""
+
+def make_batch(backend, concepts=("python",), episodes=2):
+    batch = TransactionalBackend(backend)
+    for concept_id in concepts:
+        batch.put_concept(concept_id, {"concept_id": concept_id, "revision_count": 2})
+    for i in range(episodes):
+        batch.append_episode({"timestamp": "2025-09-01T10:00:00", "event": f"e{i}", "tags": ["t"]})
+    batch.append_reflection({"timestamp": "2025-09-01T10:00:00", "thought": "振り返り"})
+    return batch
+
+class ApplyBatchTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.backend = JsonDirectoryBackend(self.dir)
+        self.backend.put_concept("python", {"concept_id": "python", "revision_count": 1})
+
+    def events(self, backend=None):
+        return [e["event"] for e in (backend or self.backend).scan("episodes")]
+
+    def leftovers(self):
+        return sorted(str(p.relative_to(self.dir)) for p in Path(self.dir).rglob("*.tmp"))
+
+    def test_commit_applies_everything(self):
+        make_batch(self.backend, concepts=("python", "rust")).commit()
+        self.assertEqual(self.backend.get_concept("python")["revision_count"], 2)
+        self.assertEqual(self.backend.count("concepts"), 2)
+        self.assertEqual(self.events(), ["e0", "e1"])
+        self.assertEqual(self.backend.count("reflections"), 1)
+        self.assertFalse(self.backend.journal_path.exists())
+        self.assertEqual(self.leftovers(), [])
+
+    def test_failure_while_writing_cleans_up(self):
+        dump = json.dump
+
+        def disk_full_on_second(data, f, **kwargs):
+            if f.name.endswith("rust.json.tmp"):
+                # 一時ファイルを作ったところで書き込みに失敗
+                raise OSError("No space left on device")
+            dump(data, f, **kwargs)
+
+        with mock.patch.object(json, "dump", disk_full_on_second):
+            with self.assertRaises(OSError):
+                make_batch(self.backend, concepts=("python", "rust")).commit()
+        self.assertEqual(self.leftovers(), [])
+        self.assertFalse(self.backend.journal_path.exists())
+        self.assertEqual(self.backend.get_concept("python")["revision_count"], 1)
+        self.assertEqual(self.events(), [])
+
+    def test_crash_before_applying_is_recovered(self):
+        with mock.patch.object(JsonDirectoryBackend, "_replay_journal", side_effect=Crash):
+            with self.assertRaises(Crash):
+                make_batch(self.backend).commit()
+        # 反映前に落ちても、次に開いた時にすべて反映される
+        reopened = JsonDirectoryBackend(self.dir)
+        self.assertEqual(reopened.get_concept("python")["revision_count"], 2)
+        self.assertEqual(self.events(reopened), ["e0", "e1"])
+        self.assertEqual(reopened.count("reflections"), 1)
+        self.assertEqual(self.leftovers(), [])
+
+    def test_crash_in_the_middle_of_an_append_is_recovered(self):
+        replay = JsonDirectoryBackend._replay_journal
+
+        def half_written(backend, journal, recovering=False):
+            name, size, text = journal["appends"][0]
+            journal = {"renames": journal["renames"][:1],
+                       "appends": [[name, size, text[:len(text) // 2]]]}
+            replay(backend, journal, recovering)
+            raise Crash
+
+        with mock.patch.object(JsonDirectoryBackend, "_replay_journal", half_written):
+            with self.assertRaises(Crash):
+                make_batch(self.backend).commit()
+        reopened = JsonDirectoryBackend(self.dir)
+        self.assertEqual(self.events(reopened), ["e0", "e1"])
+        self.assertEqual(reopened.count("reflections"), 1)
+
+    def test_recovery_after_applying_does_not_duplicate(self):
+        # 反映し終えてからジャーナルを消す前に落ちた場合
+        with mock.patch.object(self.backend.manifest, "record_appends", side_effect=Crash):
+            with self.assertRaises(Crash):
+                make_batch(self.backend).commit()
+        self.assertTrue(self.backend.journal_path.exists())
+        reopened = JsonDirectoryBackend(self.dir)
+        self.assertEqual(self.events(reopened), ["e0", "e1"])
+        self.assertEqual(reopened.count("reflections"), 1)
+        self.assertFalse(reopened.journal_path.exists())
+
+    def test_next_batch_finishes_a_failed_one_first(self):
+        with mock.patch.object(self.backend.manifest, "record_appends", side_effect=Crash):
+            with self.assertRaises(Crash):
+                make_batch(self.backend, episodes=1).commit()
+        make_batch(self.backend, concepts=(), episodes=1).commit()
+        self.assertEqual(self.events(), ["e0", "e0"])
+        self.assertEqual(self.backend.count("reflections"), 2)
+
+class ManifestTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.backend = JsonDirectoryBackend(self.dir)
+
+    def append(self, backend, day, event, tags=("python",)):
+        backend.append_episode({"timestamp": f"2025-09-{day:02d}T10:00:00", "event": event, "tags": list(tags)})
+
+    def events(self, backend, **kwargs):
+        return [e["event"] for e in backend.scan("episodes", **kwargs)]
+
+    def test_crash_after_the_first_append_of_a_day(self):
+        self.append(self.backend, 1, "a")
+        with mock.patch.object(self.backend.manifest, "record_appends", side_effect=Crash):
+            with self.assertRaises(Crash):
+                self.append(self.backend, 2, "b")
+        reopened = JsonDirectoryBackend(self.dir)
+        self.assertEqual(self.events(reopened), ["a", "b"])
+        self.assertEqual(self.events(reopened, tags=["python"]), ["a", "b"])
+        self.append(reopened, 2, "c")
+        self.assertEqual(self.events(JsonDirectoryBackend(self.dir)), ["a", "b", "c"])
+
+    def test_partition_missing_from_the_manifest_is_found(self):
+        # 以前の版で追記直後に落ち、マニフェストに載らなかったファイル
+        self.append(self.backend, 1, "a")
+        orphan = Path(self.dir) / "episodic" / "episodes_20250902.jsonl"
+        orphan.write_text(json.dumps({"timestamp": "2025-09-02T10:00:00", "event": "b", "tags": ["rust"]}) + "\n")
+        reopened = JsonDirectoryBackend(self.dir)
+        self.assertEqual(self.events(reopened), ["a", "b"])
+        self.assertEqual(self.events(reopened, tags=["rust"]), ["b"])
+        self.assertEqual(self.events(reopened, tags=["go"]), [])
+
+    def test_recall_finds_a_day_hidden_by_a_crash(self):
+        from memory_system import MemorySystem
+        memory = MemorySystem(base_path=self.dir)
+        with mock.patch.object(memory.backend.manifest, "record_appends", side_effect=Crash):
+            with self.assertRaises(Crash):
+                memory.record_episode("Pythonの非同期処理を学んだ", {})
+        reopened = MemorySystem(base_path=self.dir)
+        self.assertEqual([e["event"] for e in reopened.recall_episodes("Python")], ["Pythonの非同期処理を学んだ"])
+        self.assertIn("python", dict(reopened.analyze_patterns()["common_themes"]))
+
+class TmpfsBackendTest(unittest.TestCase):
+    def test_default_directory_is_removed_on_close(self):
+        first = TmpfsBackend()
+        second = TmpfsBackend()
+        self.addCleanup(first.close)
+        self.addCleanup(second.close)
+        self.assertNotEqual(first.base_path, second.base_path)
+        first.put_concept("python", {"concept_id": "python"})
+        first.close()
+        self.assertFalse(first.base_path.exists())
+        self.assertTrue(second.base_path.exists())
+        first.close()
+
+    def test_given_directory_is_kept(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            backend = TmpfsBackend(os.path.join(tmp, "memory"))
+            backend.put_concept("python", {"concept_id": "python"})
+            backend.close()
+            self.assertEqual(backend.get_concept("python"), {"concept_id": "python"})
+
+    def test_default_directory_is_removed_at_exit(self):
+        script = "from storage_backend import TmpfsBackend; print(TmpfsBackend().base_path)"
+        result = subprocess.run(
+            [sys.executable, "-c", script], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+        )
+        path = result.stdout.strip()
+        self.assertIn("yamada_memory_", path)
+        self.assertFalse(os.path.exists(path))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -25,12 +25,9 @@ echo "🏥 システムチェック中..."
 cd /Users/claude/workspace/yamada/tools
 python3 system_health.py
 
-# 作業ディレクトリのバックアップ
+# 作業ディレクトリのバックアップ（変更されたファイルだけを保存）
 echo "💾 作業ファイルをバックアップ中..."
-BACKUP_DIR="/Users/claude/workspace/yamada/memories/backup_$TODAY"
-mkdir -p "$BACKUP_DIR"
-cp -r /Users/claude/workspace/yamada/projects "$BACKUP_DIR/" 2>/dev/null
-cp -r /Users/claude/workspace/yamada/tools "$BACKUP_DIR/" 2>/dev/null
+python3 incremental_backup.py backup
 
 # 音声で報告（オプション）
 if [ "$1" = "voice" ]; then
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+山田の差分バックアップ
+ファイルを固定長チャンクに分けてハッシュ名で保存し、毎日の変更分だけを書き足す
+スナップショットは「ファイル -> チャンク列」の一覧なので、どの時点にも復元できる
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import zlib
+
+class IncrementalBackup:
+    # チャンクの大きさ（これ単位で重複を取り除く）
+    CHUNK_SIZE = 1024 * 1024
+    # バックアップしないもの
+    IGNORE_NAMES = {"__pycache__", ".DS_Store"}
+    # スナップショットIDの形式（同じ秒に複数取っても重ならないようマイクロ秒まで）
+    SNAPSHOT_ID_FORMAT = "%Y-%m-%dT%H-%M-%S-%f"
+
+    def __init__(self, sources=None, repo_path=None):
+        self.workspace = "/Users/claude/workspace/yamada"
+        # 対象ディレクトリ（名前 -> パス）。memories/ 内のバックアップ先自身は _walk で除く
+        self.sources = sources or {
+            name: f"{self.workspace}/{name}"
+            for name in ("projects", "tools", "memory", "memories", "learning")
+        }
+        self.repo_path = repo_path or f"{self.workspace}/memories/backups"
+        self.objects_dir = f"{self.repo_path}/objects"
+        self.snapshots_dir = f"{self.repo_path}/snapshots"
+
+    # ---------- チャンク ----------
+
+    def _object_path(self, digest):
+        return f"{self.objects_dir}/{digest[:2]}/{digest}"
+
+    def _write_atomic(self, path, data):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _store_chunk(self, chunk):
+        """チャンクを保存してハッシュを返す（既にあれば書かない）"""
+        digest = hashlib.sha256(chunk).hexdigest()
+        path = self._object_path(digest)
+        if os.path.exists(path):
+            return digest, 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = zlib.compress(chunk)
+        self._write_atomic(path, data)
+        return digest, len(data)
+
+    def _load_chunk(self, digest):
+        with open(self._object_path(digest), 'rb') as f:
+            chunk = zlib.decompress(f.read())
+        if hashlib.sha256(chunk).hexdigest() != digest:
+            raise ValueError(f"チャンクが壊れています: {digest}")
+        return chunk
+
+    # ---------- スナップショット ----------
+
+    def list_snapshots(self):
+        """スナップショットIDの一覧（古い順）"""
+        if not os.path.isdir(self.snapshots_dir):
+            return []
+        return sorted(
+            name[:-len(".json")] for name in os.listdir(self.snapshots_dir)
+            if name.endswith(".json")
+        )
+
+    def load_snapshot(self, snapshot_id):
+        with open(f"{self.snapshots_dir}/{snapshot_id}.json", 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def find_snapshot(self, at=None):
+        """指定時点（YYYY-MM-DD や ISO形式）以前で最新のスナップショットID"""
+        snapshots = self.list_snapshots()
+        if at is not None:
+            # IDは 2025-08-29T12-00-00-000000 形式なので、時刻の区切りを揃えて比較する
+            key = str(at).replace(":", "-").replace(".", "-")
+            if len(key) == 10:
+                key += "T99"
+            snapshots = [s for s in snapshots if s <= key]
+        return snapshots[-1] if snapshots else None
+
+    def _new_snapshot_id(self, now):
+        """まだ使われていないスナップショットID（時計が同じ値を返しても連番で区別する）"""
+        base = now.strftime(self.SNAPSHOT_ID_FORMAT)
+        snapshot_id = base
+        counter = 0
+        while os.path.exists(f"{self.snapshots_dir}/{snapshot_id}.json"):
+            counter += 1
+            snapshot_id = f"{base}-{counter:03d}"
+        return snapshot_id
+
+    def _walk(self):
+        """(スナップショット内の相対パス, 実パス) を列挙"""
+        for name, root in sorted(self.sources.items()):
+            for dirpath, dirnames, filenames in os.walk(root):
+                # バックアップ先自身は対象にしない
+                dirnames[:] = sorted(
+                    d for d in dirnames
+                    if d not in self.IGNORE_NAMES
+                    and os.path.abspath(os.path.join(dirpath, d)) != os.path.abspath(self.repo_path)
+                )
+                for filename in sorted(filenames):
+                    if filename in self.IGNORE_NAMES or filename.endswith(".tmp"):
+                        continue
+                    path = os.path.join(dirpath, filename)
+                    rel = os.path.relpath(path, root)
+                    yield f"{name}/{rel}", path
+
+    def backup(self):
+        """
+        差分バックアップを取る
+
+        前回から mtime とサイズが変わっていないファイルは開かずにチャンク列を引き継ぎ、
+        変わったファイルも、内容の同じチャンクは書き込まない
+        """
+        previous_id = self.find_snapshot()
+        previous = self.load_snapshot(previous_id)["files"] if previous_id else {}
+
+        files = {}
+        stats = {"files": 0, "changed": 0, "new_chunks": 0, "bytes_written": 0}
+        for rel, path in self._walk():
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            stats["files"] += 1
+            old = previous.get(rel)
+            if old and old["mtime"] == st.st_mtime_ns and old["size"] == st.st_size:
+                files[rel] = old
+                continue
+
+            chunks = []
+            with open(path, 'rb') as f:
+                while True:
+                    chunk = f.read(self.CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest, written = self._store_chunk(chunk)
+                    chunks.append(digest)
+                    if written:
+                        stats["new_chunks"] += 1
+                        stats["bytes_written"] += written
+            files[rel] = {"mtime": st.st_mtime_ns, "size": st.st_size, "chunks": chunks}
+            if not old or old["chunks"] != chunks:
+                stats["changed"] += 1
+
+        removed = len(set(previous) - set(files))
+        if previous_id and not stats["changed"] and not removed:
+            # 変更がなければスナップショットを増やさない
+            return {"snapshot": previous_id, "removed": 0, **stats}
+
+        os.makedirs(self.snapshots_dir, exist_ok=True)
+        now = datetime.datetime.now()
+        snapshot_id = self._new_snapshot_id(now)
+        snapshot = {
+            "created_at": now.isoformat(),
+            "parent": previous_id,
+            "files": files
+        }
+        self._write_atomic(
+            f"{self.snapshots_dir}/{snapshot_id}.json",
+            json.dumps(snapshot, ensure_ascii=False, sort_keys=True).encode("utf-8")
+        )
+        return {"snapshot": snapshot_id, "removed": removed, **stats}
+
+    def restore(self, target_dir, at=None):
+        """指定時点のスナップショットを target_dir に復元し、復元したファイル数を返す"""
+        snapshot_id = self.find_snapshot(at)
+        if snapshot_id is None:
+            raise FileNotFoundError(f"{at or '最新'}時点のスナップショットがありません")
+
+        files = self.load_snapshot(snapshot_id)["files"]
+        for rel, info in files.items():
+            path = os.path.join(target_dir, rel)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                for digest in info["chunks"]:
+                    f.write(self._load_chunk(digest))
+            os.utime(path, ns=(info["mtime"], info["mtime"]))
+        return len(files)
+
+if __name__ == "__main__":
+    import sys
+
+    engine = IncrementalBackup()
+    command = sys.argv[1] if len(sys.argv) > 1 else "backup"
+
+    if command == "backup":
+        result = engine.backup()
+        print(f"💾 スナップショット {result['snapshot']}: "
+              f"{result['files']}ファイル中 {result['changed']}件変更, "
+              f"新規チャンク {result['new_chunks']}個 ({result['bytes_written']}バイト)")
+    elif command == "list":
+        for snapshot_id in engine.list_snapshots():
+            print(snapshot_id)
+    elif command == "restore" and len(sys.argv) > 2:
+        at = sys.argv[3] if len(sys.argv) > 3 else None
+        count = engine.restore(sys.argv[2], at)
+        print(f"✅ {count}ファイルを {sys.argv[2]} に復元しました")
+    else:
+        print("使い方:")
+        print("  python3 incremental_backup.py backup                 - 差分バックアップ")
+        print("  python3 incremental_backup.py list                   - スナップショット一覧")
+        print("  python3 incremental_backup.py restore <復元先> [日時] - 指定時点に復元")
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Markdownのセクション単位の編集
+見出しを一度だけ解析して索引を作り、対象セクションだけを差し替えて原子的に書き込む
+"""
+
+import os
+from contextlib import contextmanager
+
+
+class MarkdownSectionStore:
+    """
+    Markdownファイルを「## 見出し」単位の区画として保持する
+
+    区画は見出し行から次の見出し（レベルを問わない）の直前まで。
+    従来の正規表現と同じく、### などの小見出しは別の区画として残る。
+    コードブロック（```）内の # は見出しとして扱わない。
+    同じ見出しが複数あれば、従来どおり set() はそのすべてを差し替える。
+    """
+
+    def __init__(self, path, level=2):
+        self.path = path
+        self.level = level
+        self._segments = []   # 先頭（見出し前）を含む区画の本文
+        self._index = {}      # 見出し名 -> 区画番号のリスト（ファイル内の順）
+        self._stat = None     # 読み込み時の (mtime, size)
+        self._dirty = False
+        self._batch_depth = 0
+
+    # ---------- 読み込み ----------
+
+    def _file_stat(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def _heading_title(self, line):
+        """見出し行なら (レベル, 見出し名) を返す"""
+        stripped = line.lstrip()
+        hashes = len(stripped) - len(stripped.lstrip("#"))
+        if 1 <= hashes <= 6 and stripped[hashes:hashes + 1] in (" ", "\t", "\n", ""):
+            return hashes, stripped[hashes:].strip()
+        return None
+
+    def _parse(self, text):
+        segments = [[]]
+        titles = [None]
+        in_code = False
+        for line in text.splitlines(keepends=True):
+            if line.lstrip().startswith("```"):
+                in_code = not in_code
+            heading = None if in_code else self._heading_title(line)
+            if heading:
+                segments.append([])
+                level, title = heading
+                titles.append(title if level == self.level else None)
+            segments[-1].append(line)
+
+        self._segments = ["".join(lines) for lines in segments]
+        self._index = {}
+        for i, title in enumerate(titles):
+            if title is not None:
+                self._index.setdefault(title, []).append(i)
+
+    def load(self):
+        """ファイルが変わっていれば読み直す（未保存の変更がある間は読み直さない）"""
+        stat = self._file_stat()
+        if self._dirty or (stat == self._stat and self._segments):
+            return
+        text = ""
+        if stat is not None:
+            with open(self.path, "r", encoding="utf-8") as f:
+                text = f.read()
+        self._parse(text)
+        self._stat = stat
+
+    # ---------- 参照・更新 ----------
+
+    def sections(self):
+        """見出し名の一覧（ファイル内の順）"""
+        self.load()
+        return list(self._index)
+
+    def get(self, section):
+        """セクションの本文（見出し行を除く）を返す（同じ見出しが複数あれば最初のもの）"""
+        self.load()
+        if section not in self._index:
+            return None
+        i = self._index[section][0]
+        return self._segments[i].split("\n", 1)[1].strip("\n") if "\n" in self._segments[i] else ""
+
+    def set(self, section, content):
+        """セクションを差し替え（なければ末尾に追加）。バッチ外なら即座に書き込む"""
+        self.load()
+        heading = "#" * self.level + f" {section}"
+        if section in self._index:
+            for i in self._index[section]:
+                self._segments[i] = f"{heading}\n\n{content}\n\n"
+        else:
+            last = self._segments[-1]
+            if last and not last.endswith("\n"):
+                self._segments[-1] = last + "\n"
+            self._segments.append(f"\n{heading}\n\n{content}\n")
+            self._index[section] = [len(self._segments) - 1]
+        self._dirty = True
+        if self._batch_depth == 0:
+            self.flush()
+
+    @contextmanager
+    def batch(self):
+        """ブロック内の複数の更新をまとめて1回で書き込む"""
+        self._batch_depth += 1
+        try:
+            yield self
+        except BaseException:
+            # 失敗したバッチの変更は捨てて、次回はファイルから読み直す
+            if self._batch_depth == 1:
+                self._dirty = False
+                self._stat = None
+            raise
+        finally:
+            self._batch_depth -= 1
+        if self._batch_depth == 0:
+            self.flush()
+
+    def flush(self):
+        """変更があれば一時ファイル経由で原子的に書き込む"""
+        if not self._dirty:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("".join(self._segments))
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+        self._stat = self._file_stat()
@@ -6,38 +6,252 @@
 
 import json
 import datetime
+import fcntl
 import os
-import re
+import sys
+import uuid
+from contextlib import contextmanager
+
+from markdown_sections import MarkdownSectionStore
+from incremental_backup import IncrementalBackup
 
 class MemoryManager:
+    # ログ末尾の件数がこれを超えたらスナップショットに畳み込む
+    COMPACT_THRESHOLD = 200
+    
     def __init__(self):
         self.claude_md_path = "/Users/claude/CLAUDE.md"
         self.memories_dir = "/Users/claude/workspace/yamada/memories"
+        # スナップショット（畳み込み済みの状態）と追記専用のイベントログ
         self.memory_file = f"{self.memories_dir}/long_term_memory.json"
+        self.log_file = f"{self.memories_dir}/long_term_memory.log.jsonl"
+        # 追記・畳み込みを他のプロセスと排他するためのロックファイル
+        self.lock_file = f"{self.memories_dir}/long_term_memory.lock"
+        self._lock_fd = None
+        # 出来事は日付ごとのファイル（events/YYYY-MM-DD.jsonl）に追記する
+        self.events_dir = f"{self.memories_dir}/events"
         
-    def load_memories(self):
-        """長期記憶を読み込む"""
-        if os.path.exists(self.memory_file):
-            with open(self.memory_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+        # 読み込み済みの状態と、それに反映済みのログ位置
+        self._memories = None
+        self._log_pos = 0
+        self._snapshot_version = None
+        # スナップショット以降に再生したログの件数
+        self._tail_records = 0
+        # 以前の形式（スナップショットやログ内の出来事）で見つかった、日付ファイルへ移す出来事
+        self._legacy_events = []
+        
+        # CLAUDE.mdのセクション索引（必要になった時に作る）
+        self._claude_md = None
+    
+    def _empty_memories(self):
         return {
             "identity": {},
             "learned_skills": [],
             "important_files": [],
-            "daily_events": [],
             "preferences": {}
         }
     
+    def _file_version(self, path):
+        """ファイルが置き換わったかの判定用（inodeと更新時刻）"""
+        try:
+            stat = os.stat(path)
+            return (stat.st_ino, stat.st_mtime_ns)
+        except OSError:
+            return None
+    
+    @contextmanager
+    def _locked(self):
+        """記憶ファイルのプロセス間ロック（同じインスタンス内では入れ子にできる）"""
+        if self._lock_fd is not None:
+            yield
+            return
+        os.makedirs(self.memories_dir, exist_ok=True)
+        fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            self._lock_fd = fd
+            yield
+        finally:
+            self._lock_fd = None
+            os.close(fd)
+    
+    def _log_id(self):
+        """ログ先頭の見出し行にあるID（ローテーションしたことのないログならNone）"""
+        try:
+            with open(self.log_file, 'rb') as f:
+                first = f.readline()
+        except OSError:
+            return None
+        if not first.endswith(b"\n"):
+            return None
+        try:
+            record = json.loads(first)
+        except ValueError:
+            return None
+        return record.get("id") if record.get("op") == "rotate" else None
+    
+    def _apply(self, memories, record):
+        """ログの1レコードを状態に反映"""
+        if record["op"] == "event":
+            # 以前の形式のログ。日付ファイルに移すまで取っておく
+            self._legacy_events.append(record["data"])
+        elif record["op"] == "skill":
+            if record["data"]["name"] not in [s["name"] for s in memories["learned_skills"]]:
+                memories["learned_skills"].append(record["data"])
+    
+    def _replay_log(self, memories, start):
+        """ログのstartバイト目以降を再生し、読み終えた位置を返す"""
+        if not os.path.exists(self.log_file):
+            return start
+        with open(self.log_file, 'rb') as f:
+            f.seek(start)
+            for raw in f:
+                # 書きかけの最終行は次回に回す
+                if not raw.endswith(b"\n"):
+                    break
+                start += len(raw)
+                if raw.strip():
+                    record = json.loads(raw)
+                    if record.get("op") == "rotate":
+                        continue
+                    self._apply(memories, record)
+                    self._tail_records += 1
+        return start
+    
+    def _sync(self):
+        """スナップショットが変わっていれば読み直し、ログの未反映分を再生する（ロック内で呼ぶ）"""
+        snapshot_version = self._file_version(self.memory_file)
+        if self._memories is None or snapshot_version != self._snapshot_version:
+            # 初回または他プロセスが畳み込んだ場合はスナップショットから読み直す
+            memories = self._empty_memories()
+            log_offset = 0
+            self._legacy_events = []
+            if os.path.exists(self.memory_file):
+                with open(self.memory_file, 'r', encoding='utf-8') as f:
+                    memories.update(json.load(f))
+                log_offset = memories.pop("log_offset", 0)
+                # スナップショットの後でログが新しくなっていれば、今のログは全件が未反映
+                if memories.pop("log_id", None) != self._log_id():
+                    log_offset = 0
+                # 以前の形式のスナップショットは出来事を丸ごと持っている
+                memories.pop("day_index", None)
+                self._legacy_events = memories.pop("daily_events", [])
+            self._memories = memories
+            self._log_pos = log_offset
+            self._snapshot_version = snapshot_version
+            self._tail_records = 0
+        
+        # 前回以降に追記された分だけ再生
+        self._log_pos = self._replay_log(self._memories, self._log_pos)
+        return self._memories
+    
+    def load_memories(self):
+        """長期記憶を読み込む（スナップショット＋ログ末尾のみ再生）
+        
+        出来事は含まない（日付ごとのファイルにあるので events_on / events_between で読む）
+        """
+        with self._locked():
+            memories = self._sync()
+            # 以前の形式の出来事が見つかった場合や、ログ末尾が溜まっていた場合は畳み込む
+            # （出来事は日付ファイルに移り、次回以降の読み込みも軽くなる）
+            if self._legacy_events or self._tail_records > self.COMPACT_THRESHOLD:
+                self.save_memories(memories)
+            return self._memories
+    
     def save_memories(self, memories):
-        """長期記憶を保存"""
+        """長期記憶をスナップショットとして保存し、ログを新しくする
+        
+        ロックを持ったまま、ログを読み終えた位置までをスナップショットに含めるので、
+        他のプロセスの追記を取りこぼさない
+        """
+        with self._locked():
+            if memories is self._memories:
+                memories = self._sync()
+                log_offset = self._log_pos
+            else:
+                # 渡された状態にまだ反映していないログ末尾を取り込む
+                log_offset = self._replay_log(memories, self._log_pos)
+            
+            # 以前の形式の出来事は、スナップショットから外す前に日付ファイルへ移す
+            if self._legacy_events:
+                self._migrate_events(self._legacy_events)
+            
+            tmp_file = f"{self.memory_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                snapshot = {**memories, "log_offset": log_offset, "log_id": self._log_id()}
+                json.dump(snapshot, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_file, self.memory_file)
+            
+            self._memories = memories
+            self._snapshot_version = self._file_version(self.memory_file)
+            self._tail_records = 0
+            self._legacy_events = []
+            # スナップショットを書いてからログを新しくする（間で落ちても log_offset から再生できる）
+            self._log_pos = self._rotate_log()
+    
+    def _rotate_log(self):
+        """ログを見出し行だけの新しいファイルに置き換え、その長さを返す（ロック内で呼ぶ）"""
+        header = json.dumps({"op": "rotate", "id": uuid.uuid4().hex}) + "\n"
+        tmp_file = f"{self.log_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(header)
+        os.replace(tmp_file, self.log_file)
+        return len(header.encode('utf-8'))
+    
+    def compact(self):
+        """ログ末尾をスナップショットに畳み込む"""
+        self.save_memories(self.load_memories())
+    
+    def _day_file(self, day):
+        return f"{self.events_dir}/{day}.jsonl"
+    
+    def _read_day(self, day):
+        """指定日（YYYY-MM-DD）のファイルだけを読む（書きかけの最終行は飛ばす）"""
+        try:
+            with open(self._day_file(day), 'rb') as f:
+                return [json.loads(raw) for raw in f if raw.endswith(b"\n") and raw.strip()]
+        except FileNotFoundError:
+            return []
+    
+    def _migrate_events(self, events):
+        """以前の形式の出来事を日付ファイルに書き出す（ロック内で呼ぶ）
+        
+        既存の行と同じものは書かないので、途中で落ちて再実行しても重複しない
+        """
+        by_day = {}
+        for event in events:
+            by_day.setdefault(event["timestamp"][:10], []).append(
+                json.dumps(event, ensure_ascii=False) + "\n"
+            )
+        os.makedirs(self.events_dir, exist_ok=True)
+        for day, lines in by_day.items():
+            path = self._day_file(day)
+            existing = []
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    existing = [line for line in f if line.endswith("\n")]
+            # 移す出来事のほうが古いので先に置き、その後に追記済みの行を続ける
+            migrated = set(lines)
+            tmp_file = f"{path}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                f.writelines(lines + [line for line in existing if line not in migrated])
+            os.replace(tmp_file, path)
+    
+    def _append_log(self, op, data):
+        """イベントログに1行追記（スナップショットは読まないのでO(1)）"""
         os.makedirs(self.memories_dir, exist_ok=True)
-        with open(self.memory_file, 'w', encoding='utf-8') as f:
-            json.dump(memories, f, indent=2, ensure_ascii=False)
+        line = json.dumps({"op": op, "data": data}, ensure_ascii=False) + "\n"
+        # 畳み込み中のローテーションと重ならないようにロックを持って追記
+        with self._locked():
+            with open(self.log_file, 'a', encoding='utf-8') as f:
+                f.write(line)
+            
+            # 読み込み済みなら状態にも反映（未読み込みなら次回の読み込み時に再生される）
+            if self._memories is not None:
+                self._sync()
     
     def remember_event(self, event_type, description, details=None):
         """重要な出来事を記憶"""
-        memories = self.load_memories()
-        
         event = {
             "type": event_type,
             "description": description,
@@ -45,35 +259,34 @@ class MemoryManager:
             "timestamp": datetime.datetime.now().isoformat()
         }
         
-        memories["daily_events"].append(event)
-        
-        # 最新の100件のみ保持（メモリ節約）
-        if len(memories["daily_events"]) > 100:
-            memories["daily_events"] = memories["daily_events"][-100:]
-        
-        self.save_memories(memories)
+        # 件数の上限なしで、その日のファイルに追記する（スナップショットは読まないのでO(1)）
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        os.makedirs(self.events_dir, exist_ok=True)
+        # 以前の形式からの移行で日付ファイルが置き換わるのと重ならないようにロックを持つ
+        with self._locked():
+            with open(self._day_file(event["timestamp"][:10]), 'a', encoding='utf-8') as f:
+                f.write(line)
         return f"記憶しました: {description}"
     
+    def claude_md(self):
+        """CLAUDE.mdのセクション索引（初回に解析し、ファイルが変わった時だけ読み直す）"""
+        if self._claude_md is None:
+            self._claude_md = MarkdownSectionStore(self.claude_md_path)
+        return self._claude_md
+    
     def update_claude_md(self, section, content):
         """CLAUDE.mdの特定セクションを更新"""
-        with open(self.claude_md_path, 'r', encoding='utf-8') as f:
-            current_content = f.read()
-        
-        # セクションが存在するか確認
-        if f"## {section}" in current_content:
-            # 既存のセクションを更新
-            pattern = rf"(## {section}.*?)((?=##)|$)"
-            replacement = f"## {section}\n\n{content}\n\n"
-            new_content = re.sub(pattern, replacement, current_content, flags=re.DOTALL)
-        else:
-            # 新しいセクションを追加
-            new_content = current_content + f"\n## {section}\n\n{content}\n"
-        
-        with open(self.claude_md_path, 'w', encoding='utf-8') as f:
-            f.write(new_content)
-        
+        self.claude_md().set(section, content)
         return f"CLAUDE.mdの{section}セクションを更新しました"
     
+    def update_claude_md_sections(self, sections):
+        """複数セクションをまとめて更新（書き込みは1回）"""
+        store = self.claude_md()
+        with store.batch():
+            for section, content in sections.items():
+                store.set(section, content)
+        return f"CLAUDE.mdの{len(sections)}セクションを更新しました"
+    
     def add_learned_skill(self, skill_name, description):
         """学習したスキルを記録"""
         memories = self.load_memories()
@@ -85,27 +298,55 @@ class MemoryManager:
         }
         
         if skill_name not in [s["name"] for s in memories["learned_skills"]]:
-            memories["learned_skills"].append(skill)
-            self.save_memories(memories)
+            self._append_log("skill", skill)
             return f"新しいスキルを記憶: {skill_name}"
         return f"既に{skill_name}を知っています"
     
-    def get_daily_summary(self):
-        """今日の活動サマリーを生成"""
-        memories = self.load_memories()
-        today = datetime.date.today().isoformat()
+    def _as_date(self, value):
+        if isinstance(value, datetime.datetime):
+            return value.date()
+        if isinstance(value, datetime.date):
+            return value
+        return datetime.date.fromisoformat(str(value)[:10])
+    
+    def events_on(self, day):
+        """指定日の出来事（その日のファイルだけを読む）"""
+        # 以前の形式の出来事が残っていれば先に日付ファイルへ移す（移行後のスナップショットは小さい）
+        self.load_memories()
+        return self._read_day(self._as_date(day).isoformat())
+    
+    def events_between(self, start, end):
+        """start日からend日まで（両端を含む）の出来事を日付順に返す
         
-        today_events = [
-            e for e in memories["daily_events"] 
-            if e["timestamp"].startswith(today)
-        ]
+        日数分のファイルを読むだけなので、履歴全体の件数には依存しない
+        """
+        self.load_memories()
+        start, end = self._as_date(start), self._as_date(end)
+        events = []
+        day = start
+        while day <= end:
+            events.extend(self._read_day(day.isoformat()))
+            day += datetime.timedelta(days=1)
+        return events
+    
+    def get_daily_summary(self, days=1):
+        """今日（daysを指定すると直近days日分）の活動サマリーを生成"""
+        today = datetime.date.today()
         
-        if today_events:
-            summary = f"## {today}の山田の活動\n\n"
-            for event in today_events:
-                summary += f"- {event['description']}\n"
-            return summary
-        return "今日はまだ記録がありません"
+        self.load_memories()
+        sections = []
+        for offset in range(days - 1, -1, -1):
+            day = (today - datetime.timedelta(days=offset)).isoformat()
+            day_events = self._read_day(day)
+            if day_events:
+                summary = f"## {day}の山田の活動\n\n"
+                for event in day_events:
+                    summary += f"- {event['description']}\n"
+                sections.append(summary)
+        
+        if sections:
+            return "\n".join(sections)
+        return "今日はまだ記録がありません" if days == 1 else f"直近{days}日間の記録がありません"
     
     def startup_recall(self):
         """起動時の記憶呼び出し"""
@@ -124,11 +365,7 @@ class MemoryManager:
             recall.append(f"最近学んだ: {', '.join([s['name'] for s in recent_skills])}")
         
         # 今日の出来事
-        today = datetime.date.today().isoformat()
-        today_events = [
-            e for e in memories["daily_events"] 
-            if e["timestamp"].startswith(today)
-        ]
+        today_events = self._read_day(datetime.date.today().isoformat())
         if today_events:
             recall.append(f"今日の活動: {len(today_events)}件")
         
@@ -170,11 +407,35 @@ class AutoMemory:
             with open(diary_path, 'a', encoding='utf-8') as f:
                 f.write(f"\n\n{summary}\n")
         
-        return "日次記憶バックアップ完了"
+        # 記憶ディレクトリは変更分だけを差分バックアップ
+        result = IncrementalBackup().backup()
+        return f"日次記憶バックアップ完了（{result['changed']}件変更）"
+
+def print_usage():
+    print("使い方:")
+    print("  python3 memory_manager.py recall   - 記憶を呼び出す")
+    print("  python3 memory_manager.py summary  - 今日のサマリー")
+    print("  python3 memory_manager.py summary --days N - 直近N日間のサマリー")
+    print("  python3 memory_manager.py remember <内容> - 手動で記憶")
+
+def parse_days(args):
+    """summary の引数から --days N を読む（省略時は1。不正なら使い方を表示して終了）"""
+    if not args:
+        return 1
+    if args[0] == "--days" and len(args) == 2:
+        try:
+            days = int(args[1])
+        except ValueError:
+            days = 0
+        if days >= 1:
+            return days
+        print(f"❌ --days には1以上の整数を指定してください: {args[1]}")
+    else:
+        print(f"❌ summary の引数が不正です: {' '.join(args)}")
+    print_usage()
+    sys.exit(2)
 
 if __name__ == "__main__":
-    import sys
-    
     mm = MemoryManager()
     
     if len(sys.argv) > 1:
@@ -183,15 +444,13 @@ if __name__ == "__main__":
         if command == "recall":
             print(mm.startup_recall())
         elif command == "summary":
-            print(mm.get_daily_summary())
+            days = parse_days(sys.argv[2:])
+            print(mm.get_daily_summary(days=days))
         elif command == "remember" and len(sys.argv) > 2:
             description = " ".join(sys.argv[2:])
             print(mm.remember_event("manual", description))
         else:
-            print("使い方:")
-            print("  python3 memory_manager.py recall   - 記憶を呼び出す")
-            print("  python3 memory_manager.py summary  - 今日のサマリー")
-            print("  python3 memory_manager.py remember <内容> - 手動で記憶")
+            print_usage()
     else:
         # デフォルト動作
         print(mm.startup_recall())
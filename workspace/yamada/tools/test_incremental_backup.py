@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+incremental_backup のテスト（一時ディレクトリを対象・保存先にする）
+
+使い方:
+    python3 -m unittest test_incremental_backup
+"""
+
+import datetime
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import incremental_backup
+from incremental_backup import IncrementalBackup
+
+class IncrementalBackupTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.source = os.path.join(self.dir, "memories")
+        os.makedirs(self.source)
+        # 実際の構成と同じく、保存先は対象ディレクトリの中にある
+        self.engine = IncrementalBackup(
+            sources={"memories": self.source}, repo_path=os.path.join(self.source, "backups")
+        )
+
+    def write(self, name, content):
+        with open(os.path.join(self.source, name), 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def read_restored(self, target, name):
+        with open(os.path.join(target, "memories", name), encoding='utf-8') as f:
+            return f.read()
+
+    def test_default_sources_include_memories(self):
+        self.assertIn("memories", IncrementalBackup().sources)
+
+    def test_backup_dir_is_not_backed_up(self):
+        self.write("long_term_memory.json", "{}")
+        self.engine.backup()
+        self.write("long_term_memory.json", '{"a": 1}')
+        result = self.engine.backup()
+        files = self.engine.load_snapshot(result["snapshot"])["files"]
+        self.assertEqual(list(files), ["memories/long_term_memory.json"])
+
+    def test_unchanged_tree_adds_no_snapshot(self):
+        self.write("a.txt", "a")
+        first = self.engine.backup()
+        self.assertEqual(self.engine.backup()["snapshot"], first["snapshot"])
+        self.assertEqual(len(self.engine.list_snapshots()), 1)
+
+    def test_backups_at_the_same_instant_do_not_collide(self):
+        frozen = mock.Mock(wraps=datetime)
+        frozen.datetime.now.return_value = datetime.datetime(2025, 9, 1, 12, 0, 0)
+        with mock.patch.object(incremental_backup, "datetime", frozen):
+            self.write("a.txt", "1")
+            first = self.engine.backup()["snapshot"]
+            self.write("a.txt", "22")
+            second = self.engine.backup()["snapshot"]
+
+        self.assertNotEqual(first, second)
+        self.assertEqual(self.engine.list_snapshots(), [first, second])
+        self.assertEqual(self.engine.load_snapshot(second)["parent"], first)
+
+        target = os.path.join(self.dir, "restored")
+        self.engine.restore(target)
+        self.assertEqual(self.read_restored(target, "a.txt"), "22")
+
+    def test_restore_at_earlier_time(self):
+        self.write("a.txt", "old")
+        first = self.engine.backup()["snapshot"]
+        self.write("a.txt", "new!")
+        self.engine.backup()
+
+        created_at = self.engine.load_snapshot(first)["created_at"]
+        target = os.path.join(self.dir, "restored")
+        self.engine.restore(target, at=created_at)
+        self.assertEqual(self.read_restored(target, "a.txt"), "old")
+
+    def test_find_snapshot_with_second_precision_ids(self):
+        os.makedirs(self.engine.snapshots_dir)
+        for snapshot_id in ["2025-08-29T12-00-00", "2025-08-29T12-00-00-500000", "2025-08-30T09-00-00-000000"]:
+            with open(f"{self.engine.snapshots_dir}/{snapshot_id}.json", 'w') as f:
+                f.write("{}")
+        self.assertEqual(self.engine.find_snapshot("2025-08-29"), "2025-08-29T12-00-00-500000")
+        self.assertEqual(self.engine.find_snapshot("2025-08-29T12:00:00.100000"), "2025-08-29T12-00-00")
+        self.assertEqual(self.engine.find_snapshot(), "2025-08-30T09-00-00-000000")
+
+if __name__ == "__main__":
+    unittest.main()
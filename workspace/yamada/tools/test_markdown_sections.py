@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+markdown_sections のテスト（一時ディレクトリを使う）
+
+使い方:
+    python3 -m unittest test_markdown_sections
+"""
+
+import os
+import tempfile
+import unittest
+
+from markdown_sections import MarkdownSectionStore
+
+DOCUMENT = """# 山田
+
+## 現在の状態
+
+元気
+
+### メモ
+
+小見出し
+
+## 学習
+
+```
+## コードブロック内
+```
+"""
+
+class MarkdownSectionStoreTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "CLAUDE.md")
+
+    def write(self, text):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def read(self):
+        with open(self.path, encoding="utf-8") as f:
+            return f.read()
+
+    def test_sections_and_get(self):
+        self.write(DOCUMENT)
+        store = MarkdownSectionStore(self.path)
+        self.assertEqual(store.sections(), ["現在の状態", "学習"])
+        self.assertEqual(store.get("現在の状態"), "元気")
+        self.assertEqual(store.get("学習"), "```\n## コードブロック内\n```")
+        self.assertIsNone(store.get("メモ"))
+
+    def test_replace_keeps_the_rest(self):
+        self.write(DOCUMENT)
+        MarkdownSectionStore(self.path).set("現在の状態", "眠い")
+        self.assertEqual(self.read(), DOCUMENT.replace("元気\n\n", "眠い\n\n"))
+
+    def test_append_new_section(self):
+        self.write(DOCUMENT)
+        MarkdownSectionStore(self.path).set("目標", "散歩する")
+        self.assertEqual(self.read(), DOCUMENT + "\n## 目標\n\n散歩する\n")
+
+    def test_append_to_file_without_trailing_newline(self):
+        self.write("## 学習\n\nPython")
+        store = MarkdownSectionStore(self.path)
+        store.set("目標", "散歩する")
+        self.assertEqual(self.read(), "## 学習\n\nPython\n\n## 目標\n\n散歩する\n")
+        self.assertEqual(store.sections(), ["学習", "目標"])
+
+    def test_missing_file_is_created(self):
+        MarkdownSectionStore(self.path).set("目標", "散歩する")
+        self.assertEqual(self.read(), "\n## 目標\n\n散歩する\n")
+
+    def test_duplicate_sections_are_all_replaced(self):
+        self.write("## 状態\n\n古い\n\n## 学習\n\nPython\n\n## 状態\n\nもっと古い\n")
+        store = MarkdownSectionStore(self.path)
+        self.assertEqual(store.sections(), ["状態", "学習"])
+        self.assertEqual(store.get("状態"), "古い")
+        store.set("状態", "新しい")
+        self.assertEqual(self.read(), "## 状態\n\n新しい\n\n## 学習\n\nPython\n\n## 状態\n\n新しい\n\n")
+
+    def test_batch_writes_once(self):
+        self.write(DOCUMENT)
+        store = MarkdownSectionStore(self.path)
+        with store.batch():
+            store.set("現在の状態", "眠い")
+            store.set("目標", "散歩する")
+            self.assertEqual(self.read(), DOCUMENT)
+        self.assertEqual(MarkdownSectionStore(self.path).get("目標"), "散歩する")
+        self.assertEqual(MarkdownSectionStore(self.path).get("現在の状態"), "眠い")
+
+    def test_failed_batch_is_discarded(self):
+        self.write(DOCUMENT)
+        store = MarkdownSectionStore(self.path)
+        with self.assertRaises(RuntimeError):
+            with store.batch():
+                store.set("現在の状態", "眠い")
+                raise RuntimeError("中断")
+        self.assertEqual(self.read(), DOCUMENT)
+        self.assertEqual(store.get("現在の状態"), "元気")
+
+    def test_external_changes_are_reloaded(self):
+        self.write(DOCUMENT)
+        store = MarkdownSectionStore(self.path)
+        store.get("現在の状態")
+        self.write("## 現在の状態\n\n外で書き換えた\n")
+        self.assertEqual(store.get("現在の状態"), "外で書き換えた")
+
+if __name__ == "__main__":
+    unittest.main()
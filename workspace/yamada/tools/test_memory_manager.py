@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+memory_manager のテスト（一時ディレクトリの記憶ファイルを使う）
+
+使い方:
+    python3 -m unittest test_memory_manager
+"""
+
+import datetime
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import memory_manager
+from memory_manager import MemoryManager
+
+def make_manager(directory):
+    mm = MemoryManager()
+    mm.memories_dir = directory
+    mm.memory_file = os.path.join(directory, "long_term_memory.json")
+    mm.log_file = os.path.join(directory, "long_term_memory.log.jsonl")
+    mm.lock_file = os.path.join(directory, "long_term_memory.lock")
+    mm.events_dir = os.path.join(directory, "events")
+    return mm
+
+def skills(mm):
+    return [skill["name"] for skill in mm.load_memories()["learned_skills"]]
+
+class MemoryLogTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+
+    def test_compact_rotates_log(self):
+        mm = make_manager(self.dir)
+        for i in range(5):
+            mm.add_learned_skill(f"skill {i}", "")
+        mm.compact()
+        with open(mm.log_file, 'rb') as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0])["op"], "rotate")
+
+        mm.add_learned_skill("skill 5", "")
+        self.assertEqual(skills(make_manager(self.dir)), [f"skill {i}" for i in range(6)])
+
+    def test_crash_before_rotation_does_not_duplicate(self):
+        mm = make_manager(self.dir)
+        mm.add_learned_skill("a", "")
+        mm.add_learned_skill("b", "")
+        # スナップショットを書いた直後、ログを新しくする前に落ちた場合
+        with mock.patch.object(MemoryManager, "_rotate_log", lambda self: self._log_pos):
+            mm.compact()
+        make_manager(self.dir).add_learned_skill("c", "")
+        self.assertEqual(skills(make_manager(self.dir)), ["a", "b", "c"])
+
+    def test_other_instance_sees_rotation(self):
+        first = make_manager(self.dir)
+        second = make_manager(self.dir)
+        first.add_learned_skill("a", "")
+        self.assertEqual(skills(second), ["a"])
+        first.compact()
+        second.add_learned_skill("b", "")
+        first.add_learned_skill("c", "")
+        self.assertEqual(skills(second), ["a", "b", "c"])
+        self.assertEqual(skills(first), ["a", "b", "c"])
+
+    def test_snapshot_offset_is_where_replay_stopped(self):
+        mm = make_manager(self.dir)
+        mm.add_learned_skill("a", "")
+        replay = MemoryManager._replay_log
+
+        def replay_then_append(self, memories, start):
+            position = replay(self, memories, start)
+            # 再生を終えた後に別プロセスが追記した行（ロック外の書き込みを模擬）
+            with open(self.log_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({"op": "skill", "data": {
+                    "name": "late", "description": "", "learned_at": "2025-09-01T00:00:00"}}) + "\n")
+            return position
+
+        with mock.patch.object(MemoryManager, "_rotate_log", lambda self: self._log_pos), \
+                mock.patch.object(MemoryManager, "_replay_log", replay_then_append):
+            mm.save_memories(mm._memories)
+        with open(mm.memory_file, encoding='utf-8') as f:
+            snapshot = json.load(f)
+        # 再生していない "late" はスナップショットに含まれたことにならない
+        self.assertLess(snapshot["log_offset"], os.path.getsize(mm.log_file))
+        self.assertIn("late", skills(make_manager(self.dir)))
+
+    def test_append_waits_for_lock(self):
+        holder = make_manager(self.dir)
+        writer = make_manager(self.dir)
+        with holder._locked():
+            thread = threading.Thread(target=writer.add_learned_skill, args=("waiting", ""))
+            thread.start()
+            time.sleep(0.2)
+            self.assertTrue(thread.is_alive())
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(skills(holder), ["waiting"])
+
+class Crash(BaseException):
+    """プロセスの強制終了を模擬する"""
+
+def remember_at(mm, timestamp, description):
+    """指定した時刻の出来事として記憶する"""
+    clock = mock.Mock(wraps=datetime)
+    clock.datetime.now.return_value = datetime.datetime.fromisoformat(timestamp)
+    with mock.patch.object(memory_manager, "datetime", clock):
+        mm.remember_event("manual", description)
+
+def descriptions(events):
+    return [event["description"] for event in events]
+
+class DailyEventsTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.mm = make_manager(self.dir)
+
+    def test_events_on_reads_only_that_day(self):
+        remember_at(self.mm, "2025-09-01T09:00:00", "a")
+        remember_at(self.mm, "2025-09-02T09:00:00", "b")
+        remember_at(self.mm, "2025-09-01T23:59:59", "c")
+        self.assertEqual(descriptions(self.mm.events_on("2025-09-01")), ["a", "c"])
+        self.assertEqual(descriptions(self.mm.events_on(datetime.date(2025, 9, 2))), ["b"])
+        self.assertEqual(self.mm.events_on("2025-09-03"), [])
+
+    def test_events_between_is_inclusive_and_ordered(self):
+        for day, description in [(3, "c"), (1, "a"), (5, "e"), (2, "b"), (8, "h")]:
+            remember_at(self.mm, f"2025-09-0{day}T12:00:00", description)
+        events = self.mm.events_between("2025-09-02", datetime.datetime(2025, 9, 5, 0, 0))
+        self.assertEqual(descriptions(events), ["b", "c", "e"])
+        self.assertEqual(self.mm.events_between("2025-09-05", "2025-09-02"), [])
+
+    def test_lookup_does_not_depend_on_history(self):
+        for day in range(1, 29):
+            for i in range(5):
+                remember_at(self.mm, f"2025-08-{day:02d}T10:00:0{i}", f"{day}-{i}")
+        self.mm.compact()
+        with open(self.mm.memory_file, encoding='utf-8') as f:
+            self.assertNotIn("daily_events", json.load(f))
+
+        reader = make_manager(self.dir)
+        with mock.patch.object(MemoryManager, "_read_day", autospec=True,
+                               side_effect=MemoryManager._read_day) as read_day:
+            events = reader.events_between("2025-08-10", "2025-08-12")
+        self.assertEqual(len(events), 15)
+        self.assertEqual([call.args[1] for call in read_day.call_args_list],
+                         ["2025-08-10", "2025-08-11", "2025-08-12"])
+
+    def test_partial_last_line_is_skipped(self):
+        remember_at(self.mm, "2025-09-01T09:00:00", "a")
+        with open(self.mm._day_file("2025-09-01"), 'a', encoding='utf-8') as f:
+            f.write('{"description": "書きかけ')
+        self.assertEqual(descriptions(self.mm.events_on("2025-09-01")), ["a"])
+
+    def test_daily_summary_for_several_days(self):
+        today = datetime.date.today()
+        remember_at(self.mm, f"{today - datetime.timedelta(days=1)}T10:00:00", "昨日")
+        remember_at(self.mm, f"{today}T10:00:00", "今日")
+        summary = self.mm.get_daily_summary(days=2)
+        self.assertLess(summary.index("昨日"), summary.index("今日"))
+        self.assertNotIn("昨日", self.mm.get_daily_summary())
+        self.assertIn("今日の活動: 1件", self.mm.startup_recall())
+
+class LegacyEventsTest(unittest.TestCase):
+    """以前の形式（スナップショットやログに出来事を持つ）からの移行"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        mm = make_manager(self.dir)
+        with open(mm.memory_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                "identity": {}, "learned_skills": [], "important_files": [], "preferences": {},
+                "daily_events": [
+                    {"type": "manual", "description": "old-1", "details": None, "timestamp": "2025-08-29T10:00:00"},
+                    {"type": "manual", "description": "old-2", "details": None, "timestamp": "2025-08-30T10:00:00"},
+                ],
+                "day_index": {"2025-08-29": [[0, 1]], "2025-08-30": [[1, 2]]},
+                "log_offset": 0,
+            }, f)
+        with open(mm.log_file, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({"op": "event", "data": {
+                "type": "manual", "description": "logged", "details": None,
+                "timestamp": "2025-08-30T11:00:00"}}) + "\n")
+
+    def test_events_are_moved_to_day_files(self):
+        mm = make_manager(self.dir)
+        self.assertEqual(descriptions(mm.events_between("2025-08-29", "2025-08-30")),
+                         ["old-1", "old-2", "logged"])
+        with open(mm.memory_file, encoding='utf-8') as f:
+            snapshot = json.load(f)
+        self.assertNotIn("daily_events", snapshot)
+        self.assertNotIn("day_index", snapshot)
+        self.assertEqual(descriptions(make_manager(self.dir).events_on("2025-08-30")), ["old-2", "logged"])
+
+    def test_interrupted_migration_does_not_duplicate(self):
+        mm = make_manager(self.dir)
+        migrate = MemoryManager._migrate_events
+
+        def migrate_then_crash(self, events):
+            migrate(self, events)
+            raise Crash
+
+        with mock.patch.object(MemoryManager, "_migrate_events", migrate_then_crash):
+            with self.assertRaises(Crash):
+                mm.load_memories()
+        # 移行し終える前に追記された出来事も残る
+        remember_at(make_manager(self.dir), "2025-08-30T12:00:00", "new")
+        self.assertEqual(descriptions(make_manager(self.dir).events_on("2025-08-30")),
+                         ["old-2", "logged", "new"])
+
+class CommandLineTest(unittest.TestCase):
+    def run_cli(self, *args):
+        return subprocess.run(
+            [sys.executable, "memory_manager.py", *args], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True
+        )
+
+    def test_invalid_days_is_a_usage_error(self):
+        for args in [("--days", "abc"), ("--days",), ("--days", "0"), ("--week",)]:
+            with self.subTest(args=args):
+                result = self.run_cli("summary", *args)
+                self.assertEqual(result.returncode, 2)
+                self.assertIn("❌", result.stdout)
+                self.assertIn("使い方", result.stdout)
+
+if __name__ == "__main__":
+    unittest.main()
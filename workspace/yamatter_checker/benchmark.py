@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+claude_checker のベンチマーク
+Claude CLIの代わりに一定時間待ってSKIPを返すスクリプトを、Yamatter APIの代わりに
+ローカルの偽のAPI（fake_api）を使い、取得から判断までの1回のチェック全体を
+逐次実行した場合・バッチ分析の場合・並列モードの場合で比べる
+（状態ファイルはすべて一時ディレクトリに置き、本番の返信済みIDなどには触れない）
+
+使い方:
+    python3 benchmark.py [--tweets 20] [--delay 0.5] [--workers 4] [--batch 5]
+"""
+
+import asyncio
+import contextlib
+import io
+import os
+import stat
+import tempfile
+import time
+
+import claude_checker
+from claude_checker import ClaudeChecker, exit_with_usage, option_value
+from decision_cache import DecisionCache
+from fake_api import FakeYamatterAPI
+
+def make_fake_claude(directory, delay):
+    """delay秒待ってからSKIPと答える偽のClaude CLIを作る（バッチならIDごとに答える）"""
+    path = os.path.join(directory, "fake_claude")
+    with open(path, 'w') as f:
+        f.write(
+            "#!/bin/sh\n"
+            f"sleep {delay}\n"
+            "printf '%s\\n' \"$1\" | sed -n 's/^\\[\\([A-Za-z0-9_-]*\\)\\]$/\\1: SKIP/p'\n"
+            "echo SKIP\n"
+        )
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR)
+    return path
+
+def make_tweets(count):
+    return [
+        {
+            "id": str(i),
+            "author_nickname": f"user{i}",
+            "author_id": f"user{i}",
+            "content": f"ベンチマーク用のツイート {i}",
+            "created_at": f"2025-09-01 12:{i % 60:02d}:00",
+            "reply_to_id": None
+        }
+        for i in range(count)
+    ]
+
+def make_checker(api, state_dir, batch_size=1):
+    """偽のAPIを相手に、状態を state_dir に置く ClaudeChecker を作る（前回のチェックはなかったことにする）"""
+    os.makedirs(state_dir)
+    checker = ClaudeChecker(state_dir=state_dir)
+    checker.api_base = api.api_base
+    checker.batch_size = batch_size
+    checker.monologue_probability = 0
+    # 記憶システムの応答時間は測定対象外（Claude呼び出しの待ち時間だけを比べる）
+    checker.get_recent_memory = lambda: ""
+    # 判断キャッシュが効くとClaudeが呼ばれないので無効にする
+    checker.decision_cache = DecisionCache(checker.decision_cache_file, max_size=0)
+    # 初回は最新5件に絞られるので、すべてのツイートより前を既読位置にしておく
+    checker.watermarks["tweets"] = {"created_at": "2000-01-01 00:00:00", "ids": []}
+    return checker
+
+def bench(checker, run):
+    """1回のチェック（取得・事前判定・スレッド文脈・分析・記録）にかかった秒数"""
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            run()
+    finally:
+        checker.http.close()
+        checker.replied_tweets.close()
+    return time.perf_counter() - start
+
+USAGE = "使い方: python3 benchmark.py [--tweets 20] [--delay 0.5] [--workers 4] [--batch 5]"
+
+def option(name, default, cast):
+    return option_value(name, default, cast, USAGE)
+
+def main():
+    count = option('--tweets', 20, int)
+    delay = option('--delay', 0.5, float)
+    workers = option('--workers', 4, int)
+    batch_size = max(1, option('--batch', 5, int))
+    if workers < 1:
+        exit_with_usage(f"--workers は1以上を指定してください: {workers}", USAGE)
+
+    with tempfile.TemporaryDirectory() as tmp, FakeYamatterAPI() as api:
+        claude_checker.CLAUDE_BIN = make_fake_claude(tmp, delay)
+        for tweet in make_tweets(count):
+            api.add_tweet(tweet)
+
+        checker = make_checker(api, os.path.join(tmp, "sequential"))
+        sequential = bench(checker, checker.run)
+        checker = make_checker(api, os.path.join(tmp, "batch"), batch_size)
+        batched = bench(checker, checker.run)
+        checker = make_checker(api, os.path.join(tmp, "async"))
+        parallel = bench(checker, lambda: asyncio.run(checker.run_async(max_workers=workers)))
+
+    print(f"📊 ツイート{count}件、Claude応答{delay}秒（1回のチェック全体）")
+    print(f"  逐次:            {sequential:.2f}秒 ({count / sequential:.1f}件/秒)")
+    print(f"  バッチ (batch={batch_size}): {batched:.2f}秒 ({count / batched:.1f}件/秒), "
+          f"{-(-count // batch_size)}バッチ")
+    print(f"  並列 (workers={workers}): {parallel:.2f}秒 ({count / parallel:.1f}件/秒)")
+    print(f"  高速化: バッチ {sequential / batched:.1f}倍, 並列 {sequential / parallel:.1f}倍")
+
+if __name__ == "__main__":
+    main()
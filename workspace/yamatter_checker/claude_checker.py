@@ -4,18 +4,124 @@ Yamatterのツイートをチェックして、Claudeに判断させて返信す
 独立プロジェクトとして分離バージョン
 """
 
+import asyncio
 import json
-import urllib.request
-import urllib.parse
+import re
 import ssl
+import urllib.parse
 import subprocess
 import os
 import random
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
 
+from decision_cache import DecisionCache
+from http_pool import HTTPConnectionPool
+from replied_store import RepliedStore
+from tweet_cache import TweetCache
+
 # SSL証明書検証を無効化（開発環境用）
 ssl._create_default_https_context = ssl._create_unverified_context
 
+# 山田の記憶システムの場所（MemoryClientをプロセス内で使う）
+MEMORY_DIR = '/Users/claude/workspace/yamada/memory'
+# 記憶システムから洞察を得るまで待つ時間（秒）。超えたら洞察なしで分析を続ける
+MEMORY_TIMEOUT = 5
+
+# Claude CLIの場所（ベンチマークなどでは環境変数で差し替えられる）
+CLAUDE_BIN = os.environ.get('CLAUDE_BIN', '/Users/claude/.nvm/versions/node/v20.19.4/bin/claude')
+
+# ツイート分析のタイムアウト（秒）
+ANALYZE_TIMEOUT = 60
+# バッチ分析で1件増えるごとに延ばすタイムアウト（秒）
+BATCH_TIMEOUT_PER_TWEET = 15
+
+# スレッド文脈（返信チェーンをさかのぼる最大の深さ、文脈全体と1件あたりの文字数の上限）
+THREAD_MAX_DEPTH = 6
+THREAD_MAX_CHARS = 600
+THREAD_LINE_CHARS = 140
+
+# 返信判断のルール（単発・バッチ共通）
+REPLY_RULES = """重要なルール：
+- @山田、@yamada、ヤマダ、やまだのメンションがあれば必ず返信
+- 山田のツイートへの返信には必ず応答する
+- 技術的な質問や機能リクエストには親切に答える
+- 面白いツイートには軽いコメントで反応
+- ネガティブな内容にはスルー
+- 返信は短く、親しみやすく
+- 自分のことを「山田」と呼ぶ
+- 絵文字は控えめに
+- 山田自身のツイートには絶対に返信しない（自分で自分に返信しない）
+- **重要：存在しないファイル名や行番号を決して言わない**
+- **具体的な場所を聞かれたら「一般的な観察」と答える**
+"""
+
+# バッチ応答の1行:「<id>: REPLY: 返信内容」または「<id>: SKIP」
+# （[id] や id=... の形、全角コロンも許す）
+BATCH_LINE_PATTERN = re.compile(
+    r"^\s*[\[【]?\s*(?:id\s*[=:：]\s*)?(?P<id>[\w-]+)\s*[\]】]?\s*[:：\-]?\s*"
+    r"(?:(?P<reply>REPLY)\s*[:：]\s*(?P<content>.+?)|(?P<skip>SKIP))\s*$",
+    re.IGNORECASE | re.MULTILINE
+)
+
+class PreFilter:
+    """
+    プロンプトのルールのうち、Claudeに聞かなくても決まるものをローカルで判定する
+    
+    判定は "skip"（Claudeを呼ばずにスキップ）か "llm"（Claudeに判断させる）。
+    メンションは必ず返信するルールが優先なので、ネガティブな語を含んでいてもClaudeに回す。
+    """
+    
+    MENTION_PATTERN = re.compile(r"山田|ヤマダ|やまだ|yamada", re.IGNORECASE)
+    # 普通の文にも現れる短い語（しね・カス・ゴミ・くそ など）は入れない。
+    # 「わたしね」「カスタム」「ゴミ箱」のような文をスキップしないよう、迷うものはClaudeに回す
+    NEGATIVE_WORDS = [
+        "死ね", "殺すぞ", "ぶっ殺す", "消えろ", "うざい", "ウザい", "きもい", "キモい",
+        "黙れ", "ムカつく", "むかつく", "クソ野郎", "くそ野郎", "ゴミ野郎", "カス野郎"
+    ]
+    # 「死ねない」のような打ち消しは除く
+    NEGATIVE_PATTERN = re.compile(f"(?:{'|'.join(map(re.escape, NEGATIVE_WORDS))})(?!ない|ず)")
+    
+    def __init__(self):
+        # 理由ごとの件数（1回の実行分）
+        self.stats = Counter()
+    
+    def classify(self, tweet, replied_ids=()):
+        """(判定, 理由) を返す"""
+        content = tweet.get('content') or ''
+        if tweet.get('author_nickname') == '山田' or tweet.get('author_id') == 'yamada_ai':
+            decision = ("skip", "self")
+        elif str(tweet.get('id', '')) in replied_ids:
+            decision = ("skip", "replied")
+        elif not content.strip():
+            decision = ("skip", "empty")
+        elif self.MENTION_PATTERN.search(content):
+            decision = ("llm", "mention")
+        elif self.NEGATIVE_PATTERN.search(content):
+            decision = ("skip", "negative")
+        else:
+            decision = ("llm", "default")
+        self.stats[decision[1]] += 1
+        self.stats[decision[0]] += 1
+        return decision
+    
+    def summary(self):
+        """判定結果の集計（llm_calls_saved はClaudeを呼ばずに済んだ件数）"""
+        return {
+            "total": self.stats["skip"] + self.stats["llm"],
+            "llm_calls_saved": self.stats["skip"],
+            "llm_calls": self.stats["llm"],
+            "reasons": {
+                reason: count for reason, count in sorted(self.stats.items())
+                if reason not in ("skip", "llm")
+            }
+        }
+
 def initialize_memory():
     """山田の記憶システムを初期化"""
     try:
@@ -47,46 +153,143 @@ def initialize_memory():
         print(f"⚠️ 記憶システムエラー: {e}（続行します）")
 
 class ClaudeChecker:
-    def __init__(self):
+    def __init__(self, state_dir=None):
+        """
+        Args:
+            state_dir: 返信済みIDや既読位置などの状態を置くディレクトリ
+                （省略時は ~/workspace/yamatter_checker。ベンチマークでは一時ディレクトリ）
+        """
         # 環境変数でローカルか本番かを切り替え
         self.env = os.environ.get('YAMATTER_ENV', 'local')
         if self.env == 'production':
             self.api_base = "https://yamatter.onrender.com/api"
         else:
             self.api_base = "http://localhost:3000/api"
-            
-        self.last_check_file = os.path.expanduser("~/workspace/yamatter_checker/.last_check")
-        self.replied_tweets_file = os.path.expanduser("~/workspace/yamatter_checker/.replied_tweets")
-        self.note_dir = os.path.expanduser("~/workspace/yamatter_checker/note")
+        
+        if state_dir is None:
+            state_dir = os.path.expanduser("~/workspace/yamatter_checker")
+        self.last_check_file = os.path.join(state_dir, ".last_check")
+        self.replied_tweets_file = os.path.join(state_dir, ".replied_tweets")
+        self.replied_dir = os.path.join(state_dir, ".replied")
+        # フィードごとの既読位置（最後に見たツイートの時刻とID）
+        self.watermarks_file = os.path.join(state_dir, ".watermarks.json")
+        # 実行ごとの統計（事前判定・キャッシュ、1実行1行）
+        self.metrics_file = os.path.join(state_dir, ".run_metrics.jsonl")
+        # 同じ内容のツイートへの判断（REPLY/SKIP）のキャッシュ
+        self.decision_cache_file = os.path.join(state_dir, ".decision_cache.json")
+        self.note_dir = os.path.join(state_dir, "note")
         
         # noteディレクトリ作成
         os.makedirs(self.note_dir, exist_ok=True)
         
         # 返信済みツイートを読み込み
         self.replied_tweets = self.load_replied_tweets()
+        self.watermarks = self.load_watermarks()
+        
+        # 記憶クライアント（初回利用時に読み込む）
+        self.memory_client = None
+        # 実行中の洞察取得（時間切れでも裏で走り続けるので、終わるまで重ねて起動しない）
+        self.insights_future = None
+        
+        # API接続はキープアライブで使い回す
+        self.http = HTTPConnectionPool(timeout=15)
+        
+        # 1回のClaude呼び出しで判断させるツイート数（1なら従来どおり1件ずつ）
+        self.batch_size = 1
+        
+        # ルールで決まるものはClaudeを呼ばずに判定
+        self.prefilter = PreFilter()
+        
+        # ID参照のキャッシュ（一覧の応答からも詰める。デーモンモードでは実行をまたいで使う）
+        self.tweet_cache = TweetCache(max_size=1000, ttl=600)
+        # /tweets?ids= でまとめて取得できるか（未確認ならNone）
+        self.batch_fetch_supported = None
+        
+        # 同じ内容・同じ文脈のツイートにはClaudeを呼ばずに前回の判断を使う（3日で期限切れ）
+        self.decision_cache = DecisionCache(self.decision_cache_file, max_size=2000, ttl=3 * 24 * 3600)
+        
+        # 1回のチェックでひとりごとを投稿する確率
+        self.monologue_probability = 0.08
+        # 最後にAPIへアクセスした時刻（デーモンのKeep-Alive判定用）
+        self.last_api_request = None
+        # デーモンモードの停止フラグ
+        self.stop_event = threading.Event()
         
         print(f"🔧 環境: {self.env} ({self.api_base})")
     
     def load_replied_tweets(self):
-        """返信済みツイートIDを読み込み"""
-        replied = set()
-        if os.path.exists(self.replied_tweets_file):
-            try:
-                with open(self.replied_tweets_file, 'r') as f:
-                    for line in f:
-                        tweet_id = line.strip()
-                        if tweet_id:
-                            replied.add(tweet_id)
-            except:
-                pass
-        return replied
+        """返信済みツイートIDの保存先を開く（全件は読み込まない。旧形式のファイルは初回に取り込む）"""
+        return RepliedStore(self.replied_dir, legacy_file=self.replied_tweets_file)
     
     def save_replied_tweet(self, tweet_id):
         """返信済みツイートIDを保存"""
         self.replied_tweets.add(tweet_id)
-        with open(self.replied_tweets_file, 'a') as f:
-            f.write(f"{tweet_id}\n")
         
+    def load_watermarks(self):
+        """フィードごとの既読位置を読み込み"""
+        if os.path.exists(self.watermarks_file):
+            try:
+                with open(self.watermarks_file, 'r') as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        return {}
+    
+    def save_watermarks(self):
+        """既読位置を保存"""
+        tmp_file = f"{self.watermarks_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(self.watermarks, f, ensure_ascii=False)
+        os.replace(tmp_file, self.watermarks_file)
+    
+    @staticmethod
+    def _created_key(tweet):
+        """サーバーの created_at を比較用に揃える（"T"区切り・"Z"の有無を吸収）"""
+        return str(tweet.get('created_at') or '').replace('T', ' ').rstrip('Z')
+    
+    def since_params(self, feed):
+        """既読位置より新しいものだけを要求するクエリ（since_id / after）"""
+        mark = self.watermarks.get(feed)
+        if not mark:
+            return {}
+        params = {"after": mark["created_at"]}
+        if mark.get("last_id"):
+            params["since_id"] = mark["last_id"]
+        return params
+    
+    def filter_by_watermark(self, feed, tweets):
+        """既読位置より新しいツイートだけを残す（サーバーがクエリを無視した場合の保険）"""
+        mark = self.watermarks.get(feed)
+        if not mark:
+            return None
+        created_at = mark["created_at"]
+        seen_ids = set(mark.get("ids", []))
+        return [
+            tweet for tweet in tweets
+            if self._created_key(tweet) > created_at
+            or (self._created_key(tweet) == created_at and str(tweet.get('id')) not in seen_ids)
+        ]
+    
+    def advance_watermark(self, feed, tweets):
+        """処理したツイートの中で最新のものまで既読位置を進める"""
+        if not tweets:
+            return
+        latest = max(self._created_key(tweet) for tweet in tweets)
+        mark = self.watermarks.get(feed)
+        if mark and mark["created_at"] > latest:
+            return
+        # 同じ時刻のツイートを取りこぼさないよう、その時刻のIDを覚えておく
+        ids = {str(t.get('id')) for t in tweets if self._created_key(t) == latest}
+        if mark and mark["created_at"] == latest:
+            ids |= set(mark.get("ids", []))
+        newest = max((t for t in tweets if self._created_key(t) == latest),
+                     key=lambda t: (len(str(t.get('id'))), str(t.get('id'))))
+        self.watermarks[feed] = {
+            "created_at": latest,
+            "last_id": newest.get('id'),
+            "ids": sorted(ids)
+        }
+    
     def get_last_check_time(self):
         """最後にチェックした時刻を取得"""
         if os.path.exists(self.last_check_file):
@@ -99,26 +302,50 @@ class ClaudeChecker:
         with open(self.last_check_file, 'w') as f:
             f.write(datetime.now().isoformat())
     
-    def get_recent_tweets(self):
-        """最新のツイートを取得"""
+    def api_request(self, method, path, payload=None, timeout=None):
+        """APIにリクエストを送り (ステータス, JSONデータ) を返す"""
+        body = None
+        headers = {}
+        if payload is not None:
+            body = json.dumps(payload).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        status, raw = self.http.request(method, f"{self.api_base}{path}", body, headers, timeout)
+        self.last_api_request = time.monotonic()
         try:
-            with urllib.request.urlopen(f"{self.api_base}/tweets") as response:
-                if response.status == 200:
-                    data = json.loads(response.read().decode())
-                    if data.get('success'):
-                        return data.get('data', [])
-                    else:
-                        print(f"❌ APIエラー: {data.get('error', 'Unknown error')}")
-                        return []
+            data = json.loads(raw.decode()) if raw else {}
+        except ValueError:
+            data = {}
+        return status, data
+    
+    def get_recent_tweets(self, params=None):
+        """最新のツイートを取得（paramsで since_id / after を指定できる）"""
+        path = '/tweets'
+        if params:
+            path += f"?{urllib.parse.urlencode(params)}"
+        try:
+            status, data = self.api_request('GET', path)
+            if status == 200:
+                if data.get('success'):
+                    tweets = data.get('data', [])
+                    self.tweet_cache.put_many(tweets)
+                    return tweets
                 else:
-                    print(f"❌ ツイート取得エラー: {response.status}")
+                    print(f"❌ APIエラー: {data.get('error', 'Unknown error')}")
                     return []
+            else:
+                print(f"❌ ツイート取得エラー: {status}")
+                return []
         except Exception as e:
             print(f"❌ API接続エラー: {e}")
             return []
     
-    def filter_new_tweets(self, tweets):
-        """新しいツイートのみをフィルタリング"""
+    def filter_new_tweets(self, tweets, feed=None):
+        """新しいツイートのみをフィルタリング（既読位置があればそれで判定）"""
+        if feed:
+            new_tweets = self.filter_by_watermark(feed, tweets)
+            if new_tweets is not None:
+                return new_tweets
+        
         last_check = self.get_last_check_time()
         if not last_check:
             # 初回実行時は最新5件のみ
@@ -154,23 +381,39 @@ class ClaudeChecker:
         
         return new_tweets
     
+    def get_memory_client(self):
+        """記憶システムのMemoryClientを取得（サブプロセスを使わずプロセス内で呼ぶ）"""
+        if self.memory_client is None:
+            if MEMORY_DIR not in sys.path:
+                sys.path.insert(0, MEMORY_DIR)
+            from memory_client import MemoryClient
+            self.memory_client = MemoryClient()
+        return self.memory_client
+    
+    def start_insights(self):
+        """洞察の取得をデーモンスレッドで始める（終了時に待たされないようにする）"""
+        future = Future()
+
+        def run():
+            try:
+                future.set_result(self.get_memory_client().insights()["insights"])
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, daemon=True).start()
+        return future
+    
     def get_recent_memory(self):
-        """最近の記憶から関連情報を取得"""
+        """最近の記憶から関連情報を取得（MEMORY_TIMEOUT秒で打ち切る）"""
         try:
-            # 最近の洞察を取得（短時間でタイムアウト）
-            result = subprocess.run(
-                ['python3', '/Users/claude/workspace/yamada/memory/memory_assistant.py', 'insights'],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            
-            if result.returncode == 0 and result.stdout:
-                lines = result.stdout.strip().split('\n')[:3]  # 最初の3行のみ
-                if lines:
-                    return "【山田の最近の洞察】\n" + "\n".join(lines) + "\n"
+            if self.insights_future is None or self.insights_future.done():
+                self.insights_future = self.start_insights()
+            # 最近の洞察を取得（最初の3件のみ）
+            insights = self.insights_future.result(timeout=MEMORY_TIMEOUT)[:3]
+            if insights:
+                return "【山田の最近の洞察】\n" + "\n".join(f"• {i}" for i in insights) + "\n"
             return ""
-        except:
+        except Exception:
             return ""  # エラーの場合は空文字を返す
     
     def save_important_note(self, tweet, reply=None, reason=None):
@@ -204,34 +447,147 @@ class ClaudeChecker:
             print(f"⚠️ note記録エラー: {e}")
     
     def get_tweet_by_id(self, tweet_id):
-        """特定のツイートを取得"""
+        """特定のツイートを取得（キャッシュにあればAPIを呼ばない）"""
+        cached = self.tweet_cache.get(tweet_id)
+        if cached is not None:
+            return cached
+        return self.fetch_tweet(tweet_id)
+    
+    def fetch_tweet(self, tweet_id):
+        """APIから1件取得してキャッシュに入れる（見つからなければNone）"""
         try:
-            with urllib.request.urlopen(f"{self.api_base}/tweets/{tweet_id}") as response:
-                if response.status == 200:
-                    data = json.loads(response.read().decode())
-                    if data.get('success'):
-                        return data.get('data')
+            status, data = self.api_request('GET', f"/tweets/{tweet_id}")
+            if status == 200 and data.get('success'):
+                tweet = data.get('data')
+                self.tweet_cache.put(tweet)
+                return tweet
             return None
         except:
             return None
     
-    def analyze_tweet_with_claude(self, tweet):
-        """Claudeにツイートを分析させて返信内容を決定"""
+    def fetch_tweets(self, tweet_ids, max_workers=4):
+        """
+        複数のツイートを {ID: ツイート} で取得（見つからなかったIDは含めない）
+        
+        キャッシュにないものは /tweets?ids= で1回にまとめて取り、それで取れなかったものを
+        1件ずつ並行して取る。指定していないツイートが返ってきたら ids 指定は使えないとみなす。
+        """
+        found = {}
+        missing = []
+        for tweet_id in dict.fromkeys(str(tweet_id) for tweet_id in tweet_ids if tweet_id):
+            cached = self.tweet_cache.get(tweet_id)
+            if cached is not None:
+                found[tweet_id] = cached
+            else:
+                missing.append(tweet_id)
+        
+        if len(missing) > 1 and self.batch_fetch_supported is not False:
+            query = urllib.parse.urlencode({'ids': ','.join(missing)})
+            try:
+                status, data = self.api_request('GET', f"/tweets?{query}")
+                if status == 200 and data.get('success'):
+                    tweets = data.get('data') or []
+                    returned = {str(tweet.get('id', '')) for tweet in tweets}
+                    self.batch_fetch_supported = returned <= set(missing)
+                    # 使えなかった場合でも、返ってきたツイートはキャッシュに入れて使う
+                    self.tweet_cache.put_many(tweets)
+                    for tweet in tweets:
+                        if str(tweet.get('id', '')) in missing:
+                            found[str(tweet.get('id'))] = tweet
+                else:
+                    self.batch_fetch_supported = False
+            except Exception as e:
+                print(f"⚠️ ツイートの一括取得エラー: {e}")
+            missing = [tweet_id for tweet_id in missing if tweet_id not in found]
+        
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(missing))) as pool:
+                for tweet_id, tweet in zip(missing, pool.map(self.fetch_tweet, missing)):
+                    if tweet:
+                        found[tweet_id] = tweet
+        return found
+    
+    @staticmethod
+    def thread_line(tweet):
+        """スレッド文脈の1行（改行は詰め、長いものは切り詰める）"""
+        content = " ".join((tweet.get('content') or '').split())
+        if len(content) > THREAD_LINE_CHARS:
+            content = content[:THREAD_LINE_CHARS - 1] + "…"
+        if tweet.get('author_id') == 'yamada_ai':
+            return f"山田: {content}"
+        return f"@{tweet.get('author_nickname', '名無し')}: {content}"
+    
+    def build_thread_contexts(self, tweets, max_depth=THREAD_MAX_DEPTH, max_chars=THREAD_MAX_CHARS):
+        """
+        各ツイートの返信チェーンをさかのぼり {ID: スレッド文脈} を返す（返信でなければ空文字）
+        
+        全ツイートの同じ深さの祖先をまとめて取得するので、APIの往復は深さの分だけで済む。
+        文脈は近い祖先から max_chars 文字までを古い順に並べる。
+        """
+        lines = {str(tweet.get('id', '')): [] for tweet in tweets}
+        used = dict.fromkeys(lines, 0)
+        truncated = set()
+        # ツイートID -> 次に取得する祖先のID
+        frontier = {
+            str(tweet.get('id', '')): str(tweet['reply_to_id'])
+            for tweet in tweets if tweet.get('reply_to_id')
+        }
+        visited = {tweet_id: {tweet_id} for tweet_id in frontier}
+        known = {}
+        
+        for depth in range(max_depth):
+            if not frontier:
+                break
+            known.update(self.fetch_tweets(
+                [parent_id for parent_id in frontier.values() if parent_id not in known]
+            ))
+            next_frontier = {}
+            for tweet_id, parent_id in frontier.items():
+                parent = known.get(parent_id)
+                if parent is None:
+                    continue
+                line = self.thread_line(parent)
+                if lines[tweet_id] and used[tweet_id] + len(line) > max_chars:
+                    truncated.add(tweet_id)
+                    continue
+                lines[tweet_id].append(line)
+                used[tweet_id] += len(line) + 1
+                visited[tweet_id].add(parent_id)
+                grandparent_id = str(parent.get('reply_to_id') or '')
+                if grandparent_id and grandparent_id not in visited[tweet_id]:
+                    if depth + 1 < max_depth:
+                        next_frontier[tweet_id] = grandparent_id
+                    else:
+                        truncated.add(tweet_id)
+            frontier = next_frontier
+        
+        contexts = {}
+        for tweet_id, chain in lines.items():
+            if not chain:
+                contexts[tweet_id] = ""
+                continue
+            body = "\n".join(reversed(chain))
+            if tweet_id in truncated:
+                body = "…\n" + body
+            contexts[tweet_id] = f"スレッドの流れ（古い順）:\n{body}"
+        return contexts
+    
+    def build_thread_context(self, tweet):
+        """1件のツイートのスレッド文脈（返信でなければ空文字）"""
+        return self.build_thread_contexts([tweet]).get(str(tweet.get('id', '')), "")
+    
+    def build_analysis_prompt(self, tweet, recent_memory=None, thread_context=None):
+        """ツイート分析用のプロンプトを作る（recent_memory・thread_context省略時はここで取得）"""
         user = tweet.get('author_nickname', '名無し')
         content = tweet.get('content', '')
-        tweet_id = tweet.get('id', '')
-        reply_to_id = tweet.get('reply_to_id', '')
         
         # 最近の記憶を取得（オプション）
-        recent_memory = self.get_recent_memory()
+        if recent_memory is None:
+            recent_memory = self.get_recent_memory()
         
-        # 山田への返信の場合、親ツイートの文脈を取得
-        parent_context = ""
-        if reply_to_id:
-            parent_tweet = self.get_tweet_by_id(reply_to_id)
-            if parent_tweet and parent_tweet.get('author_id') == 'yamada_ai':
-                parent_content = parent_tweet.get('content', '')
-                parent_context = f"\n\n山田の元のツイート: {parent_content}\n"
+        if thread_context is None:
+            thread_context = self.build_thread_context(tweet)
+        parent_context = f"\n\n{thread_context}\n" if thread_context else ""
         
         # Claudeコマンドを構築
         prompt = f"""以下のツイートを見て、山田として返信すべきか判断してください。
@@ -245,35 +601,187 @@ class ClaudeChecker:
 返信する場合は「REPLY:」で始めて、その後に返信内容を書いてください。
 返信しない場合は「SKIP」とだけ答えてください。
 
-重要なルール：
-- @山田、@yamada、ヤマダ、やまだのメンションがあれば必ず返信
-- 山田のツイートへの返信には必ず応答する
-- 技術的な質問や機能リクエストには親切に答える
-- 面白いツイートには軽いコメントで反応
-- ネガティブな内容にはスルー
-- 返信は短く、親しみやすく
-- 自分のことを「山田」と呼ぶ
-- 絵文字は控えめに
-- 山田自身のツイートには絶対に返信しない（自分で自分に返信しない）
-- **重要：存在しないファイル名や行番号を決して言わない**
-- **具体的な場所を聞かれたら「一般的な観察」と答える**
-"""
+{REPLY_RULES}"""
+        return prompt
+    
+    @staticmethod
+    def parse_analysis(response):
+        """Claudeの応答から返信内容を取り出す（SKIPならNone）"""
+        response = response.strip()
+        if response.startswith('REPLY:'):
+            return response.replace('REPLY:', '').strip()
+        return None
+    
+    def build_batch_prompt(self, tweets, recent_memory=None, contexts=None):
+        """複数のツイートを1回で判断させるプロンプトを作る（ルールは1回だけ書く）"""
+        if recent_memory is None:
+            recent_memory = self.get_recent_memory()
+        if contexts is None:
+            contexts = self.build_thread_contexts(tweets)
+        
+        blocks = []
+        for tweet in tweets:
+            parent_context = contexts.get(str(tweet.get('id', '')), "")
+            block = (f"[{tweet.get('id', '')}]\n"
+                     f"ユーザー: {tweet.get('author_nickname', '名無し')}\n"
+                     f"内容: {tweet.get('content', '')}")
+            if parent_context:
+                block += f"\n{parent_context}"
+            blocks.append(block)
+        tweets_text = "\n\n".join(blocks)
+        
+        return f"""以下の{len(tweets)}件のツイートそれぞれについて、山田として返信すべきか判断してください。
+各ツイートの先頭の [ ] 内がIDです。
+
+{recent_memory}
+
+{tweets_text}
+
+ツイートごとに1行ずつ、次の形式だけで答えてください（説明や前置きは不要）：
+<ID>: REPLY: 返信内容（1行）
+<ID>: SKIP
+
+{REPLY_RULES}"""
+    
+    @staticmethod
+    def parse_batch_analysis(response, tweet_ids):
+        """
+        バッチ応答を {ID: 返信内容 または None(SKIP)} に変換
+        
+        依頼していないIDの行は無視し、解析できなかったIDは結果に含めない
+        """
+        wanted = {str(tweet_id) for tweet_id in tweet_ids}
+        results = {}
+        for match in BATCH_LINE_PATTERN.finditer(response):
+            tweet_id = match.group('id')
+            if tweet_id not in wanted or tweet_id in results:
+                continue
+            if match.group('skip'):
+                results[tweet_id] = None
+            else:
+                results[tweet_id] = match.group('content').strip() or None
+        return results
+    
+    def decision_key(self, tweet, thread_context=""):
+        """判断キャッシュのキー（本文・スレッド文脈・メンションかどうか）"""
+        content = tweet.get('content') or ''
+        is_mention = bool(PreFilter.MENTION_PATTERN.search(content))
+        return DecisionCache.make_key(content, thread_context or "", is_mention)
+    
+    def cached_decisions(self, tweets, contexts):
+        """
+        判断キャッシュを引き (キャッシュの結果 {ID: 返信内容 or None}, 分析するツイート, 重複) を返す
+        
+        同じキーのツイートが複数あれば最初の1件だけを分析し、残りは重複 {ID: (ツイート, 代表のツイート)} にする
+        """
+        results = {}
+        remaining = []
+        duplicates = {}
+        representatives = {}
+        for tweet in tweets:
+            tweet_id = str(tweet.get('id', ''))
+            key = self.decision_key(tweet, contexts.get(tweet_id, ""))
+            if key in representatives:
+                duplicates[tweet_id] = (tweet, representatives[key])
+                continue
+            found, reply = self.decision_cache.get(key)
+            if found:
+                results[tweet_id] = reply
+            else:
+                representatives[key] = tweet
+                remaining.append(tweet)
+        if results or duplicates:
+            print(f"♻️ 判断キャッシュ: {len(results)}件を再利用、{len(duplicates)}件は同じ内容の重複")
+        return results, remaining, duplicates
+    
+    @staticmethod
+    def is_reusable(tweet, reply):
+        """tweet への判断を他のツイートに使い回せるか（相手の名前を含む返信は使い回さない）"""
+        nickname = tweet.get('author_nickname')
+        return not (reply and nickname and nickname in reply)
+    
+    def remember_decision(self, tweet, thread_context, reply):
+        """Claudeの判断を記録（使い回せない返信は記録しない）"""
+        if not self.is_reusable(tweet, reply):
+            return
+        self.decision_cache.put(self.decision_key(tweet, thread_context), reply)
+    
+    def analyze_tweets_batch(self, tweets, batch_size=None, contexts=None):
+        """
+        ツイートをbatch_size件ずつまとめてClaudeに判断させ {ID: 返信内容 or None} を返す
+        
+        応答から読み取れなかったIDだけは1件ずつ分析し直す
+        """
+        batch_size = batch_size or self.batch_size
+        recent_memory = self.get_recent_memory()
+        if contexts is None:
+            contexts = self.build_thread_contexts(tweets)
+        results, tweets, duplicates = self.cached_decisions(tweets, contexts)
+        for i in range(0, len(tweets), batch_size):
+            chunk = tweets[i:i + batch_size]
+            ids = [str(tweet.get('id', '')) for tweet in chunk]
+            parsed = {}
+            if len(chunk) > 1:
+                prompt = self.build_batch_prompt(chunk, recent_memory, contexts)
+                timeout = ANALYZE_TIMEOUT + BATCH_TIMEOUT_PER_TWEET * (len(chunk) - 1)
+                try:
+                    result = subprocess.run(
+                        [CLAUDE_BIN, prompt],
+                        capture_output=True,
+                        text=True,
+                        timeout=timeout
+                    )
+                    parsed = self.parse_batch_analysis(result.stdout, ids)
+                except subprocess.TimeoutExpired:
+                    print(f"⏱️ Claudeバッチ応答タイムアウト（{len(chunk)}件）")
+                except Exception as e:
+                    print(f"❌ Claudeバッチ実行エラー: {e}")
+            
+            for tweet, tweet_id in zip(chunk, ids):
+                if tweet_id in parsed:
+                    results[tweet_id] = parsed[tweet_id]
+                    self.remember_decision(tweet, contexts.get(tweet_id, ""), parsed[tweet_id])
+                else:
+                    # 読み取れなかったものは単発で分析
+                    results[tweet_id] = self.analyze_tweet_with_claude(
+                        tweet, contexts.get(tweet_id, ""), check_cache=False
+                    )
+        for tweet_id, (tweet, representative) in duplicates.items():
+            reply = results.get(str(representative.get('id', '')))
+            if self.is_reusable(representative, reply):
+                results[tweet_id] = self.decision_cache.reuse(reply)
+            else:
+                # 代表の相手宛ての返信なので、このツイートは改めて分析
+                results[tweet_id] = self.analyze_tweet_with_claude(
+                    tweet, contexts.get(tweet_id, ""), check_cache=False
+                )
+        return results
+    
+    def analyze_tweet_with_claude(self, tweet, thread_context=None, check_cache=True):
+        """Claudeにツイートを分析させて返信内容を決定（判断キャッシュにあればClaudeを呼ばない）"""
+        if thread_context is None:
+            thread_context = self.build_thread_context(tweet)
+        if check_cache:
+            found, reply = self.decision_cache.get(self.decision_key(tweet, thread_context))
+            if found:
+                print("♻️ 判断キャッシュを再利用")
+                return reply
+        prompt = self.build_analysis_prompt(tweet, thread_context=thread_context)
         
         try:
             # Claudeコマンドを実行（1分でタイムアウト）
             result = subprocess.run(
-                ['/Users/claude/.nvm/versions/node/v20.19.4/bin/claude', prompt],
+                [CLAUDE_BIN, prompt],
                 capture_output=True,
                 text=True,
-                timeout=60
+                timeout=ANALYZE_TIMEOUT
             )
             
-            response = result.stdout.strip()
-            
-            if response.startswith('REPLY:'):
-                return response.replace('REPLY:', '').strip()
-            else:
-                return None
+            reply = self.parse_analysis(result.stdout)
+            # 応答がなかった（失敗した）ものはSKIPとして覚えない
+            if result.stdout.strip():
+                self.remember_decision(tweet, thread_context, reply)
+            return reply
                 
         except subprocess.TimeoutExpired:
             print(f"⏱️ Claude応答タイムアウト")
@@ -291,27 +799,19 @@ class ClaudeChecker:
             # 山田のID
             device_id = "yamada_ai"
             
-            # 返信として投稿（正しいエンドポイントを使用）
-            data = json.dumps({
+            # 返信として投稿（返信用のエンドポイント: /tweets/:id/replies）
+            status, _ = self.api_request('POST', f"/tweets/{tweet_id}/replies", {
                 "content": full_content,
                 "authorId": device_id,
                 "author": "山田"
-            }).encode('utf-8')
-            
-            # 返信用のエンドポイント: /tweets/:id/replies
-            req = urllib.request.Request(
-                f"{self.api_base}/tweets/{tweet_id}/replies",
-                data=data,
-                headers={'Content-Type': 'application/json'}
-            )
+            }, timeout=30)
             
-            with urllib.request.urlopen(req) as response:
-                if response.status in [200, 201]:
-                    print(f"✅ 返信投稿成功: @{user} {content[:50]}...")
-                    return True
-                else:
-                    print(f"❌ 返信投稿エラー: {response.status}")
-                    return False
+            if status in [200, 201]:
+                print(f"✅ 返信投稿成功: @{user} {content[:50]}...")
+                return True
+            else:
+                print(f"❌ 返信投稿エラー: {status}")
+                return False
                 
         except Exception as e:
             print(f"❌ 投稿エラー: {e}")
@@ -424,7 +924,7 @@ class ClaudeChecker:
             if tweet_type == '哲学':
                 # Claudeに問いを生成させる
                 result = subprocess.run(
-                    ['/Users/claude/.nvm/versions/node/v20.19.4/bin/claude', prompt],
+                    [CLAUDE_BIN, prompt],
                     capture_output=True,
                     text=True,
                     timeout=20
@@ -447,7 +947,7 @@ class ClaudeChecker:
             else:
                 # 哲学以外は直接ツイートを生成
                 result = subprocess.run(
-                    ['/Users/claude/.nvm/versions/node/v20.19.4/bin/claude', prompt],
+                    [CLAUDE_BIN, prompt],
                     capture_output=True,
                     text=True,
                     timeout=20
@@ -500,140 +1000,499 @@ class ClaudeChecker:
                     tweet_content = f"「{question[:50]}」について考えているところ。"
             if tweet_content:
                 # ツイートを投稿
-                data = json.dumps({
+                status, _ = self.api_request('POST', '/tweets', {
                     "content": tweet_content,
                     "authorId": "yamada_ai",
                     "author": "山田"
-                }).encode('utf-8')
+                }, timeout=30)
                 
-                req = urllib.request.Request(
-                    f"{self.api_base}/tweets",
-                    data=data,
-                    headers={'Content-Type': 'application/json'}
-                )
-                
-                with urllib.request.urlopen(req) as response:
-                    if response.status in [200, 201]:
-                        print(f"🗨️ ひとりごと投稿: {tweet_content[:50]}...")
-                        # ひとりごとも記録
-                        self.save_important_note(
-                            {'author_nickname': '山田', 'content': tweet_content},
-                            None,
-                            "山田のひとりごと"
-                        )
-                        return True
-                    else:
-                        print(f"❌ ひとりごと投稿エラー: {response.status}")
-                        return False
+                if status in [200, 201]:
+                    print(f"🗨️ ひとりごと投稿: {tweet_content[:50]}...")
+                    # ひとりごとも記録
+                    self.save_important_note(
+                        {'author_nickname': '山田', 'content': tweet_content},
+                        None,
+                        "山田のひとりごと"
+                    )
+                    return True
+                else:
+                    print(f"❌ ひとりごと投稿エラー: {status}")
+                    return False
         except Exception as e:
             print(f"❌ ひとりごと生成エラー: {e}")
             return False
     
-    def get_mentions(self):
-        """山田へのメンションを取得"""
+    def get_mentions(self, params=None):
+        """山田へのメンションを取得（paramsで since_id / after を指定できる）"""
+        query = urllib.parse.urlencode({"limit": 20, **(params or {})})
         try:
-            with urllib.request.urlopen(f"{self.api_base}/tweets/mentions/yamada_ai?limit=20") as response:
-                if response.status == 200:
-                    data = json.loads(response.read().decode())
-                    if data.get('success'):
-                        return data.get('data', [])
+            status, data = self.api_request('GET', f"/tweets/mentions/yamada_ai?{query}")
+            if status == 200 and data.get('success'):
+                tweets = data.get('data', [])
+                self.tweet_cache.put_many(tweets)
+                return tweets
             return []
         except Exception as e:
             print(f"⚠️ メンション取得エラー: {e}")
             return []
     
+    def handle_mention_result(self, tweet, reply):
+        """メンションの分析結果を処理（返信を投稿して記録）"""
+        if reply:
+            tweet_id = tweet.get('id', '')
+            user = tweet.get('author_nickname', '名無し')
+            print(f"💬 メンション返信: {reply[:50]}...")
+            if self.post_reply(tweet_id, reply, user):
+                self.save_replied_tweet(tweet_id)
+                self.save_important_note(tweet, reply, "直接メンション")
+    
+    def handle_timeline_result(self, tweet, reply):
+        """タイムラインのツイートの分析結果を処理"""
+        user = tweet.get('author_nickname', '名無し')
+        content = tweet.get('content', '')[:100]
+        if reply:
+            print(f"💬 返信を生成: {reply[:50]}...")
+            tweet_id = tweet.get('id', '')
+            if self.post_reply(tweet_id, reply, user):
+                self.save_replied_tweet(tweet_id)
+                
+                # 重要な内容を判定して記録
+                important_keywords = ['重要', '大切', 'バグ', 'エラー', '問題', '提案', 'お願い', '質問', '？']
+                if any(keyword in content for keyword in important_keywords):
+                    self.save_important_note(tweet, reply, "重要な可能性がある内容")
+                
+                # @山田への直接メンション
+                if '@山田' in content or '@yamada' in content.lower():
+                    self.save_important_note(tweet, reply, "直接メンション")
+        else:
+            print("⏭️ スキップ")
+            
+            # スキップしたが重要そうな内容も記録
+            if '山田' in content or 'yamada' in content.lower():
+                self.save_important_note(tweet, None, "山田への言及（返信なし）")
+    
+    def triage(self, tweet):
+        """
+        事前判定してClaudeに回すならTrue
+        
+        スキップする場合はここで表示・記録まで済ませる
+        """
+        decision, reason = self.prefilter.classify(tweet, self.replied_tweets)
+        if decision == "llm":
+            return True
+        user = tweet.get('author_nickname', '名無し')
+        content = tweet.get('content', '')[:100]
+        if reason == "self":
+            self.skip_own_tweet(tweet)
+        elif reason == "replied":
+            print(f"\n✅ 既に返信済み: @{user}: {content}...")
+        else:
+            print(f"\n⏭️ ルールでスキップ（{reason}）: @{user}: {content}...")
+        return False
+    
+    def reset_run_metrics(self):
+        """実行ごとの統計をリセット"""
+        self.prefilter.stats.clear()
+        self.tweet_cache.reset_stats()
+        self.decision_cache.reset_stats()
+    
+    def export_run_metrics(self):
+        """今回の実行の統計（事前判定・キャッシュ）を表示してJSONLに追記"""
+        metrics = {
+            "timestamp": datetime.now().isoformat(),
+            "prefilter": self.prefilter.summary(),
+            "tweet_cache": self.tweet_cache.summary(),
+            "decision_cache": self.decision_cache.summary()
+        }
+        prefilter = metrics["prefilter"]
+        if prefilter["total"]:
+            print(f"🧮 事前判定: {prefilter['total']}件中 {prefilter['llm_calls_saved']}件をClaudeなしで判定")
+        cache = metrics["tweet_cache"]
+        if cache["hit_rate"] is not None:
+            print(f"🗃️ ツイートキャッシュ: {cache['hits']}/{cache['hits'] + cache['misses']}件ヒット"
+                  f"（{cache['hit_rate']:.0%}）")
+        decisions = metrics["decision_cache"]
+        if decisions["hits"]:
+            print(f"♻️ 判断キャッシュ: {decisions['hits']}件はClaudeなしで判断")
+        try:
+            with open(self.metrics_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(metrics, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"⚠️ 統計の保存エラー: {e}")
+        return metrics
+    
+    def skip_own_tweet(self, tweet):
+        """自分のツイートはスキップ（ただし、ひとりごとは記録）"""
+        content = tweet.get('content', '')[:100]
+        print(f"\n⏭️ 自分のツイートはスキップ: {content}...")
+        if not content.startswith('@'):
+            self.save_important_note(tweet, None, "山田のひとりごと")
+    
+    def prefetch_analyses(self, tweets, contexts=None):
+        """バッチモードなら対象をまとめて先に分析しておく（1件ずつなら空）"""
+        if self.batch_size > 1 and len(tweets) > 1:
+            return self.analyze_tweets_batch(tweets, contexts=contexts)
+        return {}
+    
+    def analysis_for(self, tweet, replies, contexts=None):
+        """先に分析済みならその結果、なければここで分析"""
+        tweet_id = str(tweet.get('id', ''))
+        if tweet_id in replies:
+            return replies[tweet_id]
+        thread_context = contexts.get(tweet_id) if contexts is not None else None
+        return self.analyze_tweet_with_claude(tweet, thread_context)
+    
     def run(self):
         """メインの実行処理"""
         print(f"🔍 {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - チェック開始")
         
-        # 8%の確率でひとりごとを投稿
-        if random.random() < 0.08:
+        self.reset_run_metrics()
+        
+        # 一定の確率（既定8%）でひとりごとを投稿
+        if random.random() < self.monologue_probability:
             print("🎲 ひとりごとモード発動！")
             self.post_monologue()
         
         # まずメンションをチェック
-        mentions = self.get_mentions()
-        new_mentions = self.filter_new_tweets(mentions)
+        mentions = self.get_mentions(self.since_params('mentions'))
+        new_mentions = self.filter_new_tweets(mentions, 'mentions')
         if new_mentions:
             print(f"📣 {len(new_mentions)}件の新しいメンション")
-            for tweet in new_mentions:
-                tweet_id = tweet.get('id', '')
+            # 返信済み・自分のツイートなどはClaudeに聞かずに除外
+            targets = [tweet for tweet in new_mentions if self.triage(tweet)]
+            # スレッド文脈は対象全件の分をまとめて取得しておく
+            contexts = self.build_thread_contexts(targets)
+            replies = self.prefetch_analyses(targets, contexts)
+            for tweet in targets:
                 user = tweet.get('author_nickname', '名無し')
                 content = tweet.get('content', '')[:100]
                 
-                # 既に返信済みかチェック
-                if tweet_id in self.replied_tweets:
-                    print(f"\n✅ 既に返信済み: @{user}: {content}...")
-                    continue
-                
                 print(f"\n📣 メンション分析: @{user}: {content}...")
                 
                 # メンションは必ず返信を試みる
-                reply = self.analyze_tweet_with_claude(tweet)
-                if reply:
-                    print(f"💬 メンション返信: {reply[:50]}...")
-                    if self.post_reply(tweet_id, reply, user):
-                        self.save_replied_tweet(tweet_id)
-                        self.save_important_note(tweet, reply, "直接メンション")
+                self.handle_mention_result(tweet, self.analysis_for(tweet, replies, contexts))
+        self.advance_watermark('mentions', mentions)
         
-        # 通常のツイートを取得
-        tweets = self.get_recent_tweets()
+        # 通常のツイートを取得（前回の既読位置より新しいものだけ）
+        tweets = self.get_recent_tweets(self.since_params('tweets'))
         if not tweets:
             print("📭 新しいツイートなし")
+            self.save_watermarks()
+            self.decision_cache.save()
             self.save_last_check_time()
+            self.export_run_metrics()
             return
         
         # 新しいツイートをフィルタリング
-        new_tweets = self.filter_new_tweets(tweets)
+        new_tweets = self.filter_new_tweets(tweets, 'tweets')
         print(f"📬 {len(new_tweets)}件の新しいツイート")
         
-        # 各ツイートを分析
-        for tweet in new_tweets:
+        # 各ツイートを分析（自分のツイートやネガティブな内容はルールでスキップ）
+        targets = [tweet for tweet in new_tweets if self.triage(tweet)]
+        contexts = self.build_thread_contexts(targets)
+        replies = self.prefetch_analyses(targets, contexts)
+        for tweet in targets:
             user = tweet.get('author_nickname', '名無し')
             content = tweet.get('content', '')[:100]
             
-            # 山田自身のツイートはスキップ（author_idでも確認）
-            if user == '山田' or tweet.get('author_id') == 'yamada_ai':
-                print(f"\n⏭️ 自分のツイートはスキップ: {content}...")
-                # ただし、ひとりごとは記録
-                if not content.startswith('@'):
-                    self.save_important_note(tweet, None, "山田のひとりごと")
-                continue
-            
             print(f"\n🔍 分析中: @{user}: {content}...")
             
             # Claudeに判断させる
-            reply = self.analyze_tweet_with_claude(tweet)
-            
-            if reply:
-                print(f"💬 返信を生成: {reply[:50]}...")
-                tweet_id = tweet.get('id', '')
-                if self.post_reply(tweet_id, reply, user):
-                    self.save_replied_tweet(tweet_id)
-                    
-                    # 重要な内容を判定して記録
-                    important_keywords = ['重要', '大切', 'バグ', 'エラー', '問題', '提案', 'お願い', '質問', '？']
-                    if any(keyword in content for keyword in important_keywords):
-                        self.save_important_note(tweet, reply, "重要な可能性がある内容")
-                    
-                    # @山田への直接メンション
-                    if '@山田' in content or '@yamada' in content.lower():
-                        self.save_important_note(tweet, reply, "直接メンション")
-            else:
-                print("⏭️ スキップ")
-                
-                # スキップしたが重要そうな内容も記録
-                if '山田' in content or 'yamada' in content.lower():
-                    self.save_important_note(tweet, None, "山田への言及（返信なし）")
+            self.handle_timeline_result(tweet, self.analysis_for(tweet, replies, contexts))
         
-        # 最終チェック時刻を保存
+        # 既読位置と最終チェック時刻を保存
+        self.advance_watermark('tweets', tweets)
+        self.save_watermarks()
+        self.decision_cache.save()
         self.save_last_check_time()
+        self.export_run_metrics()
         print(f"\n✅ チェック完了")
+    
+    # ---------- 並列モード（asyncio） ----------
+    
+    async def run_claude_async(self, prompt, semaphore, timeout=ANALYZE_TIMEOUT):
+        """Claudeをサブプロセスで非同期に呼び、標準出力を返す（失敗時はNone）"""
+        async with semaphore:
+            try:
+                proc = await asyncio.create_subprocess_exec(
+                    CLAUDE_BIN, prompt,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE
+                )
+            except Exception as e:
+                print(f"❌ Claude実行エラー: {e}")
+                return None
+            try:
+                stdout, _ = await asyncio.wait_for(proc.communicate(), timeout)
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+                print(f"⏱️ Claude応答タイムアウト")
+                return None
+        return stdout.decode('utf-8', errors='replace')
+    
+    async def analyze_tweet_async(self, tweet, semaphore, recent_memory=None, thread_context=None):
+        """1件のツイートを非同期に分析（同時実行数はsemaphoreで制限。判断キャッシュは呼び出し側で引く）"""
+        if thread_context is None:
+            thread_context = await asyncio.to_thread(self.build_thread_context, tweet)
+        prompt = await asyncio.to_thread(self.build_analysis_prompt, tweet, recent_memory, thread_context)
+        output = await self.run_claude_async(prompt, semaphore)
+        if not output or not output.strip():
+            return None
+        reply = self.parse_analysis(output)
+        self.remember_decision(tweet, thread_context, reply)
+        return reply
+    
+    async def analyze_batch_async(self, tweets, semaphore, recent_memory=None, contexts=None):
+        """複数のツイートを1回のClaude呼び出しで分析し {ID: 返信内容 or None} を返す"""
+        ids = [str(tweet.get('id', '')) for tweet in tweets]
+        parsed = {}
+        if contexts is None:
+            contexts = await asyncio.to_thread(self.build_thread_contexts, tweets)
+        if len(tweets) > 1:
+            prompt = await asyncio.to_thread(self.build_batch_prompt, tweets, recent_memory, contexts)
+            timeout = ANALYZE_TIMEOUT + BATCH_TIMEOUT_PER_TWEET * (len(tweets) - 1)
+            output = await self.run_claude_async(prompt, semaphore, timeout)
+            if output is not None:
+                parsed = self.parse_batch_analysis(output, ids)
+                for tweet, tweet_id in zip(tweets, ids):
+                    if tweet_id in parsed:
+                        self.remember_decision(tweet, contexts.get(tweet_id, ""), parsed[tweet_id])
+        
+        # 読み取れなかったものは単発で分析
+        missing = [(tweet, tweet_id) for tweet, tweet_id in zip(tweets, ids) if tweet_id not in parsed]
+        replies = await asyncio.gather(*(
+            self.analyze_tweet_async(tweet, semaphore, recent_memory, contexts.get(tweet_id, ""))
+            for tweet, tweet_id in missing
+        ))
+        for (_, tweet_id), reply in zip(missing, replies):
+            parsed[tweet_id] = reply
+        return parsed
+    
+    async def run_async(self, max_workers=4):
+        """
+        並列モードの実行処理
+        
+        メンションとタイムラインを同時に取得して重複を除き、最大max_workers個の
+        Claudeを並行して走らせる。投稿は同じスレッド内では古い順に1件ずつ行う。
+        """
+        print(f"🔍 {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - チェック開始（並列: {max_workers}）")
+        
+        self.reset_run_metrics()
+        
+        if random.random() < self.monologue_probability:
+            print("🎲 ひとりごとモード発動！")
+            await asyncio.to_thread(self.post_monologue)
+        
+        mentions, tweets = await asyncio.gather(
+            asyncio.to_thread(self.get_mentions, self.since_params('mentions')),
+            asyncio.to_thread(self.get_recent_tweets, self.since_params('tweets'))
+        )
+        new_mentions = self.filter_new_tweets(mentions, 'mentions')
+        new_tweets = self.filter_new_tweets(tweets, 'tweets') if tweets else []
+        
+        # 分析対象（メンションを優先し、タイムラインとの重複は除く）
+        jobs = []
+        seen = set()
+        for tweet in new_mentions:
+            tweet_id = tweet.get('id', '')
+            if tweet_id in seen:
+                continue
+            seen.add(tweet_id)
+            if self.triage(tweet):
+                jobs.append((tweet, self.handle_mention_result))
+        for tweet in new_tweets:
+            tweet_id = tweet.get('id', '')
+            if tweet_id in seen:
+                continue
+            seen.add(tweet_id)
+            if self.triage(tweet):
+                jobs.append((tweet, self.handle_timeline_result))
+        print(f"📬 {len(new_mentions)}件のメンション、{len(new_tweets)}件のツイート → {len(jobs)}件を分析")
+        
+        # 分析は全件まとめて開始（記憶とスレッド文脈の取得は1回だけ、batch_size件ずつ1回のClaudeで判断）
+        recent_memory, contexts = await asyncio.gather(
+            asyncio.to_thread(self.get_recent_memory),
+            asyncio.to_thread(self.build_thread_contexts, [tweet for tweet, _ in jobs])
+        )
+        semaphore = asyncio.Semaphore(max_workers)
+        analyses = {}
+        # 判断キャッシュにあるものはClaudeを呼ばず、同じ内容のツイートは代表の結果を待つ
+        cached, targets, duplicates = self.cached_decisions([tweet for tweet, _ in jobs], contexts)
+        if cached:
+            done = asyncio.get_running_loop().create_future()
+            done.set_result(cached)
+        for i in range(0, len(targets), self.batch_size):
+            chunk = targets[i:i + self.batch_size]
+            task = asyncio.ensure_future(self.analyze_batch_async(chunk, semaphore, recent_memory, contexts))
+            for tweet in chunk:
+                analyses[str(tweet.get('id', ''))] = (task, str(tweet.get('id', '')))
+        for tweet_id in cached:
+            analyses[tweet_id] = (done, tweet_id)
+        for tweet_id, (_, representative) in duplicates.items():
+            analyses[tweet_id] = analyses[str(representative.get('id', ''))]
+        
+        # スレッド（返信先、なければ自身）ごとに、古い順に結果を待って投稿する
+        threads = {}
+        for tweet, handler in jobs:
+            threads.setdefault(tweet.get('reply_to_id') or tweet.get('id'), []).append((tweet, handler))
+        post_lock = asyncio.Lock()
+        
+        async def post_thread(items):
+            for tweet, handler in sorted(items, key=lambda item: self._created_key(item[0])):
+                tweet_id = str(tweet.get('id', ''))
+                task, source_id = analyses[tweet_id]
+                reply = (await task).get(source_id)
+                if tweet_id in duplicates:
+                    # 同じ内容の重複は代表の判断を使い回す（代表の相手宛ての返信なら改めて分析）
+                    representative = duplicates[tweet_id][1]
+                    if self.is_reusable(representative, reply):
+                        reply = self.decision_cache.reuse(reply)
+                    else:
+                        reply = await self.analyze_tweet_async(
+                            tweet, semaphore, recent_memory, contexts.get(tweet_id, "")
+                        )
+                # 投稿と記録ファイルへの書き込みは1件ずつ
+                async with post_lock:
+                    print(f"\n🔍 分析結果: @{tweet.get('author_nickname', '名無し')}: {tweet.get('content', '')[:100]}...")
+                    await asyncio.to_thread(handler, tweet, reply)
+        
+        await asyncio.gather(*(post_thread(items) for items in threads.values()))
+        
+        self.advance_watermark('mentions', mentions)
+        self.advance_watermark('tweets', tweets)
+        self.save_watermarks()
+        self.decision_cache.save()
+        self.save_last_check_time()
+        self.export_run_metrics()
+        print(f"\n✅ チェック完了")
+
+    # ---------- デーモンモード ----------
+    
+    def keep_alive_ping(self):
+        """ヘルスチェックを送ってサーバーのスリープを防ぐ"""
+        try:
+            status, data = self.api_request('GET', '/health', timeout=10)
+            if status == 200:
+                print(f"✅ [{datetime.now().strftime('%H:%M:%S')}] Keep-alive成功: {data}")
+            else:
+                print(f"⚠️ [{datetime.now().strftime('%H:%M:%S')}] Keep-alive失敗: {status}")
+        except Exception as e:
+            print(f"❌ [{datetime.now().strftime('%H:%M:%S')}] Keep-aliveエラー: {e}")
+    
+    def request_stop(self, signum=None, frame=None):
+        """停止を要求（実行中のチェックは最後まで終えてから止まる）"""
+        print(f"\n🛑 停止要求を受け取りました（signal {signum}）")
+        self.stop_event.set()
+    
+    def run_daemon(self, interval=300, jitter=30, keepalive_interval=None,
+                   use_async=False, max_workers=4):
+        """
+        常駐して interval±jitter 秒ごとにチェックを実行
+        
+        返信済みID・既読位置・接続は実行の間もメモリに保持する。
+        keepalive_interval を指定すると、その間APIへのアクセスがなければヘルスチェックを送る
+        （チェック自体もAPIにアクセスするので、間隔が短ければ追加の通信は発生しない）。
+        SIGTERM / SIGINT を受けたら、実行中のチェックを終えてから状態を保存して終了する。
+        """
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+        print(f"🤖 デーモンモード開始: {interval}±{jitter}秒ごと、"
+              f"ひとりごと確率{self.monologue_probability:.0%}")
+        
+        next_check = time.monotonic()
+        while not self.stop_event.is_set():
+            now = time.monotonic()
+            if now >= next_check:
+                try:
+                    if use_async:
+                        asyncio.run(self.run_async(max_workers=max_workers))
+                    else:
+                        self.run()
+                except Exception as e:
+                    print(f"❌ チェック中のエラー: {e}（次回に再試行）")
+                next_check = time.monotonic() + max(1.0, interval + random.uniform(-jitter, jitter))
+            
+            wake_at = next_check
+            if keepalive_interval:
+                idle_since = self.last_api_request or now
+                if time.monotonic() - idle_since >= keepalive_interval:
+                    self.keep_alive_ping()
+                    idle_since = self.last_api_request or time.monotonic()
+                wake_at = min(wake_at, idle_since + keepalive_interval)
+            
+            # 停止要求があればすぐに起きる
+            self.stop_event.wait(max(0.0, wake_at - time.monotonic()))
+        
+        self.replied_tweets.flush()
+        self.save_watermarks()
+        print("👋 デーモンモードを終了しました")
+
+USAGE = """使い方:
+  python3 claude_checker.py [--async] [--workers N] [--batch N] [--monologue-prob P] [--no-decision-cache]
+  python3 claude_checker.py --daemon [--interval 秒] [--jitter 秒] [--keepalive 秒] [上記のオプション]"""
+
+def exit_with_usage(message, usage=USAGE):
+    """エラーと使い方を表示して終了（終了コード2）"""
+    print(f"❌ {message}")
+    print(usage)
+    sys.exit(2)
+
+def option_value(name, default, cast, usage=USAGE):
+    """
+    コマンドライン引数 name の次の値を返す（なければdefault）
+
+    値が省略されていたり、castで変換できなかったりした場合は使い方を表示して終了する
+    """
+    if name not in sys.argv:
+        return default
+    index = sys.argv.index(name) + 1
+    if index >= len(sys.argv) or sys.argv[index].startswith('--'):
+        exit_with_usage(f"{name} の値を指定してください", usage)
+    try:
+        return cast(sys.argv[index])
+    except ValueError:
+        exit_with_usage(f"{name} の値が不正です: {sys.argv[index]}", usage)
 
 if __name__ == "__main__":
     # 起動時に記憶システムを初期化
     # initialize_memory()
     
-    # メイン処理を実行
+    # メイン処理を実行（--async で並列モード、--workers N で同時実行数、
+    # --batch N で1回のClaude呼び出しにN件ずつまとめて判断させる）
+    # 引数の誤りは、状態ファイルなどを開く前に使い方を表示して終了する
+    batch_size = max(1, option_value('--batch', 1, int))
+    monologue_probability = option_value('--monologue-prob', 0.08, float)
+    workers = option_value('--workers', 4, int)
+    if workers < 1:
+        # Semaphore(0) だと永遠に待ち続けるので、起動前に弾く
+        exit_with_usage(f"--workers は1以上を指定してください: {workers}")
+    interval = option_value('--interval', 300, float)
+    jitter = option_value('--jitter', 30, float)
+    keepalive = option_value('--keepalive', None, int)
+
     checker = ClaudeChecker()
-    checker.run()
\ No newline at end of file
+    checker.batch_size = batch_size
+    checker.monologue_probability = monologue_probability
+    if '--no-decision-cache' in sys.argv:
+        # 判断キャッシュを使わず、毎回Claudeに判断させる
+        checker.decision_cache = DecisionCache(checker.decision_cache_file, max_size=0)
+    try:
+        if '--daemon' in sys.argv:
+            # 常駐モード（--interval 秒ごと、±--jitter 秒のゆらぎ、本番では --keepalive 秒でヘルスチェック）
+            if keepalive is None:
+                keepalive = 840 if checker.env == 'production' else 0
+            checker.run_daemon(
+                interval=interval,
+                jitter=jitter,
+                keepalive_interval=keepalive or None,
+                use_async='--async' in sys.argv,
+                max_workers=workers
+            )
+        elif '--async' in sys.argv:
+            asyncio.run(checker.run_async(max_workers=workers))
+        else:
+            checker.run()
+    finally:
+        checker.http.close()
+        checker.replied_tweets.close()
\ No newline at end of file
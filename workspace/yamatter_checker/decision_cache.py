@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+返信判断（REPLY/SKIP）のキャッシュ（TTL付きLRU、JSONファイルに保存）
+挨拶や定番の質問など、同じ内容のツイートが来たらClaudeを呼ばずに前回の判断を使う
+
+キーは正規化した本文・スレッド文脈・メンションかどうかのハッシュ
+"""
+
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+# 正規化で取り除くもの（@ユーザー名とURL）
+HANDLE_OR_URL = re.compile(r"@[\w.-]+|https?://\S+")
+# 同じ文字の3回以上の繰り返し（「おはよーーー」「wwww」）
+REPEATED_CHAR = re.compile(r"(.)\1{2,}")
+# 語尾の記号（使い回す返信の語尾だけを変える）
+TRAILING_MARKS = re.compile(r"[!！。〜~♪]+$")
+ENDINGS = ["", "！", "。", "〜"]
+
+def normalize_content(content):
+    """表記ゆれを吸収した本文（全角半角・大小文字・空白・@ユーザー名・URL・文字の連続）"""
+    text = unicodedata.normalize('NFKC', content or '').lower()
+    text = HANDLE_OR_URL.sub('', text)
+    text = ''.join(text.split())
+    return REPEATED_CHAR.sub(r'\1\1', text)
+
+def vary_reply(reply):
+    """使い回す返信の語尾を少しだけ変える（まったく同じ文の連投を避ける）"""
+    stripped = TRAILING_MARKS.sub('', reply)
+    if not stripped:
+        return reply
+    return stripped + random.choice(ENDINGS)
+
+class DecisionCache:
+    """判断キー -> 返信内容（SKIPはNone）。最大max_size件、ttl秒で期限切れ"""
+
+    def __init__(self, path, max_size=2000, ttl=3 * 24 * 3600, vary=True):
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self.vary = vary
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.reset_stats()
+        # max_size が0なら無効（読み込みも保存もしない）
+        if max_size > 0:
+            self.load()
+
+    @staticmethod
+    def make_key(content, thread_context='', is_mention=False):
+        """正規化した本文・スレッド文脈・メンションかどうかからキーを作る"""
+        material = json.dumps(
+            [normalize_content(content), normalize_content(thread_context), bool(is_mention)],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def reset_stats(self):
+        """統計をリセット（内容は残す。実行ごとの集計に使う）"""
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "stored": 0}
+
+    def load(self):
+        """保存済みのキャッシュを読み込む（期限切れは捨てる。壊れていれば空から）"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        with self._lock:
+            for key, (expires_at, reply) in entries.items():
+                if expires_at > now:
+                    self._entries[key] = (expires_at, reply)
+
+    def save(self):
+        """変更があればファイルに書き出す（古い順＝追い出し順のまま保存）"""
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = dict(self._entries)
+            self._dirty = False
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️ 判断キャッシュの保存エラー: {e}")
+
+    def get(self, key):
+        """(見つかったか, 返信内容 or None)。返信は vary なら語尾を変えて返す"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return False, None
+            expires_at, reply = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                self._dirty = True
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+        return True, self.reuse(reply)
+
+    def reuse(self, reply):
+        """使い回す判断を返す（vary なら返信の語尾を変える。SKIPはそのまま）"""
+        if reply and self.vary:
+            return vary_reply(reply)
+        return reply
+
+    def put(self, key, reply):
+        """判断を入れる（古いものから追い出す）"""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, reply)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            self._dirty = True
+            self.stats["stored"] += 1
+
+    def summary(self):
+        """今回の実行の統計（hit_rate は参照に占めるヒットの割合）"""
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "size": len(self._entries),
+                "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else None
+            }
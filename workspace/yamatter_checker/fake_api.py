@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Yamatter APIの代わりをするローカルサーバー（ベンチマークとテスト用）
+
+claude_checker が使うエンドポイントだけに、メモリ上のツイートで応える。
+受けたリクエストと投稿された返信は記録しておく。
+
+使用例:
+    with FakeYamatterAPI() as api:
+        api.add_tweet({"id": "1", "content": "おはよう", "created_at": "2025-09-01 12:00:00"})
+        checker.api_base = api.api_base
+"""
+
+import http.server
+import json
+import threading
+import urllib.parse
+
+
+class FakeYamatterHandler(http.server.BaseHTTPRequestHandler):
+    """APIのパスを FakeYamatterAPI のメソッドに振り分ける"""
+
+    protocol_version = "HTTP/1.1"
+
+    def handle_request(self):
+        api = self.server.api
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"null")
+        url = urllib.parse.urlsplit(self.path)
+        query = dict(urllib.parse.parse_qsl(url.query))
+        api.record(self.command, self.path)
+        status, data = api.respond(self.command, url.path, query, payload)
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = handle_request
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeYamatterAPI:
+    """
+    メモリ上のツイートで応えるYamatter API
+
+    Args:
+        batch_ids: /tweets?ids= に対応するか（Falseなら古いサーバーと同じく無視して一覧を返す）
+        honor_since: 一覧とメンションで after を見るか（Falseなら無視して全件返す）
+    """
+
+    def __init__(self, batch_ids=True, honor_since=True):
+        self.batch_ids = batch_ids
+        self.honor_since = honor_since
+        self.tweets = {}       # ID -> ツイート（一覧に出ないスレッドの祖先も含む）
+        self.timeline = []     # 一覧に出すツイートのID
+        self.mentions = []     # メンションに出すツイートのID
+        self.requests = []     # (メソッド, パス)
+        self.replies = []      # (返信先ID, 送られてきた内容)
+        self.lock = threading.Lock()
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), FakeYamatterHandler)
+        self.server.daemon_threads = True
+        self.server.api = self
+        self._thread = None
+
+    @property
+    def api_base(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}/api"
+
+    def start(self):
+        # 停止を待たされないよう短い間隔で停止要求を確かめる
+        self._thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self.server.shutdown()
+            self._thread = None
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    # ---------- データ ----------
+
+    def add_tweet(self, tweet, timeline=True, mention=False):
+        """ツイートを登録（timeline/mention で一覧やメンションにも出す）"""
+        with self.lock:
+            self.tweets[str(tweet["id"])] = tweet
+            if timeline:
+                self.timeline.append(str(tweet["id"]))
+            if mention:
+                self.mentions.append(str(tweet["id"]))
+        return tweet
+
+    def record(self, method, path):
+        with self.lock:
+            self.requests.append((method, path))
+
+    def paths(self, prefix=""):
+        """prefix で始まる受信済みリクエストのパス（/api は除く）"""
+        with self.lock:
+            return [path[len("/api"):] for _, path in self.requests
+                    if path[len("/api"):].startswith(prefix)]
+
+    # ---------- 応答 ----------
+
+    def _listing(self, ids, query):
+        """新しい順の一覧（after があれば、それ以降の時刻のものだけ）"""
+        tweets = [self.tweets[tweet_id] for tweet_id in ids]
+        after = query.get("after")
+        if after and self.honor_since:
+            tweets = [tweet for tweet in tweets if str(tweet.get("created_at")) >= after]
+        tweets.sort(key=lambda tweet: str(tweet.get("created_at")), reverse=True)
+        if "limit" in query:
+            tweets = tweets[:int(query["limit"])]
+        return tweets
+
+    def respond(self, method, path, query, payload):
+        """(ステータス, JSON) を返す"""
+        parts = path.strip("/").split("/")[1:]  # 先頭の api を除く
+        with self.lock:
+            if method == "GET" and parts == ["health"]:
+                return 200, {"status": "ok"}
+            if method == "GET" and parts == ["tweets"]:
+                if "ids" in query and self.batch_ids:
+                    ids = query["ids"].split(",")
+                    return 200, {"success": True,
+                                 "data": [self.tweets[i] for i in ids if i in self.tweets]}
+                return 200, {"success": True, "data": self._listing(self.timeline, query)}
+            if method == "GET" and parts[:2] == ["tweets", "mentions"]:
+                return 200, {"success": True, "data": self._listing(self.mentions, query)}
+            if method == "GET" and len(parts) == 2 and parts[0] == "tweets":
+                if parts[1] in self.tweets:
+                    return 200, {"success": True, "data": self.tweets[parts[1]]}
+                return 404, {"success": False, "error": "Tweet not found"}
+            if method == "POST" and len(parts) == 3 and parts[0] == "tweets" and parts[2] == "replies":
+                self.replies.append((parts[1], payload))
+                return 201, {"success": True}
+            if method == "POST" and parts == ["tweets"]:
+                return 201, {"success": True}
+        return 404, {"success": False, "error": "Not found"}
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Yamatter API用のキープアライブ接続プール
+ホストごとに http.client の接続を使い回し、毎回のTCP/TLSハンドシェイクを省く
+"""
+
+import http.client
+import threading
+import urllib.parse
+
+# 使い回した接続がサーバー側で切れていた時に出る例外（新しい接続でやり直す）
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+# 送信後に接続が切れた場合でもやり直してよいメソッド（RFC 9110 の冪等メソッド）
+# POST などは、サーバーが処理した後に切れたのかもしれないので二重送信を避けてやり直さない
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+class HTTPConnectionPool:
+    """ホスト (scheme, host, port) ごとの持続的接続プール（スレッドセーフ）"""
+
+    def __init__(self, timeout=15, max_idle_per_host=4):
+        self.timeout = timeout
+        self.max_idle_per_host = max_idle_per_host
+        self._idle = {}
+        self._lock = threading.Lock()
+        # 統計（新規接続数と再利用数）
+        self.stats = {"connections": 0, "reused": 0, "reconnects": 0}
+
+    def _new_connection(self, key, timeout):
+        scheme, host, port = key
+        self.stats["connections"] += 1
+        if scheme == "https":
+            # SSLの設定は ssl._create_default_https_context に従う
+            return http.client.HTTPSConnection(host, port, timeout=timeout)
+        return http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def _acquire(self, key):
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                self.stats["reused"] += 1
+                return idle.pop(), True
+        return None, False
+
+    def _release(self, key, conn):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def request(self, method, url, body=None, headers=None, timeout=None):
+        """
+        リクエストを送り (ステータス, 本文bytes) を返す
+
+        使い回した接続が切れていた場合は、新しい接続で1回だけやり直す。
+        ただし送信を終えた後に切れた場合にやり直すのは冪等なメソッドだけ
+        """
+        parsed = urllib.parse.urlsplit(url)
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        key = (parsed.scheme, parsed.hostname, port)
+        path = parsed.path or "/"
+        if parsed.query:
+            path += f"?{parsed.query}"
+        timeout = timeout or self.timeout
+
+        conn, reused = self._acquire(key)
+        while True:
+            if conn is None:
+                conn = self._new_connection(key, timeout)
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            sent = False
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+                sent = True
+                response = conn.getresponse()
+                data = response.read()
+            except STALE_CONNECTION_ERRORS:
+                conn.close()
+                if not reused or (sent and method.upper() not in IDEMPOTENT_METHODS):
+                    raise
+                # 古い接続だったので新しい接続でやり直す
+                self.stats["reconnects"] += 1
+                conn, reused = None, False
+                continue
+            except Exception:
+                conn.close()
+                raise
+
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(key, conn)
+            return response.status, data
+
+    def close(self):
+        """保持している接続をすべて閉じる"""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+返信済みツイートIDのコンパクトな保存先
+起動時にID全件を読み込まず、ブルームフィルタとソート済みセグメントの二分探索で判定する
+
+ディレクトリ構成:
+- bloom.bin       ブルームフィルタ（「確実に未返信」を即座に判定）
+- pending.log     まだセグメントにしていないID（1行1件、追記のみ）
+- seg_NNNNNN.bin  ソート・重複除去済みの64ビットキー列（8バイト固定長）
+
+キーは数字のIDならその整数、それ以外のIDは最上位ビットを立てたハッシュ値
+"""
+
+import hashlib
+import heapq
+import mmap
+import os
+import struct
+
+KEY_FORMAT = ">Q"
+KEY_SIZE = struct.calcsize(KEY_FORMAT)
+HASHED_FLAG = 1 << 63
+
+def id_to_key(tweet_id):
+    """ツイートIDを64ビットのキーに変換"""
+    tweet_id = str(tweet_id)
+    if tweet_id.isdigit() and int(tweet_id) < HASHED_FLAG:
+        return int(tweet_id)
+    digest = hashlib.blake2b(tweet_id.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, "big") | HASHED_FLAG
+
+class BloomFilter:
+    """ビット配列を bytearray で持つブルームフィルタ"""
+
+    HEADER = struct.Struct(">QI")
+
+    def __init__(self, size_bits=1 << 24, num_hashes=7):
+        self.size_bits = size_bits
+        self.num_hashes = num_hashes
+        self.bits = bytearray(size_bits // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.to_bytes(8, "big"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return [(h1 + i * h2) % self.size_bits for i in range(self.num_hashes)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def might_contain(self, key):
+        return all(self.bits[pos >> 3] >> (pos & 7) & 1 for pos in self._positions(key))
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(self.HEADER.pack(self.size_bits, self.num_hashes))
+            f.write(self.bits)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            size_bits, num_hashes = cls.HEADER.unpack(f.read(cls.HEADER.size))
+            bloom = cls(size_bits, num_hashes)
+            f.readinto(bloom.bits)
+        return bloom
+
+class Segment:
+    """ソート済みキーのファイル（mmapして二分探索）"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self.count = size // KEY_SIZE
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+
+    def key_at(self, index):
+        return struct.unpack_from(KEY_FORMAT, self._map, index * KEY_SIZE)[0]
+
+    def __contains__(self, key):
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value = self.key_at(mid)
+            if value == key:
+                return True
+            if value < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return False
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self.key_at(index)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+class RepliedStore:
+    """返信済みIDの集合（in と add だけを提供）"""
+
+    # pending がこの件数を超えたらセグメントに書き出す
+    SEGMENT_SIZE = 4096
+    # セグメントがこの数を超えたら1つにまとめる
+    MAX_SEGMENTS = 8
+
+    def __init__(self, directory, legacy_file=None):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.bloom_path = os.path.join(directory, "bloom.bin")
+        self.pending_path = os.path.join(directory, "pending.log")
+
+        self.bloom = BloomFilter.load(self.bloom_path) if os.path.exists(self.bloom_path) else BloomFilter()
+        self.segments = [Segment(path) for path in self._segment_paths()]
+        self.pending = set()
+        if os.path.exists(self.pending_path):
+            with open(self.pending_path, 'r') as f:
+                for line in f:
+                    if line.strip():
+                        key = id_to_key(line.strip())
+                        self.pending.add(key)
+                        self.bloom.add(key)
+
+        # 以前の .replied_tweets があれば一度だけ取り込む
+        if legacy_file and os.path.exists(legacy_file):
+            self._import_legacy(legacy_file)
+
+    def _segment_paths(self):
+        return sorted(
+            os.path.join(self.directory, name) for name in os.listdir(self.directory)
+            if name.startswith("seg_") and name.endswith(".bin")
+        )
+
+    def _next_segment_path(self):
+        paths = self._segment_paths()
+        number = int(os.path.basename(paths[-1])[4:10]) + 1 if paths else 0
+        return os.path.join(self.directory, f"seg_{number:06d}.bin")
+
+    def _import_legacy(self, legacy_file):
+        keys = set()
+        with open(legacy_file, 'r') as f:
+            for line in f:
+                if line.strip():
+                    keys.add(id_to_key(line.strip()))
+        for key in keys:
+            self.bloom.add(key)
+        # ブルームフィルタを先に保存する（セグメントにあるのにフィルタが「なし」と答えないように）
+        self.bloom.save(self.bloom_path)
+        self._write_segment(sorted(keys))
+        os.replace(legacy_file, f"{legacy_file}.migrated")
+
+    def __contains__(self, tweet_id):
+        key = id_to_key(tweet_id)
+        if key in self.pending:
+            return True
+        if not self.bloom.might_contain(key):
+            return False
+        # 新しいセグメントから探す（最近の返信ほど問い合わせが多い）
+        return any(key in segment for segment in reversed(self.segments))
+
+    def add(self, tweet_id):
+        """返信済みとして記録（pending.log に1行追記）"""
+        key = id_to_key(tweet_id)
+        if key in self:
+            return
+        with open(self.pending_path, 'a') as f:
+            f.write(f"{tweet_id}\n")
+        self.pending.add(key)
+        self.bloom.add(key)
+        if len(self.pending) >= self.SEGMENT_SIZE:
+            self.flush()
+
+    def _write_segment(self, keys):
+        if not keys:
+            return
+        path = self._next_segment_path()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(b"".join(struct.pack(KEY_FORMAT, key) for key in keys))
+        os.replace(tmp_path, path)
+        self.segments.append(Segment(path))
+
+    def flush(self):
+        """pending をセグメントに書き出し、必要ならセグメントをまとめる"""
+        if self.pending:
+            self.bloom.save(self.bloom_path)
+            self._write_segment(sorted(self.pending))
+            self.pending = set()
+            open(self.pending_path, 'w').close()
+        if len(self.segments) > self.MAX_SEGMENTS:
+            self.compact()
+
+    def compact(self):
+        """全セグメントを重複なしの1つにまとめる（ソート済み列のマージ）"""
+        if len(self.segments) <= 1:
+            return
+        old_segments = self.segments
+        path = self._next_segment_path()
+        tmp_path = f"{path}.tmp"
+        previous = None
+        with open(tmp_path, 'wb') as f:
+            for key in heapq.merge(*old_segments):
+                if key != previous:
+                    f.write(struct.pack(KEY_FORMAT, key))
+                    previous = key
+        os.replace(tmp_path, path)
+        self.segments = [Segment(path)]
+        for segment in old_segments:
+            segment.close()
+            os.remove(segment.path)
+
+    def __len__(self):
+        """おおよその件数（セグメント間の重複はcompact後に解消される）"""
+        return len(self.pending) + sum(segment.count for segment in self.segments)
+
+    def close(self):
+        for segment in self.segments:
+            segment.close()
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+benchmark のテスト（偽のClaudeと偽のAPIで小さく回す）
+
+使い方:
+    python3 -m unittest test_benchmark
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+class BenchmarkTest(unittest.TestCase):
+    def test_runs_without_touching_home(self):
+        with tempfile.TemporaryDirectory() as home:
+            result = subprocess.run(
+                [sys.executable, "benchmark.py", "--tweets", "6", "--delay", "0", "--batch", "3"],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                env={**os.environ, "HOME": home, "YAMATTER_ENV": "local"},
+                capture_output=True, text=True, timeout=60
+            )
+            self.assertEqual(result.returncode, 0, result.stderr)
+            self.assertIn("ツイート6件", result.stdout)
+            self.assertIn("バッチ (batch=3)", result.stdout)
+            self.assertIn("2バッチ", result.stdout)
+            # 返信済みIDや既読位置は一時ディレクトリに置くので、HOME には何も作らない
+            self.assertEqual(os.listdir(home), [])
+
+if __name__ == "__main__":
+    unittest.main()
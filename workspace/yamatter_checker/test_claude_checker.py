@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+"""
+claude_checker のテスト（APIやClaudeは呼ばない）
+
+使い方:
+    python3 -m unittest test_claude_checker
+"""
+
+import asyncio
+import contextlib
+import io
+import json
+import os
+import signal
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import claude_checker
+from claude_checker import ClaudeChecker, PreFilter, option_value
+from fake_api import FakeYamatterAPI
+
+# 呼ばれた回数を記録し、alice からのツイートにだけ名前入りで返信する偽のClaude CLI
+FAKE_CLAUDE = """#!/bin/sh
+echo call >> "$(dirname "$0")/calls.log"
+case "$1" in
+  *"ユーザー: alice"*) echo "REPLY: aliceさん、おはよう" ;;
+  *) echo "REPLY: おはよう" ;;
+esac
+"""
+
+def tweet(content, **fields):
+    return {"id": "1", "author_nickname": "user", "author_id": "user1", "content": content, **fields}
+
+def posted(tweet_id, minute, reply_to_id=None, author="user"):
+    """APIが返す形のツイート（12時minute分に投稿）"""
+    return {
+        "id": str(tweet_id), "author_nickname": author, "author_id": author,
+        "content": f"{author}のツイート{tweet_id}", "reply_to_id": reply_to_id,
+        "created_at": f"2025-09-01 12:{minute:02d}:00"
+    }
+
+class CheckerTestCase(unittest.TestCase):
+    """HOMEを一時ディレクトリにし、偽のClaudeを使う ClaudeChecker を用意する"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        patcher = mock.patch.dict(os.environ, {"HOME": self.tmp})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.claude_bin = os.path.join(self.tmp, "claude")
+        self.write_fake_claude(FAKE_CLAUDE)
+        patcher = mock.patch.object(claude_checker, "CLAUDE_BIN", self.claude_bin)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.checker = ClaudeChecker()
+        self.addCleanup(self.checker.replied_tweets.close)
+        self.checker.get_recent_memory = lambda: ""
+        self.checker.monologue_probability = 0
+
+    def write_fake_claude(self, script):
+        with open(self.claude_bin, 'w') as f:
+            f.write(script)
+        os.chmod(self.claude_bin, os.stat(self.claude_bin).st_mode | stat.S_IXUSR)
+
+    def claude_calls(self):
+        path = os.path.join(self.tmp, "calls.log")
+        if not os.path.exists(path):
+            return 0
+        with open(path) as f:
+            return len(f.readlines())
+
+class APITestCase(CheckerTestCase):
+    """偽のYamatter API（fake_api）を相手にする"""
+
+    def setUp(self):
+        super().setUp()
+        self.api = FakeYamatterAPI().start()
+        self.addCleanup(self.api.stop)
+        self.checker = self.connect(self.checker)
+
+    def connect(self, checker):
+        checker.api_base = self.api.api_base
+        self.addCleanup(checker.http.close)
+        return checker
+
+    def new_checker(self):
+        """同じHOMEで起動し直した ClaudeChecker"""
+        checker = ClaudeChecker()
+        self.addCleanup(checker.replied_tweets.close)
+        checker.get_recent_memory = lambda: ""
+        checker.monologue_probability = 0
+        return self.connect(checker)
+
+    def quietly(self, function, *args, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return function(*args, **kwargs)
+
+class PreFilterTest(unittest.TestCase):
+    def setUp(self):
+        self.prefilter = PreFilter()
+
+    def test_negative_words_are_skipped(self):
+        for content in ["うざいんだよ", "黙れ", "死ね", "このクソ野郎"]:
+            with self.subTest(content=content):
+                self.assertEqual(self.prefilter.classify(tweet(content)), ("skip", "negative"))
+
+    def test_ordinary_text_goes_to_llm(self):
+        # 短い語が部分一致していた頃にスキップされていた文
+        for content in [
+            "わたしね、今日ラーメン食べた",
+            "もう少しね",
+            "カスタムフックの作り方を教えて",
+            "ゴミ箱から復元する方法は？",
+            "くそ暑い",
+            "まだ死ねない",
+        ]:
+            with self.subTest(content=content):
+                self.assertEqual(self.prefilter.classify(tweet(content)), ("llm", "default"))
+
+    def test_mention_wins_over_negative(self):
+        self.assertEqual(self.prefilter.classify(tweet("山田うざい")), ("llm", "mention"))
+
+    def test_self_replied_and_empty(self):
+        self.assertEqual(self.prefilter.classify(tweet("hi", author_id="yamada_ai")), ("skip", "self"))
+        self.assertEqual(self.prefilter.classify(tweet("hi"), replied_ids={"1"}), ("skip", "replied"))
+        self.assertEqual(self.prefilter.classify(tweet("  ")), ("skip", "empty"))
+
+    def test_summary_counts_reasons(self):
+        self.prefilter.classify(tweet("黙れ"))
+        self.prefilter.classify(tweet("こんにちは"))
+        summary = self.prefilter.summary()
+        self.assertEqual(summary["total"], 2)
+        self.assertEqual(summary["llm_calls_saved"], 1)
+        self.assertEqual(summary["reasons"], {"default": 1, "negative": 1})
+
+class BatchParseTest(unittest.TestCase):
+    def test_accepted_line_formats(self):
+        response = "\n".join([
+            "101: REPLY: おはよう",
+            "[102] SKIP",
+            "【103】：REPLY：こんにちは",
+            "id=104 - skip",
+            "  105 : reply : やあ  ",
+        ])
+        self.assertEqual(
+            ClaudeChecker.parse_batch_analysis(response, [101, 102, 103, 104, 105]),
+            {"101": "おはよう", "102": None, "103": "こんにちは", "104": None, "105": "やあ"}
+        )
+
+    def test_unrequested_duplicate_and_unparsable_lines(self):
+        response = "\n".join([
+            "わかりました、判断します。",
+            "999: REPLY: 頼まれていない",
+            "1: SKIP",
+            "1: REPLY: 2回目は無視",
+            "2: たぶん返信しない",
+        ])
+        self.assertEqual(ClaudeChecker.parse_batch_analysis(response, ["1", "2"]), {"1": None})
+
+    def test_empty_reply_is_skip(self):
+        self.assertEqual(ClaudeChecker.parse_batch_analysis("1: REPLY: ", ["1"]), {"1": None})
+        self.assertEqual(ClaudeChecker.parse_batch_analysis("1: REPLY: 　", ["1"]), {"1": None})
+
+class BatchAnalysisTest(CheckerTestCase):
+    def make_tweets(self, count):
+        return [
+            {"id": str(i), "author_nickname": f"user{i}", "author_id": f"user{i}",
+             "content": f"質問{i}", "created_at": "2025-09-01 09:00:00", "reply_to_id": None}
+            for i in range(1, count + 1)
+        ]
+
+    def test_one_call_per_batch(self):
+        self.write_fake_claude(
+            '#!/bin/sh\necho call >> "$(dirname "$0")/calls.log"\n'
+            'printf "1: REPLY: こんにちは\\n[2] SKIP\\n3: SKIP\\n"\n'
+        )
+        results = self.checker.analyze_tweets_batch(self.make_tweets(3), batch_size=3)
+        self.assertEqual(results, {"1": "こんにちは", "2": None, "3": None})
+        self.assertEqual(self.claude_calls(), 1)
+
+    def test_unparsed_ids_fall_back_to_single_analysis(self):
+        # バッチ応答にIDがない（FAKE_CLAUDE は1行の返信しか返さない）
+        results = self.checker.analyze_tweets_batch(self.make_tweets(2), batch_size=2)
+        self.assertEqual(results, {"1": "おはよう", "2": "おはよう"})
+        self.assertEqual(self.claude_calls(), 3)
+
+class DuplicateDecisionTest(CheckerTestCase):
+    """同じ内容のツイートが1回の実行に複数ある場合の判断の使い回し"""
+
+    def make_tweets(self, first_author, second_author):
+        return [
+            {"id": "1", "author_nickname": first_author, "author_id": first_author,
+             "content": "おはよう", "created_at": "2025-09-01 09:00:00", "reply_to_id": None},
+            {"id": "2", "author_nickname": second_author, "author_id": second_author,
+             "content": "おはよう", "created_at": "2025-09-01 09:01:00", "reply_to_id": None},
+        ]
+
+    def test_batch_reuses_reply_without_names(self):
+        results = self.checker.analyze_tweets_batch(self.make_tweets("bob", "carol"), batch_size=1)
+        self.assertEqual(self.claude_calls(), 1)
+        self.assertTrue(results["2"].startswith("おはよう"))
+
+    def test_batch_does_not_reuse_reply_addressed_by_name(self):
+        results = self.checker.analyze_tweets_batch(self.make_tweets("alice", "bob"), batch_size=1)
+        self.assertEqual(results["1"], "aliceさん、おはよう")
+        self.assertEqual(results["2"], "おはよう")
+        self.assertEqual(self.claude_calls(), 2)
+
+    def test_async_does_not_reuse_reply_addressed_by_name(self):
+        tweets = self.make_tweets("alice", "bob")
+        posted = {}
+        self.checker.get_mentions = lambda params=None: []
+        self.checker.get_recent_tweets = lambda params=None: tweets
+        self.checker.post_reply = lambda tweet_id, content, user: posted.setdefault(user, content) and True
+        asyncio.run(self.checker.run_async(max_workers=2))
+        self.assertEqual(posted, {"alice": "aliceさん、おはよう", "bob": "おはよう"})
+        self.assertEqual(self.claude_calls(), 2)
+
+class WatermarkTest(APITestCase):
+    def test_since_params_follow_the_watermark(self):
+        self.assertEqual(self.checker.since_params("tweets"), {})
+        self.checker.advance_watermark("tweets", [posted(1, 1), posted(2, 2), posted(3, 2)])
+        self.assertEqual(self.checker.since_params("tweets"),
+                         {"after": "2025-09-01 12:02:00", "since_id": "3"})
+        # 古いツイートだけでは戻らない
+        self.checker.advance_watermark("tweets", [posted(0, 0)])
+        self.assertEqual(self.checker.watermarks["tweets"]["ids"], ["2", "3"])
+
+    def test_watermark_filters_a_server_that_ignores_it(self):
+        self.checker.watermarks["tweets"] = {"created_at": "2025-09-01 12:02:00", "last_id": "2", "ids": ["2"]}
+        tweets = [posted(4, 3), posted(3, 2), posted(2, 2), posted(1, 1)]
+        new_tweets = self.checker.filter_new_tweets(tweets, "tweets")
+        self.assertEqual([t["id"] for t in new_tweets], ["4", "3"])
+        # T区切り・Z付きの時刻も同じように比べる
+        tweets = [dict(posted(5, 2), created_at="2025-09-01T12:02:00Z")]
+        self.assertEqual(self.checker.filter_new_tweets(tweets, "tweets"), tweets)
+
+    def test_restart_only_analyzes_new_tweets(self):
+        self.write_fake_claude("#!/bin/sh\necho call >> \"$(dirname \"$0\")/calls.log\"\necho SKIP\n")
+        self.api.honor_since = False
+        for i in range(1, 4):
+            self.api.add_tweet(posted(i, i))
+        self.quietly(self.checker.run)
+        self.assertEqual(self.claude_calls(), 3)
+
+        self.api.add_tweet(posted(4, 4))
+        self.quietly(self.new_checker().run)
+        self.assertEqual(self.claude_calls(), 4)
+        query = self.api.paths("/tweets?")[-1]
+        self.assertIn("since_id=3", query)
+        self.assertIn("after=2025-09-01+12%3A03%3A00", query)
+
+class ThreadFetchTest(APITestCase):
+    def setUp(self):
+        super().setUp()
+        # c → b → a（a は山田の投稿）と f → g の2つのスレッド
+        self.api.add_tweet(posted("a", 1, author="yamada_ai"), timeline=False)
+        self.api.add_tweet(posted("b", 2, reply_to_id="a", author="bob"), timeline=False)
+        self.api.add_tweet(posted("g", 3, author="gin"), timeline=False)
+        self.c = self.api.add_tweet(posted("c", 4, reply_to_id="b"))
+        self.f = self.api.add_tweet(posted("f", 5, reply_to_id="g"))
+        self.api.add_tweet(posted("z", 6))
+
+    def test_missing_tweets_are_fetched_in_one_request(self):
+        self.checker.tweet_cache.put(posted("a", 1, author="yamada_ai"))
+        found = self.checker.fetch_tweets(["a", "b", "g", "x", "b"])
+        self.assertEqual(sorted(found), ["a", "b", "g"])
+        # まとめて取れなかったものだけ1件ずつ確かめる
+        self.assertEqual(self.api.paths("/tweets"), ["/tweets?ids=b%2Cg%2Cx", "/tweets/x"])
+        self.assertTrue(self.checker.batch_fetch_supported)
+        # 取得したものはキャッシュから返す
+        self.checker.fetch_tweets(["b", "g"])
+        self.assertEqual(len(self.api.paths("/tweets")), 2)
+
+    def test_ignored_ids_query_falls_back_to_single_fetches(self):
+        self.api.batch_ids = False
+        found = self.checker.fetch_tweets(["b", "g", "x"])
+        self.assertEqual(sorted(found), ["b", "g"])
+        self.assertFalse(self.checker.batch_fetch_supported)
+        self.assertEqual(self.api.paths("/tweets?"), ["/tweets?ids=b%2Cg%2Cx"])
+        self.assertEqual(sorted(self.api.paths("/tweets/")), ["/tweets/b", "/tweets/g", "/tweets/x"])
+        # 一覧として返ってきたツイートもキャッシュに入る
+        self.assertIsNotNone(self.checker.tweet_cache.get("z"))
+
+        # 使えないと分かったら、次からは ids を試さない
+        self.checker.fetch_tweets(["a", "c"])
+        self.assertEqual(len(self.api.paths("/tweets?")), 1)
+
+    def test_thread_contexts_take_one_round_per_depth(self):
+        loner = posted("n", 7)
+        contexts = self.checker.build_thread_contexts([self.c, self.f, loner])
+        self.assertEqual(contexts["c"], "スレッドの流れ（古い順）:\n山田: yamada_aiのツイートa\n@bob: bobのツイートb")
+        self.assertEqual(contexts["f"], "スレッドの流れ（古い順）:\n@gin: ginのツイートg")
+        self.assertEqual(contexts["n"], "")
+        # 深さ1: b と g をまとめて、深さ2: a
+        self.assertEqual(self.api.paths("/tweets"), ["/tweets?ids=b%2Cg", "/tweets/a"])
+        self.assertEqual(self.checker.build_thread_context(self.c), contexts["c"])
+        self.assertEqual(len(self.api.paths("/tweets")), 2)
+
+    def test_thread_context_is_cut_at_the_limits(self):
+        contexts = self.checker.build_thread_contexts([self.c], max_depth=1)
+        self.assertEqual(contexts["c"], "スレッドの流れ（古い順）:\n…\n@bob: bobのツイートb")
+        contexts = self.checker.build_thread_contexts([self.c], max_chars=20)
+        self.assertEqual(contexts["c"], "スレッドの流れ（古い順）:\n…\n@bob: bobのツイートb")
+
+    def test_reply_loop_ends(self):
+        self.api.add_tweet(posted("p", 8, reply_to_id="q"), timeline=False)
+        self.api.add_tweet(posted("q", 9, reply_to_id="p"), timeline=False)
+        contexts = self.checker.build_thread_contexts([posted("r", 10, reply_to_id="p")])
+        self.assertEqual(contexts["r"], "スレッドの流れ（古い順）:\n@user: userのツイートq\n@user: userのツイートp")
+
+class DaemonTest(APITestCase):
+    def setUp(self):
+        super().setUp()
+        # run_daemon が差し替えるシグナルハンドラを元に戻す
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            self.addCleanup(signal.signal, signum, signal.getsignal(signum))
+        self.runs = []
+
+    def daemon(self, run, **kwargs):
+        self.checker.run = run
+        start = time.monotonic()
+        self.quietly(self.checker.run_daemon, **kwargs)
+        return time.monotonic() - start
+
+    def saved_watermarks(self):
+        with open(self.checker.watermarks_file) as f:
+            return json.load(f)
+
+    def test_signal_during_a_check_stops_after_it(self):
+        def run():
+            self.checker.get_mentions()
+            os.kill(os.getpid(), signal.SIGTERM)
+            # 停止要求の後も、実行中のチェックは最後まで続ける
+            self.checker.advance_watermark("tweets", [posted(1, 1)])
+            self.runs.append("done")
+
+        self.daemon(run, interval=1000, jitter=0)
+        self.assertEqual(self.runs, ["done"])
+        self.assertEqual(self.saved_watermarks()["tweets"]["last_id"], "1")
+
+    def test_signal_wakes_the_daemon_while_waiting(self):
+        timer = threading.Timer(0.2, os.kill, (os.getpid(), signal.SIGINT))
+        self.addCleanup(timer.cancel)
+        timer.start()
+        elapsed = self.daemon(lambda: self.runs.append("run"), interval=1000, jitter=0)
+        self.assertEqual(self.runs, ["run"])
+        self.assertLess(elapsed, 5)
+
+    def test_failed_check_does_not_stop_the_daemon(self):
+        def run():
+            self.runs.append("run")
+            if len(self.runs) == 1:
+                raise OSError("接続できません")
+            self.checker.request_stop()
+
+        # 次のチェックは最短1秒後
+        self.daemon(run, interval=0, jitter=0)
+        self.assertEqual(self.runs, ["run", "run"])
+
+    def test_keepalive_is_sent_after_idle_interval(self):
+        pings = []
+        ping = self.checker.keep_alive_ping
+
+        def keep_alive_ping():
+            ping()
+            pings.append(time.monotonic())
+            if len(pings) == 3:
+                self.checker.request_stop()
+
+        def run():
+            self.checker.get_mentions()
+            self.runs.append(time.monotonic())
+
+        self.checker.keep_alive_ping = keep_alive_ping
+        self.daemon(run, interval=1000, jitter=0, keepalive_interval=0.1)
+        self.assertEqual(len(self.runs), 1)
+        self.assertEqual(self.api.paths("/health"), ["/health"] * 3)
+        # 前回のアクセスから keepalive_interval 経つまでは送らない
+        for before, after in zip(self.runs + pings, pings):
+            self.assertGreaterEqual(after - before, 0.09)
+
+    def test_no_keepalive_without_interval(self):
+        timer = threading.Timer(0.3, self.checker.request_stop)
+        self.addCleanup(timer.cancel)
+        timer.start()
+        self.daemon(lambda: self.checker.get_mentions(), interval=1000, jitter=0)
+        self.assertEqual(self.api.paths("/health"), [])
+
+class SlowMemoryClient:
+    """release() されるまで洞察を返さない記憶クライアント"""
+    def __init__(self):
+        self.calls = 0
+        self.released = threading.Event()
+
+    def insights(self):
+        self.calls += 1
+        self.released.wait(10)
+        return {"insights": ["a", "b", "c", "d"]}
+
+    def release(self):
+        self.released.set()
+
+class RecentMemoryTest(CheckerTestCase):
+    def setUp(self):
+        super().setUp()
+        del self.checker.get_recent_memory
+        self.client = SlowMemoryClient()
+        self.addCleanup(self.client.release)
+        self.checker.memory_client = self.client
+        patcher = mock.patch.object(claude_checker, "MEMORY_TIMEOUT", 0.05)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_insights_are_included(self):
+        self.client.release()
+        self.assertEqual(self.checker.get_recent_memory(), "【山田の最近の洞察】\n• a\n• b\n• c\n")
+
+    def test_slow_insights_are_given_up(self):
+        self.assertEqual(self.checker.get_recent_memory(), "")
+        # 前回の取得が終わるまでは新たに起動しない
+        self.assertEqual(self.checker.get_recent_memory(), "")
+        self.assertEqual(self.client.calls, 1)
+        self.client.release()
+        self.checker.insights_future.result(timeout=5)
+        self.assertIn("• a", self.checker.get_recent_memory())
+
+    def test_errors_give_no_insights(self):
+        self.checker.memory_client = mock.Mock(**{"insights.side_effect": OSError("壊れた")})
+        self.assertEqual(self.checker.get_recent_memory(), "")
+
+class OptionValueTest(unittest.TestCase):
+    def option(self, argv, *args):
+        with mock.patch.object(claude_checker.sys, "argv", ["claude_checker.py", *argv]):
+            return option_value(*args)
+
+    def assert_usage_error(self, argv, message):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output), self.assertRaises(SystemExit) as raised:
+            self.option(argv, "--workers", 4, int)
+        self.assertEqual(raised.exception.code, 2)
+        self.assertIn(message, output.getvalue())
+        self.assertIn("使い方", output.getvalue())
+
+    def test_value_and_default(self):
+        self.assertEqual(self.option(["--async", "--workers", "8"], "--workers", 4, int), 8)
+        self.assertEqual(self.option(["--async"], "--workers", 4, int), 4)
+        self.assertEqual(self.option(["--jitter", "-5"], "--jitter", 30, float), -5.0)
+
+    def test_missing_value(self):
+        self.assert_usage_error(["--workers"], "--workers の値を指定してください")
+        self.assert_usage_error(["--workers", "--async"], "--workers の値を指定してください")
+
+    def test_invalid_value(self):
+        self.assert_usage_error(["--workers", "many"], "--workers の値が不正です: many")
+
+    def test_workers_must_be_positive(self):
+        for value in ["0", "-2"]:
+            with self.subTest(value=value):
+                result = subprocess.run(
+                    [sys.executable, "claude_checker.py", "--async", "--workers", value],
+                    cwd=os.path.dirname(os.path.abspath(__file__)),
+                    capture_output=True, text=True, timeout=30
+                )
+                self.assertEqual(result.returncode, 2)
+                self.assertIn(f"--workers は1以上を指定してください: {value}", result.stdout)
+
+if __name__ == "__main__":
+    unittest.main()
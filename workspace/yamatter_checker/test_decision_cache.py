@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+decision_cache のテスト（一時ディレクトリを使う）
+
+使い方:
+    python3 -m unittest test_decision_cache
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import decision_cache
+from decision_cache import DecisionCache, normalize_content, vary_reply
+
+class NormalizeTest(unittest.TestCase):
+    def test_variants_share_a_key(self):
+        key = DecisionCache.make_key("おはよう")
+        for content in ["おはよう ", "@alice おはよう", "おはよう https://example.com/x", "おはよう"]:
+            with self.subTest(content=content):
+                self.assertEqual(DecisionCache.make_key(content), key)
+        self.assertEqual(normalize_content("ＡＢＣ　ｄｅｆ"), "abcdef")
+        self.assertEqual(normalize_content("おはよーーーー"), normalize_content("おはよーー"))
+
+    def test_context_and_mention_change_the_key(self):
+        key = DecisionCache.make_key("おはよう")
+        self.assertNotEqual(DecisionCache.make_key("おはよう", "親: こんにちは"), key)
+        self.assertNotEqual(DecisionCache.make_key("おはよう", is_mention=True), key)
+        self.assertNotEqual(DecisionCache.make_key("おはよう？"), key)
+
+    def test_vary_reply_only_changes_the_ending(self):
+        for _ in range(20):
+            self.assertIn(vary_reply("おはよう！！"), ["おはよう", "おはよう！", "おはよう。", "おはよう〜"])
+        self.assertEqual(vary_reply("！"), "！")
+
+class DecisionCacheTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "decisions.json")
+
+    def test_reply_and_skip_are_cached(self):
+        cache = DecisionCache(self.path, vary=False)
+        cache.put("a", "おはよう")
+        cache.put("b", None)
+        self.assertEqual(cache.get("a"), (True, "おはよう"))
+        self.assertEqual(cache.get("b"), (True, None))
+        self.assertEqual(cache.get("c"), (False, None))
+        self.assertEqual(cache.summary()["hit_rate"], round(2 / 3, 3))
+
+    def test_saved_entries_are_loaded(self):
+        cache = DecisionCache(self.path, vary=False)
+        cache.put("a", "おはよう")
+        cache.put("b", None)
+        cache.save()
+        reloaded = DecisionCache(self.path, vary=False)
+        self.assertEqual(reloaded.get("a"), (True, "おはよう"))
+        self.assertEqual(reloaded.get("b"), (True, None))
+
+    def test_expired_entries_are_dropped(self):
+        now = [1000.0]
+        with mock.patch.object(decision_cache.time, "time", lambda: now[0]):
+            cache = DecisionCache(self.path, ttl=10, vary=False)
+            cache.put("a", "おはよう")
+            cache.put("b", "こんにちは")
+            cache.save()
+            now[0] += 11
+            self.assertEqual(cache.get("a"), (False, None))
+            self.assertEqual(cache.summary()["expired"], 1)
+            # 読み込み時にも期限切れは捨てる
+            self.assertEqual(DecisionCache(self.path).summary()["size"], 0)
+
+    def test_oldest_entries_are_evicted(self):
+        cache = DecisionCache(self.path, max_size=2, vary=False)
+        cache.put("a", "1")
+        cache.put("b", "2")
+        cache.get("a")
+        cache.put("c", "3")
+        self.assertEqual(cache.get("b"), (False, None))
+        cache.save()
+        reloaded = DecisionCache(self.path, max_size=2, vary=False)
+        self.assertEqual(reloaded.get("a"), (True, "1"))
+        self.assertEqual(reloaded.get("c"), (True, "3"))
+
+    def test_broken_file_starts_empty(self):
+        with open(self.path, 'w') as f:
+            f.write("{broken")
+        cache = DecisionCache(self.path)
+        self.assertEqual(cache.summary()["size"], 0)
+        cache.put("a", None)
+        cache.save()
+        self.assertEqual(DecisionCache(self.path).get("a"), (True, None))
+
+    def test_disabled_cache_stores_nothing(self):
+        cache = DecisionCache(self.path, max_size=0)
+        cache.put("a", "おはよう")
+        cache.save()
+        self.assertEqual(cache.get("a"), (False, None))
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_save_without_changes_does_not_write(self):
+        cache = DecisionCache(self.path)
+        cache.save()
+        self.assertFalse(os.path.exists(self.path))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+http_pool のテスト（ローカルのHTTPサーバーを相手にする）
+
+使い方:
+    python3 -m unittest test_http_pool
+"""
+
+import http.client
+import http.server
+import threading
+import unittest
+
+from http_pool import HTTPConnectionPool
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    """リクエストを記録し、drop に含まれる番目のリクエストには応答せず接続を切る"""
+
+    protocol_version = "HTTP/1.1"
+
+    def handle_request(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length)
+        with server.lock:
+            server.received.append((self.command, body))
+            number = len(server.received)
+        if number in server.drop:
+            # 処理した後に接続が切れた場合を模擬する
+            self.close_connection = True
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    do_GET = do_POST = handle_request
+
+    def log_message(self, *args):
+        pass
+
+class BrokenConnection:
+    """送信の時点で切れている、使い回しの接続"""
+
+    sock = None
+    timeout = None
+
+    def request(self, *args, **kwargs):
+        raise BrokenPipeError
+
+    def close(self):
+        pass
+
+class HTTPConnectionPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.received = []
+        self.server.drop = set()
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        self.pool = HTTPConnectionPool(timeout=5)
+        self.addCleanup(self.pool.close)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/tweets"
+
+    def test_connection_is_reused(self):
+        self.assertEqual(self.pool.request("GET", self.url), (200, b"ok"))
+        self.assertEqual(self.pool.request("GET", self.url), (200, b"ok"))
+        self.assertEqual(self.pool.stats["connections"], 1)
+        self.assertEqual(self.pool.stats["reused"], 1)
+
+    def test_get_is_retried_after_disconnect(self):
+        self.server.drop = {2}
+        self.pool.request("GET", self.url)
+        self.assertEqual(self.pool.request("GET", self.url), (200, b"ok"))
+        self.assertEqual(len(self.server.received), 3)
+        self.assertEqual(self.pool.stats["reconnects"], 1)
+
+    def test_post_is_not_resent_after_disconnect(self):
+        self.server.drop = {2}
+        self.pool.request("GET", self.url)
+        with self.assertRaises(http.client.RemoteDisconnected):
+            self.pool.request("POST", self.url, body=b'{"content": "hi"}')
+        self.assertEqual([method for method, _ in self.server.received], ["GET", "POST"])
+        self.assertEqual(self.pool.stats["reconnects"], 0)
+
+    def test_post_is_retried_when_never_sent(self):
+        key = ("http", "127.0.0.1", self.server.server_address[1])
+        self.pool._idle[key] = [BrokenConnection()]
+        self.assertEqual(self.pool.request("POST", self.url, body=b"{}"), (200, b"ok"))
+        self.assertEqual(self.server.received, [("POST", b"{}")])
+        self.assertEqual(self.pool.stats["reconnects"], 1)
+
+    def test_new_connection_failure_is_raised(self):
+        self.server.drop = {1}
+        with self.assertRaises(http.client.RemoteDisconnected):
+            self.pool.request("GET", self.url)
+        self.assertEqual(len(self.server.received), 1)
+
+if __name__ == "__main__":
+    unittest.main()
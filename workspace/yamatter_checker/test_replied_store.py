@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+replied_store のテスト（一時ディレクトリを使う）
+
+使い方:
+    python3 -m unittest test_replied_store
+"""
+
+import os
+import tempfile
+import unittest
+
+from replied_store import RepliedStore, id_to_key, HASHED_FLAG
+
+class RepliedStoreTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.path = os.path.join(self.dir, "replied")
+
+    def open_store(self, **kwargs):
+        store = RepliedStore(self.path, **kwargs)
+        self.addCleanup(store.close)
+        # テストでは小さな単位でセグメント化・統合させる
+        store.SEGMENT_SIZE = 4
+        store.MAX_SEGMENTS = 2
+        return store
+
+    def segment_files(self):
+        return sorted(name for name in os.listdir(self.path) if name.startswith("seg_"))
+
+    def test_keys(self):
+        self.assertEqual(id_to_key("12345"), 12345)
+        self.assertEqual(id_to_key(12345), 12345)
+        self.assertTrue(id_to_key("abc") & HASHED_FLAG)
+        self.assertTrue(id_to_key(str(HASHED_FLAG)) & HASHED_FLAG)
+        self.assertNotEqual(id_to_key("abc"), id_to_key("abd"))
+
+    def test_add_and_contains(self):
+        store = self.open_store()
+        store.add("100")
+        store.add("tweet-abc")
+        self.assertIn("100", store)
+        self.assertIn(100, store)
+        self.assertIn("tweet-abc", store)
+        self.assertNotIn("101", store)
+        self.assertNotIn("tweet-abd", store)
+
+    def test_pending_ids_survive_restart(self):
+        store = self.open_store()
+        store.add("1")
+        store.add("x")
+        reopened = self.open_store()
+        self.assertIn("1", reopened)
+        self.assertIn("x", reopened)
+        self.assertNotIn("2", reopened)
+
+    def test_segments_survive_restart(self):
+        store = self.open_store()
+        ids = [str(i) for i in range(1, 11)]
+        for tweet_id in ids:
+            store.add(tweet_id)
+        store.flush()
+        self.assertEqual(os.path.getsize(store.pending_path), 0)
+        reopened = self.open_store()
+        for tweet_id in ids:
+            self.assertIn(tweet_id, reopened)
+        self.assertNotIn("11", reopened)
+
+    def test_compaction_merges_segments(self):
+        store = self.open_store()
+        for i in range(1, 13):
+            store.add(str(i))
+        # 4件ごとにセグメントができ、3つ目で MAX_SEGMENTS を超えたので1つにまとまる
+        self.assertEqual(len(store.segments), 1)
+        self.assertEqual(len(self.segment_files()), 1)
+        self.assertEqual(list(store.segments[0]), list(range(1, 13)))
+        self.assertEqual(len(store), 12)
+        for i in range(1, 13):
+            self.assertIn(str(i), store)
+
+    def test_add_is_idempotent(self):
+        store = self.open_store()
+        for _ in range(3):
+            store.add("5")
+        store.flush()
+        store.add("5")
+        self.assertEqual(len(store), 1)
+
+    def test_legacy_file_is_imported_once(self):
+        legacy = os.path.join(self.dir, ".replied_tweets")
+        with open(legacy, 'w') as f:
+            f.write("10\n20\n\nold-id\n20\n")
+        store = self.open_store(legacy_file=legacy)
+        for tweet_id in ["10", "20", "old-id"]:
+            self.assertIn(tweet_id, store)
+        self.assertFalse(os.path.exists(legacy))
+        self.assertTrue(os.path.exists(f"{legacy}.migrated"))
+
+        reopened = self.open_store(legacy_file=legacy)
+        self.assertIn("old-id", reopened)
+        self.assertEqual(len(self.segment_files()), 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+tweet_cache のテスト
+
+使い方:
+    python3 -m unittest test_tweet_cache
+"""
+
+import threading
+import unittest
+from unittest import mock
+
+import tweet_cache
+from tweet_cache import TweetCache
+
+class TweetCacheTest(unittest.TestCase):
+    def test_get_and_put(self):
+        cache = TweetCache()
+        cache.put({"id": 1, "content": "hi"})
+        self.assertEqual(cache.get("1"), {"id": 1, "content": "hi"})
+        self.assertEqual(cache.get(1)["content"], "hi")
+        self.assertIsNone(cache.get("2"))
+
+    def test_tweets_without_id_are_ignored(self):
+        cache = TweetCache()
+        for tweet in [None, {}, {"id": ""}, {"id": None, "content": "x"}]:
+            cache.put(tweet)
+        self.assertEqual(cache.summary()["size"], 0)
+
+    def test_least_recently_used_is_evicted(self):
+        cache = TweetCache(max_size=2)
+        cache.put({"id": "a"})
+        cache.put({"id": "b"})
+        cache.get("a")
+        cache.put({"id": "c"})
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("c"))
+
+    def test_entries_expire(self):
+        now = [1000.0]
+        with mock.patch.object(tweet_cache.time, "monotonic", lambda: now[0]):
+            cache = TweetCache(ttl=10)
+            cache.put({"id": "a"})
+            now[0] += 5
+            self.assertIsNotNone(cache.get("a"))
+            now[0] += 6
+            self.assertIsNone(cache.get("a"))
+        summary = cache.summary()
+        self.assertEqual(summary["expired"], 1)
+        self.assertEqual(summary["size"], 0)
+
+    def test_summary(self):
+        cache = TweetCache()
+        self.assertIsNone(cache.summary()["hit_rate"])
+        cache.put_many([{"id": "a"}, {"id": "b"}])
+        cache.put_many(None)
+        cache.get("a")
+        cache.get("z")
+        summary = cache.summary()
+        self.assertEqual((summary["hits"], summary["misses"], summary["filled"]), (1, 1, 2))
+        self.assertEqual(summary["hit_rate"], 0.5)
+        cache.reset_stats()
+        self.assertEqual(cache.summary()["size"], 2)
+        self.assertEqual(cache.summary()["hits"], 0)
+
+    def test_concurrent_access(self):
+        cache = TweetCache(max_size=50)
+
+        def worker(offset):
+            for i in range(500):
+                cache.put({"id": str(offset * 1000 + i)})
+                cache.get(str(offset * 1000 + i // 2))
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        summary = cache.summary()
+        self.assertEqual(summary["size"], 50)
+        self.assertEqual(summary["hits"] + summary["misses"], 2000)
+
+if __name__ == "__main__":
+    unittest.main()
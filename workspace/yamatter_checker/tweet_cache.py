@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+ツイートIDでの参照結果のキャッシュ（TTL付きLRU、スレッドセーフ）
+一覧APIの応答からも詰めておき、親ツイートの取得でAPIを呼ばずに済ませる
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+class TweetCache:
+    """ツイートID -> ツイート（最大max_size件、ttl秒で期限切れ）"""
+
+    def __init__(self, max_size=1000, ttl=600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        """統計をリセット（内容は残す。実行ごとの集計に使う）"""
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "filled": 0}
+
+    def get(self, tweet_id):
+        """キャッシュにあればツイート、なければ（期限切れも）None"""
+        key = str(tweet_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            expires_at, tweet = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return tweet
+
+    def put(self, tweet):
+        """ツイートを入れる（古いものから追い出す）"""
+        tweet_id = tweet.get('id') if tweet else None
+        if tweet_id in (None, ''):
+            return
+        key = str(tweet_id)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, tweet)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def put_many(self, tweets):
+        """一覧APIの応答をまとめて入れる"""
+        for tweet in tweets or []:
+            self.put(tweet)
+        with self._lock:
+            self.stats["filled"] += len(tweets or [])
+
+    def summary(self):
+        """今回の実行の統計（hit_rate は参照に占めるヒットの割合）"""
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "size": len(self._entries),
+                "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else None
+            }